@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import authentication, cache, slugs, sqlite
+        from . import checks  # noqa: F401 - регистрирует проверки
+        cache.connect_signals()
+        authentication.connect_signals()
+        slugs.connect_signals()
+        sqlite.connect_signals()
@@ -0,0 +1,120 @@
+"""Асинхронные list и retrieve вьюсетов для запуска под ASGI.
+
+В Django 3.2 нет асинхронного ORM, поэтому без потока можно отдать
+только то, что не трогает базу: ответ из кеша (CachedListMixin). GET и
+HEAD сначала выполняются обычным кодом DRF прямо в цикле событий с
+флагом ``cache_only``: аутентификация по JWT, проверка прав на чтение,
+ключ и версии тегов не обращаются к базе, и попадание в кеш или ответ
+304 отдаются без sync_to_async. Промах кеша (CacheMiss) или любое
+обращение к базе (SynchronousOnlyOperation) прерывают попытку, и запрос
+повторяется в потоке. Пользователь, права и троттлинг, уже проверенные
+в цикле, при повторе не проверяются заново. Ответы совпадают с
+синхронными побайтно: выполняется один и тот же код.
+
+Обращения к кешу в цикле событий не блокируют его только у кеша в
+памяти процесса (LocMemCache). С сетевым или файловым бэкендом
+API_CACHE_ALIAS запрос сразу уходит в поток.
+
+Вьюсеты получают async-представления при API_ASYNC_READS, под любым
+сервером: на этапе сборки URL тип обработчика неизвестен. Настройка
+выключена по умолчанию и включается только для ASGI: выигрыш есть,
+лишь когда почти все чтения попадают в кеш (benchmarks.asgi_load), а
+под WSGI Django выполнял бы каждое такое представление через
+async_to_sync с отдельным циклом событий.
+"""
+import contextvars
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation
+from django.http import HttpResponse
+
+from api.cache import is_local_cache
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Атрибуты, которые DRF вешает на представление и читают роутер,
+# схемы и QueryBudgetMiddleware.
+VIEW_ATTRIBUTES = ('cls', 'initkwargs', 'actions', 'csrf_exempt')
+
+# Попытка в цикле событий: ответ можно взять только из кеша.
+cache_only = contextvars.ContextVar('cache_only', default=False)
+
+# Атрибут HttpRequest: пользователь и токен, которые попытка в цикле уже
+# проверила (права и троттлинг пройдены).
+CHECKED_ATTRIBUTE = 'async_read_checked'
+
+
+class CacheMiss(Exception):
+    """Ответа нет в кеше, а база в цикле событий недоступна."""
+
+
+def run_in_thread(view, request, *args, **kwargs):
+    return sync_to_async(view)(request, *args, **kwargs)
+
+
+def run_in_loop(view, request, *args, **kwargs):
+    """Ответ без обращений к базе или None, если база понадобилась."""
+
+    def attempt():
+        cache_only.set(True)
+        return view(request, *args, **kwargs)
+
+    # Своя копия контекста: попытка не оставляет cache_only, read_alias
+    # и прочие переменные контекста запросу, который уйдёт в поток.
+    try:
+        response = contextvars.copy_context().run(attempt)
+    except (CacheMiss, SynchronousOnlyOperation):
+        return None
+    response.render()
+    # Отрендеренный ответ без render(): иначе Django отправит его в поток
+    # ради повторного рендеринга.
+    return HttpResponse(
+        response.content, status=response.status_code,
+        headers=response.headers
+    )
+
+
+class AsyncReadMixin:
+    """as_view возвращает async-представление при API_ASYNC_READS."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if cache_only.get():
+            setattr(request._request, CHECKED_ATTRIBUTE,
+                    (request.user, request.auth))
+
+    def perform_authentication(self, request):
+        checked = getattr(request._request, CHECKED_ATTRIBUTE, None)
+        if checked is None:
+            super().perform_authentication(request)
+        else:
+            request.user, request.auth = checked
+
+    def check_permissions(self, request):
+        if not hasattr(request._request, CHECKED_ATTRIBUTE):
+            super().check_permissions(request)
+
+    def check_throttles(self, request):
+        if not hasattr(request._request, CHECKED_ATTRIBUTE):
+            super().check_throttles(request)
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.API_ASYNC_READS:
+            return view
+
+        async def async_view(request, *args, **kwargs):
+            if request.method in READ_METHODS and is_local_cache(
+                settings.API_CACHE_ALIAS
+            ):
+                response = run_in_loop(view, request, *args, **kwargs)
+                if response is not None:
+                    return response
+            return await run_in_thread(view, request, *args, **kwargs)
+
+        for name in VIEW_ATTRIBUTES:
+            setattr(async_view, name, getattr(view, name))
+        async_view.__name__ = view.__name__
+        return async_view
@@ -0,0 +1,104 @@
+"""JWT-аутентификация без чтения пользователя из базы.
+
+Токен, выданный token_for_user, несёт роль и флаги пользователя, по
+которым работают права доступа. Из них собирается экземпляр User с
+отложенными остальными полями: обращение к ним (email, bio) догрузит
+поле из базы, но для проверки прав запрос не нужен.
+
+Устаревшие права отсекаются версией: User.token_version растёт при
+смене роли или флагов, а текущая версия хранится в LRU-кеше процесса
+не дольше JWT_CLAIMS_AUTH['CACHE_TTL'] секунд. Для токена со старой
+версией права читаются из базы, токен без claims обрабатывается как
+обычно - с загрузкой всего пользователя.
+"""
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.lru import LRUCache
+from reviews.models import User
+
+VERSION_CLAIM = 'ver'
+CLAIMS = User.CLAIM_FIELDS
+
+# id пользователя -> текущая версия прав.
+token_versions = LRUCache('JWT_CLAIMS_AUTH')
+
+
+def token_for_user(user):
+    """Access-токен с ролью, флагами и версией прав пользователя."""
+    token = AccessToken.for_user(user)
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+def fetch_claims(user_id):
+    """Текущие claims пользователя из базы; None - пользователь удалён."""
+    row = User.objects.filter(pk=user_id).values(
+        'token_version', *CLAIMS
+    ).first()
+    if row is not None:
+        row[VERSION_CLAIM] = row.pop('token_version')
+        token_versions.set(user_id, row[VERSION_CLAIM])
+    return row
+
+
+def load_full_user(user):
+    """Пользователь со всеми полями, если он собран из claims."""
+    if user.get_deferred_fields():
+        return User.objects.get(pk=user.pk)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if not all(
+            claim in validated_token for claim in CLAIMS + (VERSION_CLAIM,)
+        ):
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        claims = validated_token
+        if token_versions.get(user_id) != validated_token[VERSION_CLAIM]:
+            # Версии нет в кеше или права изменились после выдачи токена:
+            # claims берутся из базы одним запросом.
+            row = fetch_claims(user_id)
+            if row is None:
+                raise AuthenticationFailed(
+                    'Пользователь не найден', code='user_not_found'
+                )
+            if row[VERSION_CLAIM] != validated_token[VERSION_CLAIM]:
+                claims = row
+        if not claims['is_active']:
+            raise AuthenticationFailed(
+                'Пользователь неактивен', code='user_inactive'
+            )
+        return self.build_user(user_id, claims)
+
+    def build_user(self, user_id, claims):
+        """User с полями из claims; остальные поля отложены."""
+        values = {
+            'id': user_id,
+            'token_version': claims[VERSION_CLAIM],
+            **{claim: claims[claim] for claim in CLAIMS},
+        }
+        fields = [
+            field.attname for field in User._meta.concrete_fields
+            if field.attname in values
+        ]
+        return User.from_db(
+            User.objects.db, fields, [values[field] for field in fields]
+        )
+
+
+def forget_token_version(sender, instance, **kwargs):
+    token_versions.forget(instance.pk)
+
+
+def connect_signals():
+    post_save.connect(forget_token_version, sender=User)
+    post_delete.connect(forget_token_version, sender=User)
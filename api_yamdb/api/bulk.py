@@ -0,0 +1,122 @@
+"""Массовая загрузка произведений.
+
+Строки проверяются по правилам TitlesSerializer, но slug категорий и
+жанров всех строк разрешаются заранее двумя запросами. Произведения и
+связи с жанрами вставляются пачками по TITLES_BULK['BATCH_SIZE'] в
+одной транзакции (id произведений на SQLite - одним запросом MAX после
+вставки, см. insert_titles); строки с ошибками пропускаются и попадают в отчёт.
+Если кеш slug устарел и вставка упала на внешнем ключе, кеш очищается,
+и загрузка один раз повторяется со свежими id.
+
+bulk_create не отправляет сигналы, поэтому поисковый индекс и кеш
+ответов обновляются один раз на всю загрузку.
+"""
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from rest_framework import serializers
+
+from api.cache import bump_tags
+from api.serializers import TitlesSerializer
+from api.slugs import forget_all, resolvers
+from reviews.models import Category, GenreTitle, Genres, Title
+from reviews.search import get_search_backend
+
+
+def collect_slugs(rows):
+    """Slug категорий и жанров, встречающиеся в строках."""
+    categories, genres = set(), set()
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        category = row.get('category')
+        if isinstance(category, (str, int)):
+            categories.add(str(category))
+        row_genres = row.get('genre')
+        if isinstance(row_genres, list):
+            genres.update(
+                str(genre) for genre in row_genres
+                if isinstance(genre, (str, int))
+            )
+    return categories, genres
+
+
+def validate_rows(rows):
+    """Пары (validated_data, errors) для каждой строки по порядку."""
+    categories, genres = collect_slugs(rows)
+    serializer = TitlesSerializer(context={'slug_ids': {
+        Category: resolvers[Category].resolve(categories),
+        Genres: resolvers[Genres].resolve(genres),
+    }})
+    results = []
+    for row in rows:
+        try:
+            results.append((serializer.run_validation(row), None))
+        except serializers.ValidationError as error:
+            results.append((None, error.detail))
+    return results
+
+
+def insert_titles(titles, batch_size):
+    """Вставляет произведения пачками и проставляет им id.
+
+    Вызывается внутри транзакции. SQLite в Django 3.2 не возвращает id
+    из bulk_create, но после первого INSERT транзакция держит блокировку
+    записи: других вставок до коммита нет, и id новых строк идут подряд
+    до наибольшего id таблицы.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        Title.objects.bulk_create(titles, batch_size=batch_size)
+        return
+    if connection.vendor != 'sqlite':
+        # raw=True отключает обработчики post_save: индекс и кеш обновит
+        # вызывающий.
+        for title in titles:
+            title.save_base(raw=True)
+        return
+    Title.objects.bulk_create(titles, batch_size=batch_size)
+    last = Title.objects.aggregate(last=Max('pk'))['last']
+    for pk, title in enumerate(titles, start=last - len(titles) + 1):
+        title.pk = pk
+        title._state.adding = False
+
+
+def load_titles(rows, batch_size=None, retry=True):
+    """Создаёт произведения из строк и возвращает отчёт по строкам."""
+    batch_size = batch_size or settings.TITLES_BULK['BATCH_SIZE']
+    validated = validate_rows(rows)
+    titles, genres = [], []
+    for data, errors in validated:
+        if errors is None:
+            genres.append(data.pop('genre', []))
+            titles.append(Title(**data))
+    if titles:
+        try:
+            with transaction.atomic():
+                insert_titles(titles, batch_size)
+                GenreTitle.objects.bulk_create(
+                    [
+                        GenreTitle(title_id=title.pk, genre_id=genre_id)
+                        for title, title_genres in zip(titles, genres)
+                        for genre_id in {genre.pk for genre in title_genres}
+                    ],
+                    batch_size=batch_size
+                )
+                get_search_backend().index_many(titles)
+        except IntegrityError:
+            if not retry:
+                raise
+            # Категорию или жанр удалили в другом процессе.
+            forget_all()
+            return load_titles(rows, batch_size, retry=False)
+        bump_tags('titles')
+    created = iter(titles)
+    results = [
+        {'id': next(created).pk} if errors is None else {'errors': errors}
+        for _, errors in validated
+    ]
+    return {
+        'created': len(titles),
+        'failed': len(rows) - len(titles),
+        'results': results,
+    }
@@ -0,0 +1,154 @@
+"""Версии тегов для кеширования ответов API.
+
+Каждый тег (``titles``, ``title:5:reviews`` и т.п.) описывает набор данных.
+Запись в модель меняет версии только затронутых тегов, поэтому все ключи,
+собранные из старых версий, перестают находиться без перебора кеша.
+"""
+import time
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import (Category, Comment, Genres, GenreTitle, Review,
+                            Title, User)
+
+TAG_VERSION_KEY = 'api:tag:{}'
+
+# Бэкенды кеша, данные которых не видны другим процессам.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def is_local_cache(alias):
+    return settings.CACHES[alias]['BACKEND'] in LOCAL_CACHE_BACKENDS
+
+
+def new_version():
+    """Версия тега: время изменения в наносекундах и случайный суффикс."""
+    return f'{time.time_ns()}.{uuid4().hex[:8]}'
+
+
+def versions_timestamp(versions):
+    """Время последнего изменения среди версий, в секундах."""
+    return max(int(version.split('.')[0]) for version in versions) // 10**9
+
+
+def get_tag_versions(tags):
+    """Возвращает версии тегов в том же порядке; новым тегам их назначает.
+
+    Потерянная версия назначается заново текущим временем, так что всё,
+    что было закешировано под ней, считается изменённым.
+    """
+    cache = get_cache()
+    keys = [TAG_VERSION_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_tags(*tags):
+    """Сбрасывает всё, что было закешировано под этими тегами."""
+    get_cache().set_many(
+        {TAG_VERSION_KEY.format(tag): new_version() for tag in tags}, None
+    )
+
+
+def format_tags(tags, kwargs):
+    """Подставляет параметры из URL в шаблоны тегов вьюсета."""
+    return [tag.format(**kwargs) for tag in tags]
+
+
+def make_key(template, *parts):
+    raw = '|'.join(str(part) for part in parts)
+    return template.format(md5(raw.encode('utf-8')).hexdigest())
+
+
+def normalized_query(request, ignored=()):
+    """Параметры запроса в каноническом порядке, без ignored."""
+    return sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in ignored
+        for value in values
+    )
+
+
+# Какие теги затрагивает запись в модель. Тег ``catalog`` стоит на
+# карточках произведений, куда встроены категории и жанры: его сбрасывает
+# только изменение или удаление категории либо жанра.
+MODEL_TAGS = {
+    Category: lambda obj, created: (
+        ('categories',) if created else ('categories', 'titles', 'catalog')
+    ),
+    Genres: lambda obj, created: (
+        ('genres',) if created else ('genres', 'titles', 'catalog')
+    ),
+    Title: lambda obj, created: (
+        'titles', f'title:{obj.pk}', f'title:{obj.pk}:reviews'
+    ),
+    GenreTitle: lambda obj, created: ('titles', f'title:{obj.title_id}'),
+    # Отзыв меняет рейтинг, который виден в ответах о произведении.
+    Review: lambda obj, created: (
+        f'title:{obj.title_id}:reviews',
+        f'review:{obj.pk}',
+        f'review:{obj.pk}:comments',
+        'titles',
+        f'title:{obj.title_id}',
+    ),
+    Comment: lambda obj, created: (
+        f'review:{obj.review_id}:comments',
+        f'comment:{obj.pk}',
+    ),
+    # Имя автора выводится в отзывах и комментариях; новый пользователь
+    # ещё ничего не написал.
+    User: lambda obj, created: (
+        ('users',) if created else ('users', f'user:{obj.pk}', 'authors')
+    ),
+}
+
+
+def invalidate_instance(sender, instance, created=False, raw=False,
+                        **kwargs):
+    if raw:
+        return
+    bump_tags(*MODEL_TAGS[sender](instance, created))
+
+
+def invalidate_title_genres(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_tags(*MODEL_TAGS[Title](instance, False))
+    elif pk_set:
+        bump_tags('titles', *(f'title:{pk}' for pk in pk_set))
+    else:
+        bump_tags('titles')
+
+
+def connect_signals():
+    for model in MODEL_TAGS:
+        post_save.connect(
+            invalidate_instance, sender=model,
+            dispatch_uid=f'api_cache_save_{model.__name__}'
+        )
+        post_delete.connect(
+            invalidate_instance, sender=model,
+            dispatch_uid=f'api_cache_delete_{model.__name__}'
+        )
+    m2m_changed.connect(
+        invalidate_title_genres, sender=Title.genre.through,
+        dispatch_uid='api_cache_title_genres'
+    )
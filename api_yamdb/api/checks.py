@@ -0,0 +1,55 @@
+"""Проверки настроек API для ``manage.py check --deploy``."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from api.cache import is_local_cache
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии тегов в кеше процесса сбрасываются только в нём самом."""
+    if not is_local_cache(settings.API_CACHE_ALIAS):
+        return []
+    return [Warning(
+        f'Кеш API_CACHE_ALIAS ({settings.API_CACHE_ALIAS!r}) хранится в '
+        'памяти процесса.',
+        hint='Запись сбрасывает версии тегов только в своём процессе, '
+             'остальные отдают старые списки до истечения TIMEOUT. Для '
+             'нескольких процессов укажите общий бэкенд (Redis, '
+             'Memcached, файловый кеш).',
+        id='api.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_sticky_cache(app_configs, **kwargs):
+    """Прилипание к default после записи хранится в кеше API."""
+    if not settings.DATABASE_REPLICAS['ALIASES'] or not is_local_cache(
+        settings.API_CACHE_ALIAS
+    ):
+        return []
+    return [Warning(
+        'Реплики для чтения включены, а кеш API_CACHE_ALIAS хранится в '
+        'памяти процесса.',
+        hint='Отметку о недавней записи видит только процесс, который её '
+             'принял: запросы автора к другим процессам читают с реплики и '
+             'могут не увидеть его изменений. Укажите общий бэкенд кеша.',
+        id='api.W002',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_throttle_cache(app_configs, **kwargs):
+    """Счётчики ограничения частоты в памяти процесса."""
+    if settings.API_THROTTLE['STORE'] == 'cache' and not is_local_cache(
+        settings.API_CACHE_ALIAS
+    ):
+        return []
+    return [Warning(
+        'Счётчики ограничения частоты (API_THROTTLE) хранятся в памяти '
+        'процесса.',
+        hint='Каждый процесс считает запросы сам, и клиент получает лимит, '
+             'умноженный на число процессов. Укажите STORE = "cache" и '
+             'общий бэкенд для API_CACHE_ALIAS.',
+        id='api.W003',
+    )]
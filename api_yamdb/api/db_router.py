@@ -0,0 +1,78 @@
+"""Чтение с реплик базы и «прилипание» к основной базе после записи.
+
+Запись всегда идёт в default. Чтение идёт туда, куда указывает
+``read_alias`` текущего запроса: его выставляет ReplicaReadMixin для
+безопасных методов вьюсетов каталога, а ReplicaRoutingMiddleware
+сбрасывает по окончании запроса. Пользователь, который что-то записал,
+следующие DATABASE_REPLICAS['STICKY_SECONDS'] секунд читает из default,
+чтобы видеть свои изменения, даже если реплика отстаёт.
+
+Ответы и счётчики, прочитанные с реплики, кешируются отдельно от
+прочитанных из default (алиас входит в ключ) и не дольше STICKY_SECONDS:
+иначе автор записи получил бы из общего кеша ответ отстающей реплики.
+
+Отметка о прилипании хранится в кеше API_CACHE_ALIAS. С кешем в памяти
+процесса (LocMemCache) она видна только процессу, который принял
+запись; для нескольких процессов нужен общий кеш (api.W002).
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from api.cache import get_cache
+
+STICKY_KEY = 'api:db:sticky:{}'
+
+# Алиас базы для чтения в текущем запросе; None - default.
+read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS['ALIASES']
+
+
+def choose_replica():
+    aliases = replica_aliases()
+    return random.choice(aliases) if aliases else None
+
+
+def current_read_alias():
+    return read_alias.get() or DEFAULT_DB_ALIAS
+
+
+def read_cache_timeout(timeout):
+    """Срок кеша для данных, прочитанных в текущем запросе."""
+    if read_alias.get() is None:
+        return timeout
+    return min(timeout, settings.DATABASE_REPLICAS['STICKY_SECONDS'])
+
+
+def stick_to_primary(user_id):
+    """После записи пользователь какое-то время читает из default."""
+    get_cache().set(
+        STICKY_KEY.format(user_id), True,
+        settings.DATABASE_REPLICAS['STICKY_SECONDS']
+    )
+
+
+def is_sticky(user_id):
+    return bool(get_cache().get(STICKY_KEY.format(user_id)))
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них связываются свободно.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики репликацией.
+        return db not in replica_aliases()
@@ -1,6 +1,7 @@
 from django_filters import rest_framework as filters
 
 from reviews.models import Title
+from reviews.search import get_search_backend
 
 
 class TitleFilter(filters.FilterSet):
@@ -10,7 +11,12 @@ class TitleFilter(filters.FilterSet):
     category = filters.CharFilter(field_name="category__slug")
     name = filters.CharFilter(field_name="name", lookup_expr="icontains")
     year = filters.NumberFilter(field_name="year")
+    q = filters.CharFilter(method="search")
 
     class Meta:
         model = Title
-        fields = ["genre", "category", "name", "year"]
+        fields = ["genre", "category", "name", "year", "q"]
+
+    def search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        return get_search_backend().search(queryset, value)
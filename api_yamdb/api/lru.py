@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class LRUCache:
+    """Кеш процесса: не больше CACHE_SIZE записей, каждая живёт CACHE_TTL с.
+
+    Размер и время жизни читаются из словаря настройки setting_name при
+    каждой записи, поэтому их можно менять в тестах.
+    """
+
+    def __init__(self, setting_name):
+        self.setting_name = setting_name
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        """Словарь найденных живых записей; промахи в него не попадают."""
+        now = time.monotonic()
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires < now:
+                    del self.entries[key]
+                    continue
+                self.entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, values):
+        config = getattr(settings, self.setting_name)
+        expires = time.monotonic() + config['CACHE_TTL']
+        with self.lock:
+            for key, value in values.items():
+                self.entries[key] = (value, expires)
+                self.entries.move_to_end(key)
+            while len(self.entries) > config['CACHE_SIZE']:
+                self.entries.popitem(last=False)
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def forget(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
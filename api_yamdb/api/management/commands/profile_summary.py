@@ -0,0 +1,65 @@
+import io
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.profiling import COLLAPSED_SUFFIX, PROFILE_SUFFIX, load_profiles
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = 'Сводка профилей запросов к API по действиям вьюсетов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Каталог профилей; по умолчанию API_PROFILING[DIRECTORY].'
+        )
+        parser.add_argument(
+            '--output',
+            help='Куда записать сведённые .prof и .collapsed по действиям.'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Сколько функций показать для каждого действия.'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=SORT_KEYS,
+            default='cumulative',
+            help='Порядок функций в сводке.'
+        )
+
+    def handle(self, *args, **options):
+        """Тело команды."""
+        path = options['path'] or settings.API_PROFILING['DIRECTORY']
+        merged = load_profiles(path)
+        if not merged:
+            self.stdout.write(f'Профилей в {path} нет.')
+            return
+        output = options['output'] and Path(options['output'])
+        if output:
+            output.mkdir(parents=True, exist_ok=True)
+        for key, (stats, stacks, meta) in sorted(
+            merged.items(), key=lambda item: -item[1][2]['seconds']
+        ):
+            samples = meta['samples']
+            mean = meta['seconds'] / samples * 1000 if samples else 0
+            self.stdout.write(
+                f'{key}: выборок {samples}, всего '
+                f'{meta["seconds"]:.3f} с, в среднем {mean:.2f} мс'
+            )
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(options['sort']).print_stats(options['limit'])
+            self.stdout.write(stream.getvalue())
+            if output:
+                stats.dump_stats(output / f'{key}{PROFILE_SUFFIX}')
+                with open(output / f'{key}{COLLAPSED_SUFFIX}', 'w',
+                          encoding='utf-8') as file:
+                    for stack, value in sorted(stacks.items()):
+                        file.write(f'{stack} {value}\n')
@@ -0,0 +1,205 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from api.db_router import read_alias, stick_to_primary
+from api.profiling import action_key
+from api.profiling import logger as profiling_logger
+from api.profiling import profiles, should_profile, start_profiler
+from api.queries import (QueryBudgetExceeded, get_query_budget,
+                         is_batched_action, record_queries)
+
+logger = logging.getLogger('api.queries')
+
+
+class AsyncCapableMiddleware:
+    """Основа middleware, которые работают и под WSGI, и под ASGI.
+
+    В асинхронной цепочке (ASGI) Django ждёт от экземпляра корутину:
+    ``__call__`` вызывает ``acall``, иначе - ``call``, как это делает
+    MiddlewareMixin. Так запрос не уходит в поток только ради
+    middleware. По умолчанию оба метода просто передают запрос дальше.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        return self.get_response(request)
+
+    async def acall(self, request):
+        return await self.get_response(request)
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """Считает SQL-запросы на запрос к API и ищет N+1.
+
+    Проверяется доля запросов SAMPLE_RATE из настройки API_QUERY_BUDGET.
+    Нарушение бюджета ``query_budget`` представления или шаблон запроса,
+    повторённый DUPLICATE_THRESHOLD раз, пишется в лог ``api.queries``,
+    а в режиме STRICT (тесты) приводит к QueryBudgetExceeded. Повторы не
+    ищутся в действиях из ``query_batched_actions`` представления.
+
+    Под ASGI запросы к базе идут из потоков sync_to_async, и перехватчик
+    соединения их не видит: там бюджет не проверяется, о чём при запуске
+    пишется предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async:
+            self.process_view = self.aprocess_view
+            if settings.API_QUERY_BUDGET['ENABLED']:
+                logger.warning(
+                    'Под ASGI бюджет SQL-запросов (API_QUERY_BUDGET) не '
+                    'проверяется.'
+                )
+
+    def call(self, request):
+        config = settings.API_QUERY_BUDGET
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return self.get_response(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder, config)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+        request.query_batched = is_batched_action(
+            view_func, request.query_budget[0]
+        )
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        # В асинхронной цепочке process_view экземпляра - этот метод.
+        QueryBudgetMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
+
+    def check(self, request, recorder, config):
+        action, budget = getattr(request, 'query_budget', (None, None))
+        problems = []
+        if budget is not None and recorder.count > budget:
+            problems.append(
+                f'{recorder.count} запросов при бюджете {budget} '
+                f'({action})'
+            )
+        duplicates = {} if getattr(request, 'query_batched', False) else (
+            recorder.duplicates(config['DUPLICATE_THRESHOLD'])
+        )
+        for template, count in duplicates.items():
+            problems.append(f'{count} раз: {template}')
+        if not problems:
+            return
+        message = (
+            f'{request.method} {request.path}: ' + '; '.join(problems)
+        )
+        if config['STRICT']:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={
+            'path': request.path,
+            'action': action,
+            'queries': recorder.count,
+            'duration': recorder.duration,
+        })
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Границы маршрутизации чтения (api.db_router) на один запрос.
+
+    До запроса чтение идёт в default, после - сбрасывается обратно.
+    Успешный небезопасный запрос аутентифицированного пользователя
+    прилепляет его к default на DATABASE_REPLICAS['STICKY_SECONDS'].
+    """
+
+    def call(self, request):
+        token = read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        self.stick(request, response)
+        return response
+
+    async def acall(self, request):
+        token = read_alias.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        self.stick(request, response)
+        return response
+
+    def stick(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        # Пользователя из JWT в request.user кладёт DRF.
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            stick_to_primary(user.pk)
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """Профилирует выборку запросов к API через cProfile (api.profiling).
+
+    Включается настройкой API_PROFILING['ENABLED']. Профилировщик
+    запускается в process_view, когда известно действие вьюсета, и
+    останавливается, когда ответ готов; файлы профиля пишет фоновый
+    поток api.profiling. Под ASGI профилирование не
+    выполняется: запрос проходит через потоки, а cProfile видит только
+    свой; при запуске об этом пишется предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async:
+            self.process_view = self.aprocess_view
+            if settings.API_PROFILING['ENABLED']:
+                profiling_logger.warning(
+                    'Под ASGI профилирование (API_PROFILING) не выполняется.'
+                )
+
+    def call(self, request):
+        if not settings.API_PROFILING['ENABLED']:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler = getattr(request, 'profiler', None)
+            if profiler is not None:
+                profiler.disable()
+                profiles.add(
+                    request.profile_key, profiler,
+                    time.perf_counter() - started
+                )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        config = settings.API_PROFILING
+        if not config['ENABLED']:
+            return
+        key = action_key(view_func, request.method)
+        if key is None or not should_profile(request, config):
+            return
+        request.profile_key = key
+        request.profiler = start_profiler()
+
+    async def aprocess_view(self, request, view_func, view_args,
+                            view_kwargs):
+        pass
@@ -0,0 +1,288 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import parse_etags
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from api.async_views import CacheMiss, cache_only
+from api.cache import (format_tags, get_cache, get_tag_versions, make_key,
+                       normalized_query, versions_timestamp)
+from api.db_router import (choose_replica, current_read_alias, is_sticky,
+                           read_alias, read_cache_timeout)
+from reviews.models import ScoreRollup
+
+RESPONSE_KEY = 'api:response:{}'
+ETAG_KEY = '"{}"'
+ANONYMOUS_ROLE = 'anonymous'
+
+
+def if_none_match_etags(request):
+    """ETag из If-None-Match без префикса слабых ``W/``."""
+    return [
+        tag[2:] if tag.startswith('W/') else tag
+        for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    ]
+
+
+def is_not_modified(request, etag, last_modified):
+    """Проверяет условные заголовки запроса; If-None-Match важнее.
+
+    ``If-None-Match: *`` здесь не учитывается: он совпадает только с
+    существующим ресурсом, а это видно лишь по ответу (matches_any).
+    """
+    if request.META.get('HTTP_IF_NONE_MATCH'):
+        return etag in if_none_match_etags(request)
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE')
+    )
+    return (
+        if_modified_since is not None and last_modified <= if_modified_since
+    )
+
+
+def matches_any(request):
+    return '*' in if_none_match_etags(request)
+
+
+class CachedListMixin:
+    """Кеширует ответы list и отдаёт для них ETag и Last-Modified.
+
+    Ключ собирается из пути, параметров запроса, роли пользователя и
+    версий тегов ``cache_tags``. Запись в модель меняет версии только
+    своих тегов, поэтому сбрасываются лишь затронутые ответы. Из тех же
+    версий строятся валидаторы: на совпавший If-None-Match ответ 304
+    отдаётся без запроса страницы и сериализатора.
+    """
+
+    cache_tags = ()
+    cached_headers = ('X-Count-Exact',)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, self.cache_tags, request, *args, **kwargs
+        )
+
+    def get_cache_role(self, request):
+        if not request.user.is_authenticated:
+            return ANONYMOUS_ROLE
+        return request.user.role
+
+    def get_cache_parts(self, request, versions):
+        return (
+            request.path,
+            normalized_query(request),
+            request.accepted_media_type,
+            self.get_cache_role(request),
+            # Ответ реплики не должен достаться тому, кто читает default.
+            current_read_alias(),
+            *versions
+        )
+
+    def get_cached_response(self, method, tags, request, *args, **kwargs):
+        if not tags:
+            return self.get_uncached_response(
+                method, request, *args, **kwargs
+            )
+        versions = get_tag_versions(format_tags(tags, self.kwargs))
+        parts = self.get_cache_parts(request, versions)
+        etag = make_key(ETAG_KEY, *parts)
+        last_modified = versions_timestamp(versions)
+        validators = {
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+        }
+        if is_not_modified(request, etag, last_modified):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=validators
+            )
+
+        config = settings.API_RESPONSE_CACHE
+        if not config['ENABLED']:
+            response = self.get_uncached_response(
+                method, request, *args, **kwargs
+            )
+        else:
+            response = self.get_response_from_cache(
+                make_key(RESPONSE_KEY, *parts), config['TIMEOUT'],
+                method, request, *args, **kwargs
+            )
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        if matches_any(request):
+            # Ресурс существует: иначе ответ был бы 404.
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=validators
+            )
+        for header, value in validators.items():
+            response[header] = value
+        return response
+
+    def get_uncached_response(self, method, request, *args, **kwargs):
+        if cache_only.get():
+            # Попытка ответить в цикле событий (api.async_views).
+            raise CacheMiss
+        return method(request, *args, **kwargs)
+
+    def get_response_from_cache(self, key, timeout, method, request, *args,
+                                **kwargs):
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            return Response(data, headers=headers)
+        response = self.get_uncached_response(
+            method, request, *args, **kwargs
+        )
+        if response.status_code == status.HTTP_200_OK:
+            headers = {
+                header: response[header]
+                for header in self.cached_headers if header in response
+            }
+            cache.set(
+                key, (response.data, headers), read_cache_timeout(timeout)
+            )
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """Кеширует также retrieve, с тегами ``detail_cache_tags``."""
+
+    detail_cache_tags = ()
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, self.detail_cache_tags, request, *args, **kwargs
+        )
+
+
+class ParentLookupMixin:
+    """Дочерняя лента (отзывы, комментарии) без запроса родителя.
+
+    Выборка фильтруется по id из URL, а существование родителя
+    проверяется только для пустой страницы, чтобы несуществующий
+    родитель по-прежнему давал 404.
+    """
+
+    parent_model = None
+    parent_url_kwarg = None
+
+    def get_parent_id(self):
+        return self.kwargs[self.parent_url_kwarg]
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page and not self.parent_model.objects.filter(
+            pk=self.get_parent_id()
+        ).exists():
+            raise NotFound
+        return page
+
+
+class ValuesReadMixin:
+    """list и retrieve через ``reader_class`` (api.readers).
+
+    Фильтры, пагинация и проверки прав те же, что у вьюсета, но строки
+    выбираются через ``.values()`` и не проходят через сериализатор.
+    Настройка API_VALUES_READ = False возвращает обычный путь.
+    """
+
+    reader_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_VALUES_READ:
+            return super().list(request, *args, **kwargs)
+        reader = self.reader_class()
+        self.count_queryset = self.filter_queryset(self.get_queryset())
+        queryset = reader.prepare(self.count_queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+        return Response(reader.represent(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.API_VALUES_READ:
+            return super().retrieve(request, *args, **kwargs)
+        reader = self.reader_class()
+        queryset = reader.prepare(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        # Для чтения права не смотрят на поля объекта, поэтому проверке
+        # достаточно словаря строки.
+        self.check_object_permissions(request, row)
+        return Response(reader.represent([row])[0])
+
+
+class ScoreStatsMixin:
+    """Действие stats: распределение оценок из сводки ScoreRollup.
+
+    Фильтр сводки задаёт ``stats_lookup``, значение берётся из URL.
+    Параметр ``days`` - длина периода для свежих оценок.
+    """
+
+    stats_lookup = None
+    stats_cache_tags = ()
+    stats_days_param = 'days'
+    stats_default_days = 30
+    stats_max_days = 365
+
+    @action(detail=True)
+    def stats(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self.get_stats, self.stats_cache_tags, request, *args, **kwargs
+        )
+
+    def get_stats_days(self, request):
+        days = request.query_params.get(
+            self.stats_days_param, self.stats_default_days
+        )
+        try:
+            days = int(days)
+            if not 1 <= days <= self.stats_max_days:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValidationError({self.stats_days_param: (
+                f'Целое число от 1 до {self.stats_max_days}.'
+            )})
+        return days
+
+    def get_stats(self, request, *args, **kwargs):
+        value = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        since = timezone.localdate() - timedelta(
+            days=self.get_stats_days(request) - 1
+        )
+        data = ScoreRollup.objects.filter(
+            **{self.stats_lookup: value}
+        ).distribution(since)
+        # Пустая сводка - либо нет оценок, либо нет самого объекта.
+        if not data['count'] and not self.get_queryset().filter(
+            **{self.lookup_field: value}
+        ).exists():
+            raise NotFound
+        return Response(data)
+
+
+class ReplicaReadMixin:
+    """Безопасные запросы вьюсета читают с реплики (api.db_router).
+
+    Реплика выбирается после аутентификации: сама аутентификация и
+    пользователи, которые недавно писали, читают из default.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            return
+        if request.user.is_authenticated and is_sticky(request.user.pk):
+            return
+        alias = choose_replica()
+        if alias is not None:
+            read_alias.set(alias)
@@ -1,5 +1,266 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.cache import (format_tags, get_cache, get_tag_versions, make_key,
+                       normalized_query)
+from api.db_router import current_read_alias, read_cache_timeout
+
+COUNT_KEY = 'api:count:{}'
+ESTIMATED = 'estimated'
 
 
 class CommentPagination(PageNumberPagination):
     page_size = 10
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """Paginator, который берёт count у переданной функции."""
+
+    def __init__(self, object_list, per_page, count_getter, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_getter = count_getter
+
+    @cached_property
+    def count(self):
+        return self.count_getter(self.object_list)
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная пагинация с кешированным COUNT(*).
+
+    Счётчик хранится в кеше по пути и нормализованным параметрам запроса
+    вместе с версиями тегов вьюсета (``cache_tags``). ``?count=false``
+    отключает подсчёт: ``count`` в ответе равен null.
+    """
+
+    count_query_param = 'count'
+    count_exact_header = 'X-Count-Exact'
+    # Параметры, которые не меняют число объектов в выборке.
+    count_ignored_params = ('page', 'page_size', 'count', 'cursor', 'format')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        self.count_exact = None
+        self.count_disabled = request.query_params.get(
+            self.count_query_param, ''
+        ).lower() in ('false', '0', 'no')
+        if self.count_disabled:
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        # PageNumberPagination создаёт пагинатор вызовом
+        # self.django_paginator_class(queryset, page_size).
+        return CachedCountPaginator(object_list, per_page, self.get_count)
+
+    def get_count_key(self):
+        return make_key(
+            COUNT_KEY,
+            self.request.path,
+            normalized_query(self.request, self.count_ignored_params),
+            current_read_alias()
+        )
+
+    def get_count(self, queryset):
+        # Выборка .values() (api.mixins.ValuesReadMixin) тянет JOIN для
+        # полей ответа; считать строки можно по исходной выборке.
+        count_queryset = getattr(self.view, 'count_queryset', None)
+        if count_queryset is not None:
+            queryset = count_queryset
+        tags = getattr(self.view, 'cache_tags', None)
+        if not tags:
+            self.count_exact = True
+            return queryset.count()
+        config = settings.API_COUNT_CACHE
+        versions = get_tag_versions(format_tags(tags, self.view.kwargs))
+        cache = get_cache()
+        key = self.get_count_key()
+        cached = cache.get(key)
+        if cached is not None:
+            count, cached_versions = cached
+            if cached_versions == versions:
+                self.count_exact = True
+                return count
+            if config['MODE'] == ESTIMATED:
+                self.count_exact = False
+                return count
+        count = queryset.count()
+        cache.set(
+            key, (count, versions), read_cache_timeout(config['TIMEOUT'])
+        )
+        self.count_exact = True
+        return count
+
+    def paginate_without_count(self, queryset, request):
+        """Страница без COUNT(*): следующую выдаёт лишняя строка выборки."""
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='Неверный номер страницы.'
+            ))
+        offset = (page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        if page_number > 1 and not results:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='Страница пуста.'
+            ))
+        self.page_number = page_number
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_next_link(self):
+        if not self.count_disabled:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+            self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if not self.count_disabled:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        count = None if self.count_disabled else self.page.paginator.count
+        response = Response(OrderedDict([
+            ('count', count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+        if self.count_exact is not None:
+            response[self.count_exact_header] = (
+                'true' if self.count_exact else 'false'
+            )
+        return response
+
+
+class FeedPagination(CachedCountPagination):
+    """Пагинация лент отзывов и комментариев.
+
+    По умолчанию работает как PageNumberPagination. Параметр ``cursor``
+    (для первой страницы - пустой) включает курсорный режим по ключу
+    (pub_date, id): страница выбирается по индексу без OFFSET и COUNT(*).
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    forward = 'n'
+    backward = 'p'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        direction, position = self.decode_cursor(request)
+        if direction == self.backward:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).order_by('pub_date', 'id')
+        else:
+            if position is not None:
+                pub_date, pk = position
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+                )
+            queryset = queryset.order_by('-pub_date', '-id')
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if direction == self.backward:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page_results = results
+        return results
+
+    def decode_cursor(self, request):
+        """Возвращает (направление, (pub_date, id) или None)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return self.forward, None
+        try:
+            direction, pub_date, pk = urlsafe_b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            position = (datetime.fromisoformat(pub_date), int(pk))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in (self.forward, self.backward):
+            raise NotFound(self.invalid_cursor_message)
+        return direction, position
+
+    def get_position(self, obj):
+        # Страница может состоять из строк .values() (api.readers).
+        if isinstance(obj, dict):
+            return obj['pub_date'], obj['id']
+        return obj.pub_date, obj.pk
+
+    def encode_cursor(self, direction, obj):
+        pub_date, pk = self.get_position(obj)
+        token = f'{direction}|{pub_date.isoformat()}|{pk}'
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+        )
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not (self.has_next and self.page_results):
+            return None
+        return self.encode_cursor(self.forward, self.page_results[-1])
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not (self.has_previous and self.page_results):
+            return None
+        return self.encode_cursor(self.backward, self.page_results[0])
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
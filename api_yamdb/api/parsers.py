@@ -0,0 +1,49 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from api.renderers import FastJSONRenderer, loads
+
+
+class NDJSONParser(BaseParser):
+    """Поток JSON-объектов по одному в строке; пустые строки пропускаются.
+
+    Тело читается построчно, без копии всего запроса в памяти.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        rows = []
+        reader = codecs.getreader(encoding)(stream)
+        for number, line in enumerate(reader, start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(loads(line))
+            except ValueError as error:
+                raise ParseError(
+                    f'Строка {number}: некорректный JSON ({error})'
+                )
+        return rows
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return loads(content)
+        except ValueError as error:
+            raise ParseError(f'JSON parse error - {error}')
@@ -0,0 +1,270 @@
+"""Профилирование выборки запросов к API через cProfile.
+
+ProfilingMiddleware решает, профилировать ли запрос, в process_view:
+там уже известны маршрут и действие вьюсета. Запрос попадает в выборку,
+если подходит под ROUTES и ROLES настройки API_PROFILING (пустой список -
+любые) и либо несёт заголовок HEADER со значением HEADER_TOKEN, либо
+выпал с вероятностью SAMPLE_RATE. Роль берётся из claims токена
+(api.authentication.token_for_user) без проверки подписи: она решает
+только, профилировать ли, а не права; у токена без claims роли нет.
+Запрос вне выборки стоит одной проверки настройки или нескольких
+сравнений и random().
+
+Профили складываются по действию (``TitlesViewSet.list``) в каталог
+DIRECTORY, отдельно для каждого процесса:
+
+* ``<действие>.<pid>.prof`` - накопленная статистика pstats;
+* ``<действие>.<pid>.collapsed`` - стеки в формате flamegraph.pl
+  (``кадр;кадр;кадр микросекунды``), по строке на путь; время одинаковых
+  стеков всех выборок суммируется, и файл перезаписывается целиком, так
+  что растёт он с числом разных стеков, а не выборок;
+* ``<действие>.<pid>.json`` - число выборок и их суммарное время.
+
+Статистика, стеки и файлы готовятся в фоновом потоке: запрос только
+ставит профилировщик в очередь (не больше QUEUE_SIZE, лишние выборки
+отбрасываются). Ошибки записи пишутся в лог ``api.profiling`` и на ответ
+не влияют.
+
+cProfile записывает не стеки, а рёбра вызовов, поэтому стеки строятся
+обходом графа от корней: время ребра делится между путями пропорционально
+(как в flameprof). Команда profile_summary сводит файлы процессов.
+"""
+import base64
+import binascii
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+from collections import defaultdict
+from pathlib import Path
+from queue import Full, Queue
+
+from django.conf import settings
+
+from api.mixins import ANONYMOUS_ROLE
+
+PROFILE_SUFFIX = '.prof'
+COLLAPSED_SUFFIX = '.collapsed'
+META_SUFFIX = '.json'
+# Ветви дешевле микросекунды и глубже MAX_DEPTH в стеки не попадают.
+MIN_BRANCH_SECONDS = 1e-6
+MAX_DEPTH = 200
+# Сколько выборок может ждать записи.
+QUEUE_SIZE = 100
+
+logger = logging.getLogger('api.profiling')
+
+
+def action_key(view_func, method):
+    """``Класс.действие`` для вьюсета, ``Класс.метод`` для APIView."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None
+    method = method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+def token_role(request):
+    """Роль из claims Bearer-токена без проверки подписи."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, token = header.partition(' ')
+    if scheme != 'Bearer' or token.count('.') != 2:
+        return ANONYMOUS_ROLE
+    payload = token.split('.')[1]
+    try:
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+        )
+    except (binascii.Error, ValueError):
+        return None
+    return claims.get('role') if isinstance(claims, dict) else None
+
+
+def should_profile(request, config):
+    routes = config['ROUTES']
+    if routes and (
+        request.resolver_match is None
+        or request.resolver_match.view_name not in routes
+    ):
+        return False
+    if config['ROLES'] and token_role(request) not in config['ROLES']:
+        return False
+    token = config['HEADER_TOKEN']
+    value = request.headers.get(config['HEADER'])
+    if token and value and hmac.compare_digest(value, token):
+        return True
+    return random.random() < config['SAMPLE_RATE']
+
+
+def frame_label(func):
+    filename, line, name = func
+    if filename == '~':
+        # Встроенная функция: файла и строки нет.
+        label = name
+    else:
+        path = Path(filename)
+        label = f'{name} ({path.parent.name}/{path.name}:{line})'
+    return label.replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """Словарь ``стек -> секунды`` из статистики pstats.Stats."""
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+    roots = [
+        func for func, (_, _, _, _, callers) in stats.stats.items()
+        if not any(caller in stats.stats for caller in callers)
+    ]
+    stacks = defaultdict(float)
+
+    def walk(func, budget, path, seen):
+        _, _, own, cumulative, _ = stats.stats[func]
+        if budget < MIN_BRANCH_SECONDS or len(path) >= MAX_DEPTH:
+            return
+        scale = budget / cumulative if cumulative else 0
+        path = path + (frame_label(func),)
+        if own * scale:
+            stacks[';'.join(path)] += own * scale
+        seen = seen | {func}
+        for child, edge in callees.get(func, {}).items():
+            if child not in seen:
+                walk(child, edge * scale, path, seen)
+
+    for root in roots:
+        walk(root, stats.stats[root][3], (), frozenset())
+    return stacks
+
+
+def write_collapsed(file, stacks):
+    for stack, seconds in sorted(stacks.items()):
+        microseconds = round(seconds * 1e6)
+        if microseconds:
+            file.write(f'{stack} {microseconds}\n')
+
+
+def profile_paths(directory, key, pid):
+    base = Path(directory) / f'{key}.{pid}'
+    return (base.with_name(base.name + PROFILE_SUFFIX),
+            base.with_name(base.name + COLLAPSED_SUFFIX),
+            base.with_name(base.name + META_SUFFIX))
+
+
+class ActionProfiles:
+    """Профили процесса, накопленные по действиям."""
+
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}
+        self.meta = {}
+        self.lock = threading.Lock()
+        self.queue = Queue(maxsize=QUEUE_SIZE)
+        self.worker = None
+        self.worker_lock = threading.Lock()
+
+    def add(self, key, profiler, duration):
+        """Ставит выборку в очередь записи; запрос её не ждёт."""
+        self.start_worker()
+        try:
+            self.queue.put_nowait((key, profiler, duration))
+        except Full:
+            logger.warning('Очередь профилей заполнена, выборка %s '
+                           'отброшена', key)
+
+    def start_worker(self):
+        # После fork поток родителя в дочернем процессе не работает.
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.work, name='api-profiling', daemon=True
+                )
+                self.worker.start()
+
+    def work(self):
+        while True:
+            key, profiler, duration = self.queue.get()
+            try:
+                self.write(key, profiler, duration)
+            except Exception:
+                logger.exception('Не удалось записать профиль %s', key)
+            finally:
+                self.queue.task_done()
+
+    def write(self, key, profiler, duration):
+        stats = pstats.Stats(profiler)
+        stacks = collapsed_stacks(stats)
+        directory = settings.API_PROFILING['DIRECTORY']
+        os.makedirs(directory, exist_ok=True)
+        prof_path, collapsed_path, meta_path = profile_paths(
+            directory, key, os.getpid()
+        )
+        with self.lock:
+            if key in self.stats:
+                self.stats[key].add(stats)
+            else:
+                self.stats[key] = stats
+            total = self.stacks.setdefault(key, defaultdict(float))
+            for stack, seconds in stacks.items():
+                total[stack] += seconds
+            meta = self.meta.setdefault(key, {'samples': 0, 'seconds': 0.0})
+            meta['samples'] += 1
+            meta['seconds'] += duration
+            self.stats[key].dump_stats(prof_path)
+            with open(collapsed_path, 'w', encoding='utf-8') as file:
+                write_collapsed(file, total)
+            with open(meta_path, 'w', encoding='utf-8') as file:
+                json.dump(meta, file)
+
+    def flush(self):
+        """Ждёт записи всех выборок из очереди."""
+        self.queue.join()
+
+    def clear(self):
+        self.flush()
+        with self.lock:
+            self.stats.clear()
+            self.stacks.clear()
+            self.meta.clear()
+
+
+profiles = ActionProfiles()
+
+
+def start_profiler():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def load_profiles(directory):
+    """Сводит файлы всех процессов: действие -> (Stats, стеки, meta)."""
+    merged = {}
+    for prof_path in sorted(Path(directory).glob('*' + PROFILE_SUFFIX)):
+        key, _, pid = prof_path.name[:-len(PROFILE_SUFFIX)].rpartition('.')
+        if not key or not pid.isdigit():
+            continue
+        _, collapsed_path, meta_path = profile_paths(directory, key, pid)
+        stats, stacks, meta = merged.setdefault(
+            key, (None, defaultdict(int), {'samples': 0, 'seconds': 0.0})
+        )
+        stats = pstats.Stats(str(prof_path)) if stats is None else (
+            stats.add(str(prof_path))
+        )
+        if collapsed_path.exists():
+            with open(collapsed_path, encoding='utf-8') as file:
+                for line in file:
+                    stack, _, value = line.rstrip('\n').rpartition(' ')
+                    stacks[stack] += int(value)
+        if meta_path.exists():
+            with open(meta_path, encoding='utf-8') as file:
+                process_meta = json.load(file)
+            meta['samples'] += process_meta['samples']
+            meta['seconds'] += process_meta['seconds']
+        merged[key] = (stats, stacks, meta)
+    return merged
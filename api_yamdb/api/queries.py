@@ -0,0 +1,112 @@
+"""Учёт SQL-запросов одного запроса к API.
+
+Запросы перехватываются через ``connection.execute_wrapper`` на всех
+соединениях, поэтому работают без DEBUG. Повторы ищутся по шаблону
+запроса: числа и списки параметров IN (...) заменяются заглушками, так
+что N+1 выглядит как один шаблон, выполненный много раз.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+NUMBER_RE = re.compile(r'\b\d+\b')
+PLACEHOLDERS_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+# Управление транзакциями не бывает N+1, даже если повторяется.
+TRANSACTION_RE = re.compile(
+    r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запрос к API выполнил больше SQL-запросов, чем разрешено."""
+
+
+def normalize_sql(sql):
+    """Шаблон запроса без конкретных значений."""
+    sql = STRING_RE.sub('?', sql)
+    sql = PLACEHOLDERS_RE.sub('(...)', sql)
+    return NUMBER_RE.sub('?', sql)
+
+
+class QueryRecorder:
+    """Обёртка для execute_wrapper: запоминает запросы и их время."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((
+                context['connection'].alias, sql,
+                time.perf_counter() - started
+            ))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def templates(self):
+        return Counter(
+            normalize_sql(sql) for _, sql, _ in self.queries
+            if not TRANSACTION_RE.match(sql)
+        )
+
+    def duplicates(self, threshold):
+        """Шаблоны, выполненные не меньше threshold раз."""
+        return {
+            template: count
+            for template, count in self.templates().items()
+            if count >= threshold
+        }
+
+
+@contextmanager
+def record_queries():
+    """Записывает запросы ко всем базам внутри блока.
+
+        with record_queries() as recorder:
+            client.get(url)
+        assert recorder.count <= 3
+    """
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def get_query_budget(view_func, method):
+    """Бюджет запросов представления для HTTP-метода.
+
+    Бюджет объявляется атрибутом ``query_budget``: словарём по действию
+    вьюсета (``list``, ``retrieve``...) или по HTTP-методу в нижнем
+    регистре для APIView.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if not budget:
+        return None, None
+    method = method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method, method)
+    return action, budget.get(action)
+
+
+def is_batched_action(view_func, action):
+    """Действие пишет данные пачками, и повтор шаблона для него не N+1.
+
+    Такие действия перечисляются в атрибуте ``query_batched_actions``.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    return action in getattr(view_class, 'query_batched_actions', ())
@@ -3,12 +3,14 @@ import datetime as dt
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.shortcuts import get_object_or_404
-from rest_framework_simplejwt.tokens import AccessToken
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 
 from reviews.models import User, Category, Genres, Title, Review, Comment
 from reviews.constants import MAX_LENGTH_NAME, MAX_LENGTH_EMAIL
+from reviews.outbox import enqueue_email
+from api.authentication import token_for_user
+from api.slugs import CachedSlugRelatedField, stale_slugs
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -61,59 +63,72 @@ class SignUpSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError(
-                {'detail': 'User with this email already exists.'}
-            )
-        return value
-
     def validate(self, data):
-        username = data.get('username')
-        if User.objects.filter(username=username).exists():
-            raise serializers.ValidationError(
-                {'detail': 'User with this username already exists.'}
-            )
+        # Один запрос вместо отдельных проверок username и email: любой
+        # найденный пользователь либо тот же самый, либо конфликт.
+        users = list(User.objects.filter(
+            Q(username=data['username']) | Q(email=data['email'])
+        )[:2])
+        for user in users:
+            if user.username != data['username']:
+                raise serializers.ValidationError(
+                    {'email': 'User with this email already exists.'}
+                )
+            if user.email != data['email']:
+                raise serializers.ValidationError(
+                    {'username': 'User with this username already exists.'}
+                )
+        if users:
+            # Повторная регистрация: пользователь получит новый код.
+            self.instance = users[0]
         return data
 
     class Meta:
         model = User
         lookup_field = 'username'
         fields = ('email', 'username')
-
-        validators = [
-            serializers.UniqueTogetherValidator(
-                queryset=User.objects.all(),
-                fields=('username', 'email',),
-                message=('Такой пользователь уже зарегистрирован.')
+        # Уникальность проверяет validate и ограничения базы.
+        validators = []
+
+    def send_code(self, save_user):
+        """Сохраняет пользователя с новым кодом и ставит письмо в очередь.
+
+        Гонку двух одновременных регистраций ловят уникальные индексы:
+        проигравший запрос получает 400, а не 500.
+        """
+        confirmation_code = str(random.randint(100000, 999999))
+        try:
+            with transaction.atomic():
+                user = save_user(confirmation_code)
+                # Письмо уходит через очередь, запрос не ждёт почтовый
+                # сервер.
+                enqueue_email(
+                    subject=f'Подтверждение регистрации {user.username}',
+                    message=f'Ваш код подтверждения: {confirmation_code}',
+                    recipient_list=[user.email],
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'detail': 'Такой пользователь уже зарегистрирован.'}
             )
-        ]
+        return user
 
     def create(self, validated_data):
-        email = validated_data.get('email')
-        username = validated_data.get('username')
-        confirmation_code = random.randint(100000, 999999)
-
-        user, created = User.objects.get_or_create(
-            username=username,
-            email=email,
-            defaults={'confirmation_code': confirmation_code}
+        return self.send_code(
+            lambda code: User.objects.create(
+                **validated_data, confirmation_code=code
+            )
         )
 
-        if not created:
-            raise serializers.ValidationError(
-                {'detail': 'Такой пользователь уже зарегистрирован.'}
+    def update(self, instance, validated_data):
+        def save_user(code):
+            User.objects.filter(pk=instance.pk).update(
+                confirmation_code=code
             )
+            instance.confirmation_code = code
+            return instance
 
-        send_mail(
-            subject=f'Подтверждение регистрации {username}',
-            message=f'Ваш код подтверждения: {confirmation_code}',
-            from_email=f'{settings.EMAIL_SENDER}',
-            recipient_list=[validated_data['email']],
-            fail_silently=False
-        )
-
-        return user
+        return self.send_code(save_user)
 
 
 class TokenSerializer(serializers.ModelSerializer):
@@ -135,7 +150,7 @@ class TokenSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Введен неправильный код подтверждения')
 
-        access = AccessToken.for_user(user)
+        access = token_for_user(user)
 
         return {'token': access}
 
@@ -162,10 +177,10 @@ class GenreSerializer(serializers.ModelSerializer):
 class TitlesSerializer(serializers.ModelSerializer):
     """Основной метод записи информации."""
 
-    category = serializers.SlugRelatedField(
+    category = CachedSlugRelatedField(
         slug_field='slug', many=False, queryset=Category.objects.all()
     )
-    genre = serializers.SlugRelatedField(
+    genre = CachedSlugRelatedField(
         slug_field='slug',
         many=True,
         required=False,
@@ -173,9 +188,26 @@ class TitlesSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        exclude = ('rating_sum', 'rating_count')
         model = Title
 
+    def create(self, validated_data):
+        # SQLite проверяет внешние ключи при коммите, поэтому stale_slugs
+        # снаружи транзакции.
+        with stale_slugs(self, dict(validated_data)), transaction.atomic():
+            genres = validated_data.pop('genre', [])
+            title = Title.objects.create(**validated_data)
+            title.set_genres(genres, created=True)
+        return title
+
+    def update(self, instance, validated_data):
+        with stale_slugs(self, dict(validated_data)), transaction.atomic():
+            genres = validated_data.pop('genre', None)
+            instance = super().update(instance, validated_data)
+            if genres is not None:
+                instance.set_genres(genres)
+        return instance
+
     def validate_year(self, value):
         current_year = dt.date.today().year
         if value > current_year:
@@ -188,7 +220,7 @@ class TitlesViewSerializer(serializers.ModelSerializer):
 
     category = CategorySerializer(many=False, required=True)
     genre = GenreSerializer(many=True, required=False)
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         fields = (
@@ -0,0 +1,165 @@
+"""Кеш slug -> id категорий и жанров для записи произведений.
+
+Категорий и жанров немного, и меняются они редко, поэтому при создании
+и изменении произведения slug из запроса ищутся в LRU-кеше процесса, а
+все промахи добираются одним запросом ``slug__in``. Запись в Category
+или Genres очищает кеш своей модели в этом процессе; другие процессы
+увидят изменение не позже чем через SLUG_CACHE['CACHE_TTL'] секунд.
+Если за это время запись удалили, вставка упадёт на внешнем ключе:
+stale_slugs очищает кеш, заново разрешает slug и отвечает 400.
+"""
+from contextlib import contextmanager
+
+from django.db import IntegrityError
+from django.db.models.signals import post_delete, post_save
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from api.lru import LRUCache
+from reviews.models import Category, Genres
+
+
+class SlugResolver:
+
+    def __init__(self, model, slug_field='slug'):
+        self.model = model
+        self.slug_field = slug_field
+        self.cache = LRUCache('SLUG_CACHE')
+
+    def resolve(self, slugs):
+        """Словарь slug -> id; несуществующих slug в нём нет."""
+        found = self.cache.get_many(slugs)
+        missing = set(slugs) - set(found)
+        if missing:
+            loaded = dict(self.model.objects.filter(
+                **{f'{self.slug_field}__in': missing}
+            ).values_list(self.slug_field, 'pk'))
+            self.cache.set_many(loaded)
+            found.update(loaded)
+        return found
+
+    def instance(self, slug, pk):
+        """Экземпляр модели только с id и slug, без запроса к базе."""
+        instance = self.model(pk=pk, **{self.slug_field: slug})
+        instance._state.adding = False
+        return instance
+
+    def forget_all(self, sender, **kwargs):
+        # Старый slug переименованной записи неизвестен, поэтому
+        # очищается весь кеш модели.
+        self.cache.clear()
+
+
+resolvers = {
+    Category: SlugResolver(Category),
+    Genres: SlugResolver(Genres),
+}
+
+
+class ManyCachedSlugRelatedField(ManyRelatedField):
+    """Список slug, разрешаемый одним обращением к кешу и базе."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.to_internal_values(data)
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который ищет id через SlugResolver."""
+
+    def get_resolver(self):
+        return resolvers[self.get_queryset().model]
+
+    def resolve(self, slugs):
+        # Массовая загрузка разрешает slug всех строк заранее и передаёт
+        # словари в контексте, чтобы строки не ходили в базу по одной.
+        preloaded = self.context.get('slug_ids', {})
+        model = self.get_queryset().model
+        if model in preloaded:
+            return preloaded[model]
+        return self.get_resolver().resolve(slugs)
+
+    def to_internal_values(self, data):
+        slugs = []
+        for value in data:
+            if not isinstance(value, (str, int)):
+                self.fail('invalid')
+            slugs.append(str(value))
+        resolver = self.get_resolver()
+        ids = self.resolve(slugs)
+        for slug in slugs:
+            if slug not in ids:
+                self.fail(
+                    'does_not_exist', slug_name=self.slug_field, value=slug
+                )
+        return [resolver.instance(slug, ids[slug]) for slug in slugs]
+
+    def to_internal_value(self, data):
+        return self.to_internal_values([data])[0]
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return ManyCachedSlugRelatedField(**list_kwargs)
+
+
+def forget_all():
+    for resolver in resolvers.values():
+        resolver.cache.clear()
+
+
+def stale_slug_errors(serializer, data):
+    """Ошибки полей, slug которых уже нет в базе."""
+    errors = {}
+    for name, field in serializer.fields.items():
+        relation = getattr(field, 'child_relation', field)
+        if not isinstance(relation, CachedSlugRelatedField) or (
+            data.get(name) is None
+        ):
+            continue
+        instances = data[name] if isinstance(data[name], list) else [
+            data[name]
+        ]
+        slugs = [
+            getattr(instance, relation.slug_field) for instance in instances
+        ]
+        ids = relation.get_resolver().resolve(slugs)
+        message = relation.error_messages['does_not_exist']
+        missing = [
+            message.format(slug_name=relation.slug_field, value=slug)
+            for slug in slugs if slug not in ids
+        ]
+        if missing:
+            errors[name] = missing
+    return errors
+
+
+@contextmanager
+def stale_slugs(serializer, data):
+    """Ошибка внешнего ключа из-за устаревшего кеша - ответ 400."""
+    try:
+        yield
+    except IntegrityError:
+        forget_all()
+        errors = stale_slug_errors(serializer, data)
+        if not errors:
+            raise
+        raise serializers.ValidationError(errors)
+
+
+def connect_signals():
+    for model, resolver in resolvers.items():
+        post_save.connect(
+            resolver.forget_all, sender=model,
+            dispatch_uid=f'slug_cache_save_{model.__name__}'
+        )
+        post_delete.connect(
+            resolver.forget_all, sender=model,
+            dispatch_uid=f'slug_cache_delete_{model.__name__}'
+        )
@@ -0,0 +1,52 @@
+"""Настройка соединений SQLite для работы под нагрузкой.
+
+При каждом новом соединении к SQLite выполняются PRAGMA из
+``settings.SQLITE['PRAGMAS']``: WAL, чтобы читатели не ждали писателя,
+busy_timeout, synchronous=NORMAL, mmap и размер кеша страниц. Для базы
+в памяти (тесты) journal_mode и mmap_size не применяются.
+
+SQLite допускает одного писателя. Django открывает транзакции как
+DEFERRED, и соединение, начавшее транзакцию с чтения, при записи может
+сразу получить "database is locked", не дожидаясь busy_timeout. При
+SERIALIZE_WRITES=True транзакции (transaction.atomic) начинаются с BEGIN
+IMMEDIATE: блокировку записи берёт сама SQLite в начале транзакции, а
+отпускает COMMIT или ROLLBACK. Писатели всех процессов и потоков ждут
+друг друга по busy_timeout, а чтение вне транзакций идёт параллельно.
+Запись без транзакции - это один оператор, ему хватает busy_timeout.
+"""
+import types
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Не имеют смысла для базы в памяти.
+FILE_ONLY_PRAGMAS = ('journal_mode', 'mmap_size')
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    in_memory = connection.is_in_memory_db()
+    # Напрямую через sqlite3: служебные PRAGMA не попадают ни в
+    # execute_wrapper, ни в бюджет запросов первого запроса соединения.
+    for name, value in settings.SQLITE['PRAGMAS'].items():
+        if in_memory and name in FILE_ONLY_PRAGMAS:
+            continue
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    connection._start_transaction_under_autocommit = types.MethodType(
+        start_transaction, connection
+    )
+
+
+def start_transaction(connection):
+    """Замена DatabaseWrapper._start_transaction_under_autocommit."""
+    if settings.SQLITE['SERIALIZE_WRITES']:
+        connection.cursor().execute('BEGIN IMMEDIATE')
+    else:
+        connection.cursor().execute('BEGIN')
+
+
+def connect_signals():
+    connection_created.connect(
+        configure_connection, dispatch_uid='api.sqlite.configure_connection'
+    )
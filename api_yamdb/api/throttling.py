@@ -0,0 +1,216 @@
+"""Ограничение частоты регистрации, выдачи токена и записи отзывов.
+
+Скользящее окно по двум счётчикам: текущего и предыдущего интервала
+длиной в период ставки. Оценка числа запросов за последний период -
+``предыдущий * (1 - доля прошедшего интервала) + текущий``; она точнее
+фиксированного окна и не даёт удвоенного всплеска на границе интервалов.
+
+Счётчики хранит STORE из настройки API_THROTTLE:
+
+* ``local`` - словарь в памяти процесса, без обращений к кешу; каждый
+  процесс считает свои запросы, и лимит умножается на число процессов;
+* ``cache`` - кеш api.cache.get_cache(). Общим для процессов он будет,
+  только если API_CACHE_ALIAS - общий бэкенд (иначе - api.W003). Оба
+  счётчика упакованы в одно целое ``предыдущий << 32 | текущий``, и
+  проверка - это один ``incr``. Исключение - первый в процессе запрос
+  клиента за интервал: он дочитывает предыдущий счётчик (``get``) и
+  создаёт ключ (``add``), а если ключ уже создал другой процесс -
+  делает ещё ``incr``. Это два-три обращения вместо одного, раз в
+  интервал на клиента и процесс: в API кеша Django нет операции,
+  которая создала бы ключ со значением из другого ключа.
+
+Клиент без пользователя определяется по адресу DRF get_ident: при
+NUM_PROXIES = 0 это REMOTE_ADDR, и X-Forwarded-For от клиента ничего не
+меняет. За обратным прокси NUM_PROXIES - число прокси перед Django.
+
+Отклонённые запросы тоже считаются, так что непрерывный поток ботов
+остаётся заблокированным. Время до следующей попытки уходит клиенту в
+заголовке Retry-After (его ставит DRF по ``wait()``).
+"""
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.cache import get_cache
+
+THROTTLE_KEY = 'api:throttle:{}:{}:{}'
+SHIFT = 32
+MASK = (1 << SHIFT) - 1
+
+
+class LocalStore:
+    """Счётчики процесса, не больше LOCAL_SIZE клиентов."""
+
+    def __init__(self):
+        self.counters = OrderedDict()
+        self.lock = threading.Lock()
+
+    def hit(self, scope, ident, window, duration):
+        key = (scope, ident)
+        with self.lock:
+            stored_window, previous, current = self.counters.pop(
+                key, (window, 0, 0)
+            )
+            if stored_window == window - 1:
+                previous, current = current, 0
+            elif stored_window != window:
+                previous, current = 0, 0
+            current += 1
+            self.counters[key] = (window, previous, current)
+            while len(self.counters) > settings.API_THROTTLE['LOCAL_SIZE']:
+                self.counters.popitem(last=False)
+        return previous, current
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+
+
+class CacheStore:
+    """Счётчики в общем кеше: incr, в начале интервала - get и add.
+
+    Процесс помнит, какой интервал клиента уже видел (не больше
+    LOCAL_SIZE клиентов), чтобы первый запрос интервала не начинался с
+    заведомо неудачного incr.
+    """
+
+    def __init__(self):
+        self.windows = OrderedDict()
+        self.lock = threading.Lock()
+
+    def hit(self, scope, ident, window, duration):
+        cache = get_cache()
+        key = THROTTLE_KEY.format(scope, ident, window)
+        if self.seen(scope, ident, window):
+            try:
+                return self.unpack(cache.incr(key))
+            except ValueError:
+                # Ключ вытеснен из кеша или кеш очищен.
+                pass
+        return self.unpack(
+            self.start_window(cache, scope, ident, window, duration)
+        )
+
+    def unpack(self, value):
+        return value >> SHIFT, value & MASK
+
+    def seen(self, scope, ident, window):
+        """Отмечает интервал клиента; True, если он уже был отмечен."""
+        key = (scope, ident)
+        with self.lock:
+            seen = self.windows.pop(key, None) == window
+            self.windows[key] = window
+            while len(self.windows) > settings.API_THROTTLE['LOCAL_SIZE']:
+                self.windows.popitem(last=False)
+        return seen
+
+    def start_window(self, cache, scope, ident, window, duration):
+        previous = cache.get(THROTTLE_KEY.format(scope, ident, window - 1), 0)
+        value = (previous & MASK) << SHIFT | 1
+        # Ключ живёт и следующий интервал, где он станет предыдущим.
+        if cache.add(THROTTLE_KEY.format(scope, ident, window), value,
+                     2 * duration):
+            return value
+        # Другой процесс успел создать ключ первым.
+        return cache.incr(THROTTLE_KEY.format(scope, ident, window))
+
+    def clear(self):
+        with self.lock:
+            self.windows.clear()
+
+
+stores = {
+    'local': LocalStore(),
+    'cache': CacheStore(),
+}
+
+
+def get_store():
+    return stores[settings.API_THROTTLE['STORE']]
+
+
+def estimate(previous, current, elapsed):
+    """Оценка запросов за последний период; elapsed - доля интервала."""
+    return previous * (1 - elapsed) + current
+
+
+def seconds_until_allowed(previous, current, elapsed, rate, duration):
+    """Через сколько секунд оценка освободит место под один запрос."""
+    room = rate - 1
+    if current <= room and previous:
+        # Место освобождается ещё в текущем интервале.
+        share = 1 - (room - current) / previous
+        if share <= 1:
+            return max(share - elapsed, 0) * duration
+    # В следующем интервале текущий счётчик станет предыдущим.
+    share = max(1 - room / current, 0) if current else 0
+    return (1 - elapsed + share) * duration
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Скользящее окно поверх хранилища get_store().
+
+    Ставка берётся из DEFAULT_THROTTLE_RATES по ``scope`` при каждом
+    запросе, поэтому её можно менять в настройках тестов.
+    """
+
+    def __init__(self):
+        # Ставку SimpleRateThrottle читает здесь один раз; у нас - в
+        # allow_request.
+        pass
+
+    def get_ident_for(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(rate)
+        window, offset = divmod(self.timer(), self.duration)
+        elapsed = offset / self.duration
+        previous, current = get_store().hit(
+            self.scope, self.get_ident_for(request), int(window),
+            self.duration
+        )
+        if estimate(previous, current, elapsed) <= self.num_requests:
+            return True
+        self.retry_after = seconds_until_allowed(
+            previous, current, elapsed, self.num_requests, self.duration
+        )
+        return False
+
+    def wait(self):
+        return math.ceil(self.retry_after)
+
+
+class SignupThrottle(SlidingWindowThrottle):
+    scope = 'signup'
+
+
+class TokenThrottle(SlidingWindowThrottle):
+    scope = 'token'
+
+
+class WriteThrottle(SlidingWindowThrottle):
+    """Считает только небезопасные запросы к вьюсету."""
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+class ReviewWriteThrottle(WriteThrottle):
+    scope = 'review_write'
+
+
+class CommentWriteThrottle(WriteThrottle):
+    scope = 'comment_write'
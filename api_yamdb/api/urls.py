@@ -7,7 +7,8 @@ from api.views import (
     ReviewViewSet,
     TitlesViewSet,
     UsersViewSet,
-    CommentViewSet
+    CommentViewSet,
+    Export
 )
 
 app_name = 'api'
@@ -28,5 +29,10 @@ router.register(
     basename='comments',
 )
 urlpatterns = [
+    path(
+        'v1/export/<slug:name>.<slug:export_format>',
+        Export.as_view(),
+        name='export'
+    ),
     path('v1/', include(router.urls)),
 ]
@@ -1,21 +1,40 @@
-from django.db.models import Avg
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status, generics, filters, mixins
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly
 )
 
-from reviews.models import User, Category, Genres, Title, Review
-from api.paginator import CommentPagination
+from reviews.export import (CONTENT_TYPES, FORMATS, ThreadedChunks,
+                            export_lines)
+from reviews.models import User, Category, Comment, Genres, Title, Review
+from api.paginator import (
+    CachedCountPagination,
+    CommentPagination,
+    FeedPagination
+)
+from api.async_views import AsyncReadMixin
+from api.authentication import load_full_user
+from api.bulk import load_titles
 from api.filters import TitleFilter
+from api.mixins import (CachedListMixin, CachedResponseMixin,
+                        ParentLookupMixin, ReplicaReadMixin, ScoreStatsMixin,
+                        ValuesReadMixin)
+from api.parsers import FastJSONParser, NDJSONParser
+from api.readers import CommentReader, ReviewReader, TitleReader
+from api.throttling import (CommentWriteThrottle, ReviewWriteThrottle,
+                            SignupThrottle, TokenThrottle)
 from .serializers import (
     UserSerializer,
     SignUpSerializer,
@@ -47,7 +66,16 @@ class UsersViewSet(viewsets.ModelViewSet):
     http_method_names = HTTP_METHODS
     filter_backends = [SearchFilter]
     search_fields = ('username',)
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
+    cache_tags = ('users',)
+    query_budget = {
+        'list': 3,
+        'retrieve': 2,
+        'create': 4,
+        'partial_update': 3,
+        'user_detail': 2,
+        'user_detail_patch': 4,
+    }
 
     def perform_create(self, serializer):
         serializer.save()
@@ -59,13 +87,13 @@ class UsersViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def user_detail(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(load_full_user(request.user))
         return Response(serializer.data)
 
     @user_detail.mapping.patch
     def user_detail_patch(self, request):
         serializer = RoleSerializer(
-            request.user,
+            load_full_user(request.user),
             data=request.data,
             partial=True
         )
@@ -77,22 +105,10 @@ class UsersViewSet(viewsets.ModelViewSet):
 class Signup(generics.CreateAPIView):
     serializer_class = SignUpSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [SignupThrottle]
+    query_budget = {'post': 6}
 
     def post(self, request, *args, **kwargs):
-        username = request.data.get('username', '')
-
-        email = request.data.get('email')
-        username = request.data.get('username')
-
-        if (
-            username and User.objects.filter(username=username).exists()
-            and email and User.objects.filter(email=email).exists()
-        ):
-            return Response(
-                {'detail': 'User already exists.'},
-                status=status.HTTP_200_OK
-            )
-
         if request.user.is_authenticated and request.user.is_staff:
             return Response(
                 {'detail': 'Admin users registered successfully.'},
@@ -101,38 +117,42 @@ class Signup(generics.CreateAPIView):
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-
-        user = serializer.save()
-        if user:
-            return Response(request.data, status=status.HTTP_200_OK)
-
-        response_data = {
-            'email': user.email,
-            'username': user.username,
-        }
-
-        return Response(response_data, status=status.HTTP_201_CREATED)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class Token(APIView):
+    throttle_classes = [TokenThrottle]
+    query_budget = {'post': 1}
 
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        return Response(serializer.validated_data)
+        return Response(serializer.data)
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Title
-        .objects
-        .annotate(rating=Avg('reviews__score'))
-        .prefetch_related('genre')
+class TitlesViewSet(AsyncReadMixin, ReplicaReadMixin, CachedResponseMixin,
+                    ValuesReadMixin, ScoreStatsMixin, viewsets.ModelViewSet):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre'
     )
     serializer_class = TitlesSerializer
+    reader_class = TitleReader
     permission_classes = [IsAdminOrReadOnly]
     http_method_names = HTTP_METHODS
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
+    cache_tags = ('titles',)
+    detail_cache_tags = ('title:{pk}', 'catalog')
+    query_budget = {
+        'list': 4,
+        'retrieve': 3,
+        'create': 9,
+        'partial_update': 13,
+        'stats': 3,
+    }
+    query_batched_actions = ('bulk',)
+    stats_lookup = 'title_id'
+    stats_cache_tags = ('title:{pk}:reviews',)
     filterset_class = TitleFilter
     filter_backends = (DjangoFilterBackend,)
 
@@ -141,8 +161,36 @@ class TitlesViewSet(viewsets.ModelViewSet):
             return TitlesViewSerializer
         return TitlesSerializer
 
+    @action(
+        detail=False,
+        methods=['post'],
+        parser_classes=[FastJSONParser, NDJSONParser],
+    )
+    def bulk(self, request):
+        """Создаёт произведения из JSON-массива или NDJSON."""
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            raise ValidationError(
+                {'detail': 'Ожидается непустой список произведений.'}
+            )
+        max_rows = settings.TITLES_BULK['MAX_ROWS']
+        if len(rows) > max_rows:
+            raise ValidationError(
+                {'detail': f'Не больше {max_rows} произведений за запрос.'}
+            )
+        report = load_titles(rows)
+        if not report['created']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        if report['failed']:
+            return Response(report, status=status.HTTP_200_OK)
+        return Response(report, status=status.HTTP_201_CREATED)
+
 
 class ReviewGenreModelMixin(
+    AsyncReadMixin,
+    ReplicaReadMixin,
+    CachedListMixin,
+    ScoreStatsMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -155,42 +203,91 @@ class ReviewGenreModelMixin(
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name', 'slug')
     lookup_field = 'slug'
+    query_budget = {'list': 3, 'create': 3, 'destroy': 5, 'stats': 3}
 
 
 class CategoriesViewSet(ReviewGenreModelMixin):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_tags = ('categories',)
+    stats_lookup = 'title__category__slug'
+    stats_cache_tags = ('titles', 'categories')
 
 
 class GenresViewSet(ReviewGenreModelMixin):
     queryset = Genres.objects.all()
     serializer_class = GenreSerializer
     pagination_class = CommentPagination
+    cache_tags = ('genres',)
+    stats_lookup = 'title__genre__slug'
+    stats_cache_tags = ('titles', 'genres')
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(AsyncReadMixin, ReplicaReadMixin, ParentLookupMixin,
+                    CachedResponseMixin, ValuesReadMixin,
+                    viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    reader_class = ReviewReader
     permission_classes = (IsAuthorOrReadOnly | IsModeratorOrReadOnly
                           | IsAdminOrReadOnly,)
+    throttle_classes = [ReviewWriteThrottle]
     http_method_names = HTTP_METHODS
+    pagination_class = FeedPagination
+    cache_tags = ('title:{title_id}:reviews', 'authors')
+    detail_cache_tags = ('review:{pk}', 'authors')
+    parent_model = Title
+    parent_url_kwarg = 'title_id'
+    query_budget = {
+        'list': 3,
+        'retrieve': 2,
+        'create': 7,
+        'partial_update': 7,
+        'destroy': 8,
+    }
 
     def get_title_id(self):
         title_id = self.kwargs.get('title_id')
         return get_object_or_404(Title, pk=title_id)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, title=self.get_title_id())
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
     def get_queryset(self):
-        title = self.get_title_id()
-        return title.reviews.select_related('author', 'title')
+        return Review.objects.filter(
+            title_id=self.get_parent_id()
+        ).select_related('author')
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(AsyncReadMixin, ReplicaReadMixin, ParentLookupMixin,
+                     CachedResponseMixin, ValuesReadMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    reader_class = CommentReader
     permission_classes = (IsAuthorOrReadOnly | IsModeratorOrReadOnly
                           | IsAdminOrReadOnly,)
+    throttle_classes = [CommentWriteThrottle]
     http_method_names = HTTP_METHODS
+    pagination_class = FeedPagination
+    cache_tags = ('review:{review_id}:comments', 'authors')
+    detail_cache_tags = ('comment:{pk}', 'authors')
+    parent_model = Review
+    parent_url_kwarg = 'review_id'
+    query_budget = {
+        'list': 3,
+        'retrieve': 2,
+        'create': 3,
+        'partial_update': 3,
+        'destroy': 4,
+    }
 
     def get_review_id(self):
         review_id = self.kwargs.get('review_id')
@@ -200,5 +297,34 @@ class CommentViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user, review=self.get_review_id())
 
     def get_queryset(self):
-        review = self.get_review_id()
-        return review.comments.select_related('author', 'review')
+        return Comment.objects.filter(
+            review_id=self.get_parent_id()
+        ).select_related('author')
+
+
+class Export(APIView):
+    """Потоковая выгрузка таблицы в CSV или NDJSON для администратора."""
+
+    permission_classes = [IsAdmin]
+    # Строки читаются уже после выхода из представления, при отдаче ответа.
+    query_budget = {'get': 1}
+    files = {
+        'titles': 'titles.csv',
+        'reviews': 'review.csv',
+        'comments': 'comments.csv',
+    }
+
+    def get(self, request, name, export_format):
+        if name not in self.files or export_format not in FORMATS:
+            raise NotFound('Такой выгрузки нет.')
+        lines = export_lines(self.files[name], export_format)
+        if isinstance(request._request, ASGIRequest):
+            # Ответ перебирается в цикле событий, где ORM недоступен.
+            lines = ThreadedChunks(lines)
+        response = StreamingHttpResponse(
+            lines, content_type=CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.{export_format}"'
+        )
+        return response
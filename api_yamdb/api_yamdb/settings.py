@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -28,6 +29,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,6 +71,33 @@ DATABASES = {
     }
 }
 
+# PRAGMA для каждого нового соединения с SQLite (api.sqlite).
+# SERIALIZE_WRITES: транзакции начинаются с BEGIN IMMEDIATE и пишут по
+# одной - во всех процессах, которые работают с этим файлом базы.
+SQLITE = {
+    'PRAGMAS': {
+        'journal_mode': 'wal',
+        'busy_timeout': 5000,
+        'synchronous': 'normal',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+    },
+    'SERIALIZE_WRITES': False,
+}
+
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+
+# Реплики для чтения: алиасы из DATABASES, копии default. GET-запросы
+# вьюсетов каталога и отзывов читают со случайной реплики; пользователь
+# после записи STICKY_SECONDS секунд читает из default (api.db_router).
+# Ответы реплик кешируются не дольше STICKY_SECONDS. Отметка о записи
+# хранится в кеше API_CACHE_ALIAS: с LocMemCache она видна только своему
+# процессу, для нескольких процессов нужен общий кеш (api.W002).
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 10,
+}
+
 
 # Password validation
 
@@ -109,14 +140,156 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 EMAIL_SENDER = 'your-email@example.com'
 
+# Очередь писем (reviews.outbox). EAGER (EMAIL_OUTBOX_EAGER=1 в окружении)
+# - отправлять письмо сразу после коммита, внутри запроса; по умолчанию
+# письма отправляет команда send_emails --loop. Интервал повтора
+# RETRY_DELAY секунд удваивается с каждой неудачей до MAX_RETRY_DELAY;
+# после MAX_ATTEMPTS письмо помечается как неотправленное. LEASE - на
+# сколько секунд обработчик забирает пачку.
+EMAIL_OUTBOX = {
+    'EAGER': os.environ.get('EMAIL_OUTBOX_EAGER') == '1',
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    'MAX_RETRY_DELAY': 3600,
+    'LEASE': 300,
+}
+
 JWT_ALGORITHM = 'HS256'
 
 AUTH_USER_MODEL = 'reviews.User'
 
+# Права пользователя из claims токена (api.authentication): версия прав
+# кешируется в процессе на CACHE_TTL секунд, не больше CACHE_SIZE записей.
+# Столько секунд другой процесс может видеть старую роль после её смены.
+JWT_CLAIMS_AUTH = {
+    'CACHE_SIZE': 10000,
+    'CACHE_TTL': 30,
+}
+
+# Кеш slug -> id категорий и жанров при записи произведений (api.slugs).
+SLUG_CACHE = {
+    'CACHE_SIZE': 1000,
+    'CACHE_TTL': 300,
+}
+
+# Массовая загрузка POST /api/v1/titles/bulk/ (api.bulk).
+TITLES_BULK = {
+    'BATCH_SIZE': 500,
+    'MAX_ROWS': 50000,
+}
+
+# Сколько строк выгрузки читается из базы и отдаётся клиенту за раз
+# (reviews.export).
+EXPORT_CHUNK_SIZE = 2000
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # Число обратных прокси перед Django. 0 - адрес клиента для
+    # ограничения частоты берётся из REMOTE_ADDR, а не из X-Forwarded-For,
+    # который клиент может подделать.
+    'NUM_PROXIES': 0,
+    'DEFAULT_THROTTLE_RATES': {
+        'signup': '10/min',
+        'token': '20/min',
+        'review_write': '30/min',
+        'comment_write': '60/min',
+    },
+}
+
+# Хранилище счётчиков api.throttling: 'cache' - кеш API_CACHE_ALIAS,
+# 'local' - память процесса (LOCAL_SIZE клиентов). Лимиты общие для всех
+# процессов, только если 'cache' и API_CACHE_ALIAS - общий бэкенд; с
+# LocMemCache или 'local' каждый процесс считает сам (api.W003).
+API_THROTTLE = {
+    'STORE': 'cache',
+    'LOCAL_SIZE': 10000,
+}
+
+# Профилирование выборки запросов (api.profiling). В выборку попадают
+# запросы к маршрутам ROUTES (имена URL, например 'api:titles-list') от
+# ролей ROLES (пустой список - любые): с заголовком HEADER, равным
+# HEADER_TOKEN, или случайные с вероятностью SAMPLE_RATE. Профили
+# пишутся в DIRECTORY и сводятся командой profile_summary. Под ASGI
+# профилирование не выполняется.
+API_PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'ROUTES': [],
+    'ROLES': [],
+    'HEADER': 'X-Profile',
+    'HEADER_TOKEN': '',
+    'DIRECTORY': BASE_DIR / 'profiles',
+}
+
+# list и retrieve произведений, отзывов и комментариев через .values()
+# и api.readers вместо сериализаторов.
+API_VALUES_READ = True
+
+# Async-представления list и retrieve каталога и отзывов (api.async_views).
+# Включаются по выбору (API_ASYNC_READS=1 в окружении) и действуют под
+# любым сервером, поэтому включать их стоит только для ASGI: под WSGI
+# каждое стоило бы отдельного цикла событий. Они быстрее лишь тогда,
+# когда почти все чтения попадают в кеш, и только с кешем в памяти
+# процесса; при 10% промахов они медленнее синхронных
+# (benchmarks.asgi_load).
+API_ASYNC_READS = os.environ.get('API_ASYNC_READS') == '1'
+
+# Кодировщик JSON для api.renderers: 'orjson', 'ujson' или 'json'.
+# None - самый быстрый из установленных.
+JSON_BACKEND = None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кеш для версий тегов и служебных данных API. LocMemCache из CACHES
+# живёт в памяти процесса: запись сбрасывает версии тегов только в нём, и
+# другие процессы отдают старые ответы до истечения TIMEOUT. Годится для
+# одного процесса (runserver, тесты); для нескольких нужен общий бэкенд -
+# об этом предупреждает ``manage.py check --deploy`` (api.W001).
+API_CACHE_ALIAS = 'default'
+
+# Кеширование COUNT(*) в пагинации. MODE: exact - счётчик сбрасывается при
+# любой записи в коллекцию; estimated - живёт TIMEOUT секунд даже после
+# записей, а заголовок X-Count-Exact сообщает, актуален ли он.
+API_COUNT_CACHE = {
+    'MODE': 'exact',
+    'TIMEOUT': 60,
+}
+
+# Кеш ответов list/retrieve (api.mixins.CachedResponseMixin). Хранится в
+# кеше API_CACHE_ALIAS вместе с версиями тегов. Для нескольких процессов
+# нужен общий бэкенд (см. API_CACHE_ALIAS), например:
+# 'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+# 'LOCATION': BASE_DIR / 'cache',
+API_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'TIMEOUT': 300,
+}
+
+# Учёт SQL-запросов (api.middleware.QueryBudgetMiddleware). Проверяется
+# доля SAMPLE_RATE запросов; превышение query_budget представления и
+# шаблон, повторённый DUPLICATE_THRESHOLD раз, пишутся в лог api.queries,
+# а при STRICT вызывают исключение. Под ASGI бюджет не проверяется.
+API_QUERY_BUDGET = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0 if DEBUG else 0.01,
+    'DUPLICATE_THRESHOLD': 3,
+    'STRICT': False,
 }
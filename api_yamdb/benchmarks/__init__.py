@@ -0,0 +1,26 @@
+"""Бенчмарки YaMDb.
+
+Каждый модуль запускается из каталога с manage.py, например::
+
+    python -m benchmarks.query_plans
+
+и работает со своей временной базой SQLite, не трогая db.sqlite3.
+"""
+import os
+import tempfile
+
+import django
+
+
+def setup_django(db_name=None):
+    """Настраивает Django на временную базу и возвращает путь к ней."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    from django.conf import settings
+
+    if db_name is None:
+        db_name = os.path.join(
+            tempfile.mkdtemp(prefix='yamdb-bench-'), 'db.sqlite3'
+        )
+    settings.DATABASES['default']['NAME'] = db_name
+    django.setup()
+    return db_name
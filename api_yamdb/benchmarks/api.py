@@ -0,0 +1,333 @@
+"""Нагрузочные сценарии API через тестовый клиент Django.
+
+База заполняется генератором benchmarks.data, затем каждый сценарий
+выполняет серию запросов. Для каждого сценария считаются p50/p99
+задержки, максимум SQL-запросов на запрос и пик выделенной памяти
+(tracemalloc, отдельным проходом, чтобы не искажать задержки).
+Результат сравнивается с сохранённым benchmarks/baseline.json.
+
+    python -m benchmarks.api
+    python -m benchmarks.api --save-baseline
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from api.authentication import token_for_user, token_versions  # noqa: E402
+from api.slugs import resolvers  # noqa: E402
+from api.throttling import stores  # noqa: E402
+from benchmarks.data import CATEGORIES, GENRES, populate  # noqa: E402
+from reviews.models import GenreTitle, Review, Title, User  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+FEED_PAGE_SIZE = 10
+
+
+def _user_headers(user):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token_for_user(user)}'}
+
+
+def _client_address(number):
+    """Разные адреса клиентов: регистрация ограничена по IP."""
+    return {'REMOTE_ADDR': f'10.{number >> 16 & 255}.{number >> 8 & 255}.'
+                           f'{number & 255}'}
+
+
+def _new_users(prefix, count):
+    users = User.objects.bulk_create(
+        User(username=f'{prefix}{number}',
+             email=f'{prefix}{number}@yamdb.fake',
+             confirmation_code='123456')
+        for number in range(count)
+    )
+    # На SQLite bulk_create не возвращает первичные ключи.
+    return list(User.objects.filter(
+        username__in=[user.username for user in users]
+    ).order_by('pk'))
+
+
+def titles_list(rng, count):
+    """Список произведений с фильтрами, как в каталоге на сайте."""
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    genre_titles = dict(
+        GenreTitle.objects.order_by().values_list('genre__slug')
+        .annotate(total=Count('title_id', distinct=True))
+    )
+
+    def genre_page():
+        # Страницы 2-5, но не дальше последней: иначе ответ 404.
+        slug = f'genre-{rng.randint(1, GENRES)}'
+        last_page = max(1, -(-genre_titles.get(slug, 0) // page_size))
+        return {'genre': slug, 'page': rng.randint(
+            min(2, last_page), min(5, last_page)
+        )}
+
+    filters = (
+        lambda: {},
+        lambda: {'genre': f'genre-{rng.randint(1, GENRES)}'},
+        lambda: {'category': f'category-{rng.randint(1, CATEGORIES)}'},
+        lambda: {'year': rng.randint(1900, 2020)},
+        genre_page,
+    )
+    return [
+        ('get', '/api/v1/titles/', filters[number % len(filters)](), {})
+        for number in range(count)
+    ]
+
+
+def reviews_deep_page(rng, count):
+    """Последние страницы ленты отзывов самого популярного произведения."""
+    title = Title.objects.order_by('-rating_count').first()
+    last_page = max(1, -(-title.rating_count // FEED_PAGE_SIZE))
+    return [
+        ('get', f'/api/v1/titles/{title.pk}/reviews/',
+         {'page': max(1, last_page - rng.randint(0, 4))}, {})
+        for _ in range(count)
+    ]
+
+
+def signup(rng, count):
+    """Регистрация новых пользователей."""
+    offset = User.objects.count()
+    return [
+        ('post', '/api/v1/auth/signup/',
+         {'username': f'signup{offset + number}',
+          'email': f'signup{offset + number}@yamdb.fake'},
+         _client_address(number))
+        for number in range(count)
+    ]
+
+
+def token(rng, count):
+    """Получение токена по коду подтверждения."""
+    return [
+        ('post', '/api/v1/auth/token/',
+         {'username': user.username, 'confirmation_code': '123456'},
+         _client_address(number))
+        for number, user in enumerate(
+            _new_users(f'token{User.objects.count()}_', count)
+        )
+    ]
+
+
+def review_post(rng, count):
+    """Публикация отзыва новым пользователем."""
+    titles = Title.objects.count()
+    return [
+        ('post', f'/api/v1/titles/{rng.randint(1, titles)}/reviews/',
+         {'text': 'Отзыв из бенчмарка', 'score': rng.randint(1, 10)},
+         _user_headers(user))
+        for user in _new_users(f'review{User.objects.count()}_', count)
+    ]
+
+
+def titles_bulk(rng, count):
+    """Ночная синхронизация каталога: пачки по 500 произведений."""
+    admin = User.objects.filter(role='admin').first()
+    offset = Title.objects.count()
+    return [
+        ('post', '/api/v1/titles/bulk/', [
+            {'name': f'Загрузка {offset + number * 500 + row}',
+             'year': rng.randint(1900, 2020),
+             'category': f'category-{rng.randint(1, CATEGORIES)}',
+             'genre': [f'genre-{rng.randint(1, GENRES)}'
+                       for _ in range(rng.randint(1, 3))]}
+            for row in range(500)
+        ], _user_headers(admin))
+        for number in range(count)
+    ]
+
+
+WORKLOADS = {
+    'titles_list': titles_list,
+    'reviews_deep_page': reviews_deep_page,
+    'signup': signup,
+    'token': token,
+    'review_post': review_post,
+    'titles_bulk': titles_bulk,
+}
+
+
+def clear_caches():
+    """Холодный старт: кеши Django и LRU-кеши процесса."""
+    for cache in caches.all():
+        cache.clear()
+    token_versions.clear()
+    for resolver in resolvers.values():
+        resolver.cache.clear()
+    for store in stores.values():
+        store.clear()
+
+
+def execute(client, request, cold):
+    method, path, data, headers = request
+    if cold:
+        clear_caches()
+    if method == 'get':
+        response = client.get(path, data, **headers)
+    else:
+        response = client.post(
+            path, data, content_type='application/json', **headers
+        )
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{method.upper()} {path} {data}: {response.status_code} '
+            f'{response.content[:200]!r}'
+        )
+    return response
+
+
+def percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[
+        percent - 1
+    ]
+
+
+def run_workload(client, prepare, rng, iterations, alloc_samples, cold):
+    requests = prepare(rng, iterations + alloc_samples)
+    latencies = []
+    queries = []
+    for request in requests[:iterations]:
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            execute(client, request, cold)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    peaks = []
+    tracemalloc.start()
+    for request in requests[iterations:]:
+        if cold:
+            clear_caches()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        execute(client, request, cold=False)
+        peaks.append((tracemalloc.get_traced_memory()[1] - current) / 1024)
+    tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries': max(queries),
+        'alloc_kb': round(statistics.median(peaks), 1) if peaks else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Печатает таблицу и возвращает список регрессий."""
+    regressions = []
+    print(f'{"сценарий":<20}{"p50, мс":>12}{"p99, мс":>12}'
+          f'{"запросы":>10}{"память, КБ":>14}')
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        cells = []
+        for key, width in (('p50_ms', 12), ('p99_ms', 12),
+                           ('queries', 10), ('alloc_kb', 14)):
+            value, old = result[key], base.get(key)
+            cell = f'{value}'
+            if old:
+                cell += f' ({(value - old) / old:+.0%})'
+                limit = old if key == 'queries' else old * (1 + tolerance)
+                if key != 'p99_ms' and value is not None and value > limit:
+                    regressions.append(f'{name}.{key}: {old} -> {value}')
+            cells.append(f' {cell:>{width - 1}}')
+        print(f'{name:<20}{"".join(cells)}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--reviews-per-title', type=int, default=5)
+    parser.add_argument('--comments-per-review', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--alloc-samples', type=int, default=20)
+    parser.add_argument(
+        '--workload', action='append', choices=WORKLOADS,
+        help='Запустить только указанные сценарии.'
+    )
+    parser.add_argument(
+        '--warm-cache', action='store_true',
+        help='Не очищать кеши перед запросами.'
+    )
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument(
+        '--save-baseline', action='store_true',
+        help='Записать результат как новый эталон.'
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help='Допустимый рост p50 и памяти относительно эталона.'
+    )
+    options = parser.parse_args(argv)
+
+    # Письма при регистрации не должны попадать в sent_emails.
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    call_command('migrate', verbosity=0)
+    sizes = {
+        'titles': options.titles,
+        'users': options.users,
+        'reviews_per_title': options.reviews_per_title,
+        'comments_per_review': options.comments_per_review,
+    }
+    started = time.perf_counter()
+    populate(**sizes)
+    print(
+        f'Данные: {Title.objects.count()} произведений, '
+        f'{Review.objects.count()} отзывов, {User.objects.count()} '
+        f'пользователей ({time.perf_counter() - started:.1f} с).'
+    )
+
+    client = Client()
+    rng = random.Random(1)
+    results = {
+        name: run_workload(
+            client, WORKLOADS[name], rng, options.iterations,
+            options.alloc_samples, cold=not options.warm_cache
+        )
+        for name in options.workload or WORKLOADS
+    }
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline, encoding='utf-8') as file:
+            stored = json.load(file)
+        if stored['sizes'] == sizes:
+            baseline = stored['results']
+        else:
+            print('Эталон снят на данных другого объёма, сравнения нет.')
+    regressions = compare(results, baseline, options.tolerance)
+
+    if options.save_baseline:
+        with open(options.baseline, 'w', encoding='utf-8') as file:
+            json.dump({'sizes': sizes, 'results': {**baseline, **results}},
+                      file,
+                      ensure_ascii=False, indent=2)
+            file.write('\n')
+        print(f'Эталон сохранён в {options.baseline}.')
+    elif regressions:
+        print('Регрессии:\n' + '\n'.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
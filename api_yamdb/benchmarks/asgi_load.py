@@ -0,0 +1,179 @@
+"""Параллельное чтение каталога: WSGI, синхронные представления под
+ASGI и async-представления (api.async_views).
+
+Запросы подаются прямо в обработчики Django, без сетевого сервера:
+WSGIHandler вызывается из ``--concurrency`` потоков, ASGIHandler - из
+стольких же корутин в одном цикле событий. Под ASGI синхронные
+представления Django 3.2 выполняет в одном общем потоке, а
+async-представления отдают ответы из кеша в цикле событий (встроенные
+middleware Django при этом всё равно переходят в общий поток). Анонимные
+GET идут по каталогу, карточкам и отзывам; доля ``--miss-rate`` запросов
+получает уникальный параметр и промахивается мимо кеша. Печатаются
+запросы в секунду и p50/p99 задержки.
+
+    python -m benchmarks.asgi_load
+    python -m benchmarks.asgi_load --concurrency 64 --requests 5000
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import random
+import statistics
+import threading
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.urls import clear_url_caches  # noqa: E402
+
+from benchmarks.data import populate  # noqa: E402
+from reviews.models import Title  # noqa: E402
+
+SIZES = {
+    'titles': 500,
+    'users': 100,
+    'reviews_per_title': 3,
+    'comments_per_review': 0,
+}
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def use_async_views(enabled):
+    """Пересобирает URL с async-представлениями или без них."""
+    settings.API_ASYNC_READS = enabled
+    import api.urls
+    import api_yamdb.urls
+
+    importlib.reload(api.urls)
+    importlib.reload(api_yamdb.urls)
+    clear_url_caches()
+
+
+def make_paths(rng, count, miss_rate):
+    title_ids = list(Title.objects.values_list('pk', flat=True))[:50]
+    paths = (
+        lambda: ('/api/v1/titles/', f'page={rng.randint(1, 5)}'),
+        lambda: (f'/api/v1/titles/{rng.choice(title_ids)}/', ''),
+        lambda: (f'/api/v1/titles/{rng.choice(title_ids)}/reviews/', ''),
+    )
+    result = []
+    for number in range(count):
+        path, query = paths[number % len(paths)]()
+        if rng.random() < miss_rate:
+            # Неизвестный параметр не меняет ответ, но меняет ключ кеша.
+            query = '&'.join(filter(None, (query, f'miss={number}')))
+        result.append((path, query))
+    return result
+
+
+def run_wsgi(paths, options):
+    handler = WSGIHandler()
+    latencies = []
+    chunks = [paths[number::options.concurrency]
+              for number in range(options.concurrency)]
+
+    def start_response(status, headers):
+        pass
+
+    def worker(chunk):
+        try:
+            for path, query in chunk:
+                environ = {
+                    'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+                    'QUERY_STRING': query, 'SERVER_NAME': 'testserver',
+                    'SERVER_PORT': '80', 'HTTP_HOST': 'testserver',
+                    'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+                }
+                started = time.perf_counter()
+                response = handler(environ, start_response)
+                b''.join(response)
+                response.close()
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(chunk,))
+               for chunk in chunks]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def run_asgi(paths, options):
+    handler = ASGIHandler()
+    latencies = []
+    chunks = [paths[number::options.concurrency]
+              for number in range(options.concurrency)]
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    async def worker(chunk):
+        for path, query in chunk:
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': path,
+                'query_string': query.encode(), 'headers': [
+                    (b'host', b'testserver')
+                ],
+            }
+            started = time.perf_counter()
+            await handler(scope, receive, send)
+            latencies.append(time.perf_counter() - started)
+
+    async def main():
+        await asyncio.gather(*(worker(chunk) for chunk in chunks))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return latencies, time.perf_counter() - started
+
+
+def report(mode, latencies, elapsed):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'{mode:<14}{len(latencies) / elapsed:>10.1f}'
+          f'{cuts[49] * 1000:>10.2f}{cuts[98] * 1000:>10.2f}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument(
+        '--miss-rate', type=float, default=0.1,
+        help='Доля запросов мимо кеша ответов.'
+    )
+    parser.add_argument('--mode', action='append', choices=MODES)
+    options = parser.parse_args(argv)
+
+    call_command('migrate', verbosity=0)
+    populate(**SIZES)
+    paths = make_paths(random.Random(1), options.requests, options.miss_rate)
+
+    print(f'{"режим":<14}{"rps":>10}{"p50, мс":>10}{"p99, мс":>10}')
+    for mode in options.mode or MODES:
+        for cache in caches.all():
+            cache.clear()
+        use_async_views(mode == 'asgi-async')
+        runner = run_wsgi if mode == 'wsgi' else run_asgi
+        # Прогрев: первый проход заполняет кеш ответов.
+        runner(paths[:len(paths) // 10], options)
+        report(mode, *runner(paths, options))
+
+
+if __name__ == '__main__':
+    main()
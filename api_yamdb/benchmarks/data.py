@@ -0,0 +1,113 @@
+"""Генератор данных в формате static/data/*.csv, но большего объёма.
+
+Файлы пишутся в каталог и загружаются командой import_csv, так что
+бенчмарки проходят тот же путь, что и реальная загрузка дампа.
+"""
+import csv
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.core.management import call_command
+
+CATEGORIES = 3
+GENRES = 15
+WORDS = (
+    'фильм', 'книга', 'песня', 'герой', 'история', 'город', 'любовь',
+    'война', 'мир', 'дорога', 'ночь', 'море', 'время', 'тайна', 'музыка',
+)
+ROLES = ('user', 'user', 'user', 'moderator', 'admin')
+START = datetime(2019, 1, 1, tzinfo=timezone.utc)
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _date(rng):
+    moment = START + timedelta(seconds=rng.randint(0, 3 * 365 * 86400))
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _write(directory, filename, header, rows):
+    with open(os.path.join(directory, filename), 'w', encoding='utf-8',
+              newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate_csv(directory, titles=1000, users=200, reviews_per_title=5,
+                 comments_per_review=1, seed=1):
+    """Пишет семь csv файлов.
+
+    Первое произведение получает отзыв от каждого пользователя: на нём
+    проверяются глубокие страницы ленты отзывов.
+    """
+    rng = random.Random(seed)
+    reviews_per_title = min(reviews_per_title, users)
+    _write(directory, 'category.csv', ('id', 'name', 'slug'), (
+        (pk, f'Категория {pk}', f'category-{pk}')
+        for pk in range(1, CATEGORIES + 1)
+    ))
+    _write(directory, 'genre.csv', ('id', 'name', 'slug'), (
+        (pk, f'Жанр {pk}', f'genre-{pk}') for pk in range(1, GENRES + 1)
+    ))
+    _write(directory, 'titles.csv', ('id', 'name', 'year', 'category'), (
+        (pk, f'{_text(rng, 3)} {pk}', rng.randint(1900, 2020),
+         rng.randint(1, CATEGORIES))
+        for pk in range(1, titles + 1)
+    ))
+    _write(directory, 'genre_title.csv', ('id', 'title_id', 'genre_id'), (
+        ((title - 1) * 2 + number + 1, title, genre)
+        for title in range(1, titles + 1)
+        for number, genre in enumerate(rng.sample(range(1, GENRES + 1), 2))
+    ))
+    _write(
+        directory, 'users.csv',
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+        (
+            (pk, f'user{pk}', f'user{pk}@yamdb.fake', rng.choice(ROLES),
+             '', '', '')
+            for pk in range(1, users + 1)
+        )
+    )
+    review_rows = []
+    for title in range(1, titles + 1):
+        count = users if title == 1 else reviews_per_title
+        first_author = rng.randint(0, users - 1)
+        for number in range(count):
+            review_rows.append((
+                len(review_rows) + 1, title, _text(rng, 12),
+                (first_author + number) % users + 1, rng.randint(1, 10),
+                _date(rng)
+            ))
+    _write(
+        directory, 'review.csv',
+        ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        review_rows
+    )
+    _write(
+        directory, 'comments.csv',
+        ('id', 'review_id', 'text', 'author', 'pub_date'),
+        (
+            ((review - 1) * comments_per_review + number + 1, review,
+             _text(rng, 8), rng.randint(1, users), _date(rng))
+            for review in range(1, len(review_rows) + 1)
+            for number in range(comments_per_review)
+        )
+    )
+    return len(review_rows)
+
+
+def populate(workers=1, **sizes):
+    """Генерирует данные и загружает их в текущую базу."""
+    with tempfile.TemporaryDirectory(prefix='yamdb-data-') as directory:
+        generate_csv(directory, **sizes)
+        call_command(
+            'import_csv', '--path', directory, '--workers', str(workers),
+            stdout=StringIO()
+        )
@@ -0,0 +1,81 @@
+"""Планы запросов горячих путей до и после миграции с индексами.
+
+База заполняется данными, схема откатывается к 0002_title_rating, затем
+накатывается 0003_hot_path_indexes; для каждого запроса печатается
+EXPLAIN QUERY PLAN в обоих состояниях.
+
+    python -m benchmarks.query_plans
+"""
+from benchmarks import setup_django
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from benchmarks.data import populate  # noqa: E402
+from reviews.models import Comment, Review, Title, User  # noqa: E402
+
+BEFORE = '0002_title_rating'
+AFTER = '0003_hot_path_indexes'
+
+SIZES = {
+    'titles': 2000,
+    'users': 200,
+    'reviews_per_title': 10,
+    'comments_per_review': 1,
+}
+
+
+def hot_queries():
+    """Запросы, которые выполняют самые нагруженные эндпоинты."""
+    return {
+        'Отзывы произведения, страница': (
+            Review.objects.filter(title_id=1)
+            .order_by('-pub_date', '-id')[:10]
+        ),
+        'Комментарии к отзыву, страница': (
+            Comment.objects.filter(review_id=1)
+            .order_by('-pub_date', '-id')[:10]
+        ),
+        'Произведения по году': Title.objects.filter(year=1994)[:10],
+        'Произведения по категории и году': Title.objects.filter(
+            category__slug='category-1', year=1994
+        )[:10],
+        'Произведения по жанру': Title.objects.filter(
+            genre__slug='genre-1'
+        )[:10],
+        # B-tree по name icontains не обслуживает (индекс удалён в 0008):
+        # на SQLite поиск идёт через FTS, на PostgreSQL - через триграммы.
+        'Произведения по названию': Title.objects.filter(
+            name__icontains='100'
+        )[:10],
+        # До отката к BEFORE у пользователя есть поля поздних миграций
+        # (token_version): выбираются только те, что есть в обеих схемах.
+        'Поиск пользователя': User.objects.filter(
+            username__icontains='user1'
+        ).only('id', 'username')[:10],
+    }
+
+
+def collect_plans():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return {name: query.explain() for name, query in hot_queries().items()}
+
+
+def main():
+    call_command('migrate', verbosity=0)
+    populate(**SIZES)
+    call_command('migrate', 'reviews', BEFORE, verbosity=0)
+    before = collect_plans()
+    call_command('migrate', 'reviews', AFTER, verbosity=0)
+    after = collect_plans()
+    for name in before:
+        print(f'== {name}')
+        print(f'-- до ({BEFORE}):\n{before[name]}')
+        print(f'-- после ({AFTER}):\n{after[name]}\n')
+
+
+if __name__ == '__main__':
+    main()
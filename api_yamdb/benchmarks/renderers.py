@@ -0,0 +1,86 @@
+"""Скорость JSON-рендеринга и разбора типичных ответов API.
+
+Ответы берутся у настоящих эндпоинтов (страница произведений с жанрами
+и категорией, страница отзывов, страница пользователей), затем каждый
+рендерится JSONRenderer DRF и FastJSONRenderer со всеми установленными
+кодировщиками, и разбирается обратно соответствующим парсером.
+Печатается время одного вызова в микросекундах.
+
+    python -m benchmarks.renderers
+    python -m benchmarks.renderers --number 5000
+"""
+import argparse
+import timeit
+from io import BytesIO
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.core.management import call_command  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from api.authentication import token_for_user  # noqa: E402
+from api.parsers import FastJSONParser  # noqa: E402
+from api.renderers import FastJSONRenderer, available_backends  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from reviews.models import User  # noqa: E402
+
+SIZES = {
+    'titles': 100,
+    'users': 50,
+    'reviews_per_title': 5,
+    'comments_per_review': 0,
+}
+
+
+def payloads():
+    """Данные ответов (response.data) трёх горячих эндпоинтов."""
+    admin = User.objects.filter(role='admin').first()
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {token_for_user(admin)}'}
+    client = Client()
+    return {
+        name: client.get(path, **headers).data
+        for name, path in (
+            ('titles', '/api/v1/titles/'),
+            ('reviews', '/api/v1/titles/1/reviews/'),
+            ('users', '/api/v1/users/'),
+        )
+    }
+
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000)
+    options = parser.parse_args(argv)
+
+    call_command('migrate', verbosity=0)
+    populate(**SIZES)
+    data = payloads()
+    pairs = {'drf': (JSONRenderer(), JSONParser())}
+    for backend in available_backends():
+        pairs[backend] = (FastJSONRenderer(), FastJSONParser())
+
+    print(f'{"ответ":<10}{"рендерер":<10}{"рендер, мкс":>14}'
+          f'{"разбор, мкс":>14}{"байт":>8}')
+    for name, payload in data.items():
+        for label, (renderer, parser) in pairs.items():
+            backend = None if label == 'drf' else label
+            with override_settings(JSON_BACKEND=backend):
+                content = renderer.render(payload)
+                render = measure(lambda: renderer.render(payload),
+                                 options.number)
+                parse = measure(lambda: parser.parse(BytesIO(content)),
+                                options.number)
+            print(f'{name:<10}{label:<10}{render * 1e6:>14.1f}'
+                  f'{parse * 1e6:>14.1f}{len(content):>8}')
+
+
+if __name__ == '__main__':
+    main()
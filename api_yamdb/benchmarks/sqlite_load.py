@@ -0,0 +1,193 @@
+"""Чтение и запись под смешанной нагрузкой на файловую базу SQLite.
+
+Потоки-читатели запрашивают каталог и ленты отзывов, потоки-писатели
+публикуют отзывы и комментарии. Сценарий повторяется для трёх настроек
+(api.sqlite): без PRAGMA, с PRAGMA из settings.SQLITE и с PRAGMA плюс
+транзакциями BEGIN IMMEDIATE (SERIALIZE_WRITES). Каждый прогон
+начинается с одной и той же копии базы. Печатаются запросы в секунду,
+p50/p99 задержки и число ошибок ("database is locked" и другие ответы
+5xx) для чтения и записи.
+
+    python -m benchmarks.sqlite_load
+    python -m benchmarks.sqlite_load --readers 8 --writers 4 --duration 10
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import statistics
+import threading
+import time
+
+from benchmarks import setup_django
+
+DB_NAME = setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import caches  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+from api.authentication import token_for_user  # noqa: E402
+from benchmarks.data import populate  # noqa: E402
+from reviews.models import Review, Title, User  # noqa: E402
+
+SIZES = {
+    'titles': 500,
+    'users': 200,
+    'reviews_per_title': 3,
+    'comments_per_review': 0,
+}
+MODES = {
+    'default': {'PRAGMAS': {}, 'SERIALIZE_WRITES': False},
+    'pragmas': {'SERIALIZE_WRITES': False},
+    'pragmas+immediate': {'SERIALIZE_WRITES': True},
+}
+
+
+class Worker(threading.Thread):
+    """Выполняет запросы ``next_request`` до момента ``deadline``."""
+
+    def __init__(self, next_request, deadline):
+        super().__init__()
+        self.next_request = next_request
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        # Исключения тестовый клиент ловит глобальным сигналом, поэтому
+        # в потоках он их не поднимает: ошибка - это ответ 5xx.
+        client = Client(raise_request_exception=False)
+        try:
+            while time.perf_counter() < self.deadline:
+                method, path, data, headers = self.next_request()
+                started = time.perf_counter()
+                if method == 'post':
+                    response = client.post(
+                        path, data, content_type='application/json',
+                        **headers
+                    )
+                else:
+                    response = client.get(path, data, **headers)
+                if response.status_code >= 500:
+                    self.errors += 1
+                else:
+                    self.latencies.append(
+                        (time.perf_counter() - started) * 1000
+                    )
+        finally:
+            connection.close()
+
+
+def reader(rng, title_ids):
+    def next_request():
+        if rng.random() < 0.5:
+            return ('get', '/api/v1/titles/',
+                    {'page': rng.randint(1, 5)}, {})
+        return ('get', f'/api/v1/titles/{rng.choice(title_ids)}/reviews/',
+                {}, {})
+    return next_request
+
+
+def writer(rng, user, title_ids, review_ids):
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {token_for_user(user)}'}
+    titles = iter(title_ids)
+
+    def next_request():
+        title_id = next(titles, None)
+        if title_id is not None and rng.random() < 0.5:
+            return ('post', f'/api/v1/titles/{title_id}/reviews/',
+                    {'text': 'Отзыв под нагрузкой',
+                     'score': rng.randint(1, 10)}, headers)
+        review = rng.choice(review_ids)
+        return ('post',
+                f'/api/v1/titles/{review[1]}/reviews/{review[0]}/comments/',
+                {'text': 'Комментарий под нагрузкой'}, headers)
+    return next_request
+
+
+def summary(workers, duration):
+    latencies = [value for worker in workers for value in worker.latencies]
+    errors = sum(worker.errors for worker in workers)
+    if len(latencies) < 2:
+        return f'{len(latencies) / duration:>8.1f}{"-":>9}{"-":>9}{errors:>7}'
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return (f'{len(latencies) / duration:>8.1f}{cuts[49]:>9.1f}'
+            f'{cuts[98]:>9.1f}{errors:>7}')
+
+
+def run(mode, template, options):
+    """Один прогон на свежей копии базы ``template``."""
+    connections.close_all()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(DB_NAME + suffix):
+            os.remove(DB_NAME + suffix)
+    shutil.copyfile(template, DB_NAME)
+    for cache in caches.all():
+        cache.clear()
+    config = {**settings.SQLITE, **MODES[mode]}
+    # Писатели нарочно пишут чаще, чем разрешают ставки api.throttling.
+    rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+    with override_settings(SQLITE=config, REST_FRAMEWORK=rest_framework):
+        rng = random.Random(1)
+        title_ids = list(Title.objects.values_list('pk', flat=True))
+        review_ids = list(Review.objects.values_list('pk', 'title_id'))
+        users = User.objects.filter(
+            username__startswith='writer'
+        ).order_by('pk')[:options.writers]
+        deadline = time.perf_counter() + options.duration
+        readers = [
+            Worker(reader(random.Random(rng.random()), title_ids), deadline)
+            for _ in range(options.readers)
+        ]
+        writers = [
+            Worker(writer(random.Random(rng.random()), user,
+                          rng.sample(title_ids, len(title_ids)), review_ids),
+                   deadline)
+            for user in users
+        ]
+        for worker in readers + writers:
+            worker.start()
+        for worker in readers + writers:
+            worker.join()
+    print(f'{mode:<20}{summary(readers, options.duration)}'
+          f'{summary(writers, options.duration)}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument(
+        '--mode', action='append', choices=MODES,
+        help='Запустить только указанные настройки.'
+    )
+    options = parser.parse_args(argv)
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+    # Шаблон базы без WAL: journal_mode сохраняется в файле.
+    with override_settings(SQLITE={**settings.SQLITE, **MODES['default']}):
+        call_command('migrate', verbosity=0)
+        populate(**SIZES)
+        User.objects.bulk_create(
+            User(username=f'writer{number}',
+                 email=f'writer{number}@yamdb.fake')
+            for number in range(options.writers)
+        )
+        connections.close_all()
+    template = DB_NAME + '.template'
+    shutil.copyfile(DB_NAME, template)
+
+    header = f'{"rps":>8}{"p50, мс":>9}{"p99, мс":>9}{"ошибки":>7}'
+    print(f'{"":<20}{"чтение":^33}{"запись":^33}')
+    print(f'{"настройка":<20}{header}{header}')
+    for mode in options.mode or MODES:
+        run(mode, template, options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Файлы static/data/*.csv: модель, ссылки и колонки каждого файла.
+
+Общее описание для загрузки (команда import_csv) и выгрузки
+(reviews.export).
+"""
+from .models import Category, Comment, Genres, GenreTitle, Review, Title, User
+
+model_csv_equal = {
+    'category.csv': Category,
+    'genre.csv': Genres,
+    'titles.csv': Title,
+    'genre_title.csv': GenreTitle,
+    'users.csv': User,
+    'review.csv': Review,
+    'comments.csv': Comment,
+}
+
+# Колонки CSV со ссылками на другие модели: колонка -> (поле, модель).
+csv_foreign_keys = {
+    Title: {'category': ('category_id', Category)},
+    GenreTitle: {
+        'title_id': ('title_id', Title),
+        'genre_id': ('genre_id', Genres),
+    },
+    Review: {
+        'title_id': ('title_id', Title),
+        'author': ('author_id', User),
+    },
+    Comment: {
+        'review_id': ('review_id', Review),
+        'author': ('author_id', User),
+    },
+}
+
+# Колонки файлов в том порядке, в каком они лежат в static/data.
+csv_columns = {
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+    'users.csv': (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'
+    ),
+    'review.csv': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
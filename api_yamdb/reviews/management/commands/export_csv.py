@@ -0,0 +1,59 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.export import FORMATS, CSV, csv_columns, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка таблиц в файлы формата static/data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='Файлы для выгрузки, например review.csv; по умолчанию все.'
+        )
+        parser.add_argument(
+            '--path',
+            required=True,
+            help='Каталог, куда писать файлы.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default=CSV,
+            help='csv - как в static/data, ndjson - JSON-объект на строку.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Сколько строк читать из базы за один раз.'
+        )
+
+    def handle(self, *args, **options):
+        """Тело команды."""
+        files = options['files'] or list(csv_columns)
+        unknown = set(files) - set(csv_columns)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные файлы: {", ".join(sorted(unknown))}'
+            )
+        os.makedirs(options['path'], exist_ok=True)
+        for filename in files:
+            target = filename
+            if options['format'] != CSV:
+                target = f'{os.path.splitext(filename)[0]}.{options["format"]}'
+            started = time.perf_counter()
+            with open(os.path.join(options['path'], target), 'w',
+                      encoding='utf-8', newline='') as file:
+                for chunk in export_lines(
+                    filename, options['format'], options['chunk_size']
+                ):
+                    file.write(chunk)
+            self.stdout.write(
+                f'Выгружен {target} за '
+                f'{time.perf_counter() - started:.2f} с.'
+            )
@@ -1,64 +1,322 @@
 import csv
-from django.db import transaction
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
-from reviews.models import (Category,
-                            Comment,
-                            Genres,
-                            GenreTitle,
-                            Review,
-                            Title,
-                            CustomUser)
-
-model_csv_equal = {
-    'static/data/category.csv': Category,
-    'static/data/genre.csv': Genres,
-    'static/data/titles.csv': Title,
-    'static/data/genre_title.csv': GenreTitle,
-    'static/data/users.csv': CustomUser,
-    'static/data/review.csv': Review,
-    'static/data/comments.csv': Comment,
+from django.db import connections, transaction
+from django.utils import timezone
+
+from reviews.csv_files import csv_columns, csv_foreign_keys, model_csv_equal
+from reviews.models import ScoreRollup, Title
+from reviews.search import get_search_backend
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+
+# Файлы, которые нужно загрузить раньше, чтобы ссылки были валидны.
+csv_dependencies = {
+    'category.csv': (),
+    'genre.csv': (),
+    'users.csv': (),
+    'titles.csv': ('category.csv',),
+    'genre_title.csv': ('titles.csv', 'genre.csv'),
+    'review.csv': ('titles.csv', 'users.csv'),
+    'comments.csv': ('review.csv', 'users.csv'),
 }
 
+# Самые большие файлы делятся между всеми процессами по номеру пачки.
+split_files = ('review.csv', 'comments.csv')
+
+IGNORE = 'ignore'
+UPSERT = 'upsert'
+
+
+def build_stages(dependencies=csv_dependencies):
+    """Раскладывает файлы по этапам: внутри этапа файлы независимы."""
+    done = set()
+    stages = []
+    pending = [name for name in model_csv_equal if name in dependencies]
+    while pending:
+        stage = [
+            name for name in pending
+            if all(parent in done for parent in dependencies[name])
+        ]
+        if not stage:
+            raise ValueError(f'Циклическая зависимость файлов: {pending}')
+        stages.append(stage)
+        done.update(stage)
+        pending = [name for name in pending if name not in done]
+    return stages
+
+
+def read_chunks(path, chunk_size, part=0, parts=1):
+    """Построчно читает CSV и отдаёт строки списками по chunk_size.
+
+    При parts > 1 отдаются только пачки с номером, дающим остаток part.
+    """
+    with open(path, encoding='utf-8', mode='r') as file:
+        csv_read = csv.DictReader(file)
+        index = 0
+        while True:
+            chunk = list(islice(csv_read, chunk_size))
+            if not chunk:
+                return
+            if index % parts == part:
+                yield chunk
+            index += 1
+
+
+def timestamp_fields(model):
+    """Поля с auto_now_add/auto_now: их значения берутся из CSV."""
+    return [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+        or getattr(field, 'auto_now', False)
+    ]
+
+
+def update_fields(filename):
+    """Поля модели из колонок файла, кроме первичного ключа.
+
+    upsert обновляет только их: остальные поля (пароль, флаги
+    пользователя) в CSV не попадают и не должны сбрасываться.
+    """
+    model = model_csv_equal[filename]
+    foreign_keys = csv_foreign_keys.get(model, {})
+    fields = [
+        model._meta.get_field(foreign_keys.get(column, (column,))[0])
+        for column in csv_columns[filename]
+    ]
+    return [field.name for field in fields if not field.primary_key]
+
+
+@contextmanager
+def csv_timestamps(model):
+    """Отключает auto_now_add/auto_now, чтобы bulk_create не затирал даты.
+
+    Команда меняет поля модели только в своём процессе, на время вставки.
+    """
+    fields = [
+        (field, field.auto_now_add, field.auto_now)
+        for field in timestamp_fields(model)
+    ]
+    for field, _, _ in fields:
+        field.auto_now_add = field.auto_now = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add, auto_now in fields:
+            field.auto_now_add, field.auto_now = auto_now_add, auto_now
+
+
+def _init_worker():
+    """Готовит дочерний процесс: свои соединения с базой."""
+    if not settings.configured or not django.apps.apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _import_part(filename, part, parts, options):
+    """Загружает часть файла в отдельном процессе."""
+    command = Command()
+    command.known_ids = {}
+    rows, errors, messages = command.import_file(
+        filename, options, part, parts
+    )
+    return filename, rows, errors, messages
+
 
 class Command(BaseCommand):
-    info = 'Импорт csv файлов в таблицы базы'
-
-    def _create_correct_row_fields(self, row):
-        """Дополняет строку таблицы экземплярами модели."""
-        try:
-            if row.get('author'):
-                row['author'] = CustomUser.objects.get(pk=row['author'])
-            if row.get('review_id'):
-                row['review'] = Review.objects.get(pk=row['review_id'])
-            if row.get('title_id'):
-                row['title'] = Title.objects.get(pk=row['title_id'])
-            if row.get('category'):
-                row['category'] = Category.objects.get(pk=row['category'])
-            if row.get('genre'):
-                row['genre'] = Genres.objects.get(pk=row['genre'])
-        except Exception as error:
-            print(f'Ошибка в строке {row.get("id")}.\n'
-                  f'Текст - {error}')
-        return row
+    help = 'Импорт csv файлов в таблицы базы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=str(DATA_DIR),
+            help='Каталог с csv файлами.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Сколько строк читать из файла за один раз.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create/bulk_update.'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=(IGNORE, UPSERT),
+            default=IGNORE,
+            help='ignore - пропускать существующие строки, '
+                 'upsert - обновлять их.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов: независимые файлы грузятся параллельно, '
+                 'большие файлы делятся между процессами.'
+        )
+
+    def _known_ids(self, model):
+        """Множество существующих первичных ключей модели."""
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                model.objects.values_list('pk', flat=True)
+            )
+        return self.known_ids[model]
+
+    def _build_object(self, model, row):
+        """Создаёт экземпляр модели из строки, проверяя внешние ключи."""
+        fields = {}
+        foreign_keys = csv_foreign_keys.get(model, {})
+        for column, value in row.items():
+            if column not in foreign_keys:
+                fields[column] = value
+                continue
+            field_name, related_model = foreign_keys[column]
+            if not value:
+                fields[field_name] = None
+                continue
+            related_id = int(value)
+            if related_id not in self._known_ids(related_model):
+                raise ValueError(
+                    f'{related_model.__name__} с id={related_id} не найден'
+                )
+            fields[field_name] = related_id
+        obj = model(**fields)
+        obj.pk = model._meta.pk.to_python(obj.pk)
+        for field in timestamp_fields(model):
+            # Без даты в CSV - как при обычном сохранении.
+            if getattr(obj, field.attname) in (None, ''):
+                setattr(obj, field.attname, timezone.now())
+        return obj
+
+    def _write(self, model, objects, mode, batch_size, fields):
+        """Записывает пачку объектов пачками по batch_size.
+
+        В режиме upsert у существующих строк обновляются только fields.
+        """
+        if mode == IGNORE:
+            with csv_timestamps(model):
+                model.objects.bulk_create(
+                    objects, batch_size=batch_size, ignore_conflicts=True
+                )
+            return
+        existing = set(
+            model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', flat=True)
+        )
+        new = [obj for obj in objects if obj.pk not in existing]
+        old = [obj for obj in objects if obj.pk in existing]
+        with csv_timestamps(model):
+            model.objects.bulk_create(new, batch_size=batch_size)
+        if old:
+            model.objects.bulk_update(old, fields, batch_size=batch_size)
+
+    def import_file(self, filename, options, part=0, parts=1):
+        """Импортирует файл или его часть: (строк, ошибок, сообщения)."""
+        model = model_csv_equal[filename]
+        fields = update_fields(filename)
+        rows = 0
+        messages = []
+        chunks = read_chunks(
+            f'{options["path"]}/{filename}', options['chunk_size'],
+            part, parts
+        )
+        for chunk in chunks:
+            objects = []
+            for row in chunk:
+                rows += 1
+                try:
+                    objects.append(self._build_object(model, row))
+                except (ValueError, TypeError, ValidationError) as error:
+                    messages.append(
+                        f'Ошибка в строке {row.get("id")}.\n'
+                        f'Текст - {error}'
+                    )
+            # Транзакция на пачку: при параллельной загрузке блокировка
+            # записи держится только на время вставки.
+            with transaction.atomic():
+                self._write(
+                    model, objects, options['mode'], options['batch_size'],
+                    fields
+                )
+        return rows, len(messages), messages
+
+    def _tasks(self, stage, workers):
+        """Задачи этапа: (файл, часть, всего частей)."""
+        tasks = []
+        for filename in stage:
+            parts = workers if filename in split_files else 1
+            tasks.extend((filename, part, parts) for part in range(parts))
+        return tasks
+
+    def _run_stage(self, stage, options):
+        """Загружает файлы этапа и возвращает {файл: (строк, ошибок)}."""
+        tasks = self._tasks(stage, options['workers'])
+        if options['workers'] > 1:
+            # Дочерние процессы не должны наследовать открытые соединения.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=_init_worker
+            ) as executor:
+                results = list(executor.map(
+                    _import_part,
+                    *zip(*tasks),
+                    [options] * len(tasks)
+                ))
+        else:
+            results = [
+                _import_part(filename, part, parts, options)
+                for filename, part, parts in tasks
+            ]
+        totals = {filename: (0, 0) for filename in stage}
+        for filename, rows, errors, messages in results:
+            for message in messages:
+                self.stderr.write(message)
+            total_rows, total_errors = totals[filename]
+            totals[filename] = (total_rows + rows, total_errors + errors)
+        return totals
 
     def handle(self, *args, **options):
         """Тело команды."""
-        for path, model in model_csv_equal.items():
-            print(f'Наполняем модель {model.__name__}')
-            rows = 0
-            successful = 0
-            with open(path, encoding='utf-8', mode='r') as file:
-                csv_read = csv.DictReader(file)
-                with transaction.atomic():
-                    for row in csv_read:
-                        rows += 1
-                        row = self._create_correct_row_fields(row)
-                        try:
-                            obj, created = model.objects.get_or_create(**row)
-                            if created:
-                                successful += 1
-                        except Exception as error:
-                            print(f'Ошибка в строке {row.get("id")}.\n'
-                                  f'Текст - {error}')
-            print(f'Наполнение модели {model.__name__} завершено. '
-                  f'Строк: {rows}. Успешно: {successful}.')
+        for number, stage in enumerate(build_stages(), 1):
+            models = [model_csv_equal[filename] for filename in stage]
+            self.stdout.write(
+                f'Этап {number}: наполняем модели '
+                f'{", ".join(model.__name__ for model in models)}'
+            )
+            counts_before = [model.objects.count() for model in models]
+            started = time.perf_counter()
+            totals = self._run_stage(stage, options)
+            elapsed = time.perf_counter() - started
+            for filename, model, count_before in zip(
+                stage, models, counts_before
+            ):
+                rows, errors = totals[filename]
+                created = model.objects.count() - count_before
+                self.stdout.write(
+                    f'Наполнение модели {model.__name__} завершено. '
+                    f'Строк: {rows}. Новых: {created}. Ошибок: {errors}.'
+                )
+            stage_rows = sum(rows for rows, _ in totals.values())
+            speed = stage_rows / elapsed if elapsed else stage_rows
+            self.stdout.write(
+                f'Этап {number} завершён за {elapsed:.2f} с. '
+                f'Скорость: {speed:.0f} строк/с.'
+            )
+        # bulk_create не отправляет сигналы, поэтому рейтинг, сводка
+        # оценок и поисковый индекс пересчитываются целиком после загрузки.
+        Title.objects.recalculate_ratings()
+        ScoreRollup.objects.rebuild(options['batch_size'])
+        get_search_backend().rebuild()
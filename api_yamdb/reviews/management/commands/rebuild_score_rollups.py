@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import ScoreRollup
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт сводки оценок по дням для статистики произведений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create.'
+        )
+
+    def handle(self, *args, **options):
+        """Тело команды."""
+        rows = ScoreRollup.objects.rebuild(options['batch_size'])
+        self.stdout.write(f'Сводка оценок пересчитана. Строк: {rows}.')
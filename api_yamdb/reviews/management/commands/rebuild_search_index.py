@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reviews.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Пересборка поискового индекса произведений'
+
+    def handle(self, *args, **options):
+        """Тело команды."""
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            f'Поисковый индекс пересобран ({type(backend).__name__}).'
+        )
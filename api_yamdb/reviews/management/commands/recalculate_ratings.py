@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт сохранённого рейтинга произведений по отзывам'
+
+    def handle(self, *args, **options):
+        """Тело команды."""
+        updated = Title.objects.recalculate_ratings()
+        self.stdout.write(f'Рейтинг пересчитан. Произведений: {updated}.')
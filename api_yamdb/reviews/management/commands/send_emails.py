@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.outbox import outbox_metrics, send_pending
+
+
+class Command(BaseCommand):
+    help = 'Отправка писем из очереди OutgoingEmail'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Сколько писем отправлять через одно соединение за раз.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval с.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между проверками очереди в режиме --loop.'
+        )
+        parser.add_argument(
+            '--metrics',
+            action='store_true',
+            help='Только вывести метрики очереди в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        """Тело команды."""
+        if options['metrics']:
+            self.stdout.write(json.dumps(outbox_metrics()))
+            return
+        while True:
+            result = send_pending(options['batch_size'])
+            if result['sent'] or result['failed']:
+                self.stdout.write(
+                    f'Отправлено: {result["sent"]}. '
+                    f'Ошибок: {result["failed"]}. '
+                    f'За {result["seconds"]:.2f} с.'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'reviews_title_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    # Поисковый индекс нужен только на SQLite, собранном с FTS5; иначе
+    # поиск работает через другой бэкенд из reviews.search.
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            f"name, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+        f"SELECT id, name, COALESCE(description, '') FROM reviews_title"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
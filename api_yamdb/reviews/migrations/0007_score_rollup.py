@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 18:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='оценка')),
+                ('count', models.IntegerField(default=0, verbose_name='число оценок')),
+                ('title', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='score_rollups', to='reviews.title')),
+            ],
+            options={
+                'verbose_name': 'Сводка оценок',
+                'verbose_name_plural': 'Сводки оценок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scorerollup',
+            constraint=models.UniqueConstraint(fields=('title', 'day', 'score'), name='unique_title_day_score'),
+        ),
+    ]
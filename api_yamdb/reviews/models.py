@@ -1,4 +1,13 @@
-from django.db import models
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, models, router, transaction
+from django.db.models import (Count, F, IntegerField, OuterRef, Q, Subquery,
+                              Sum)
+from django.db.models.functions import TruncDate
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
@@ -61,6 +70,16 @@ class User(AbstractUser):
         'Поле с кодом подтверждения',
         max_length=6
     )
+    # Растёт при смене прав: токены со старой версией теряют claims.
+    token_version = models.PositiveIntegerField(
+        'Версия прав в токенах',
+        default=0,
+        editable=False
+    )
+
+    # Поля, копии которых хранятся в claims токена (api.authentication).
+    CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_superuser',
+                    'is_active')
 
     @property
     def is_user(self):
@@ -88,6 +107,28 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def _claims_state(self):
+        deferred = self.get_deferred_fields()
+        if deferred.intersection(self.CLAIM_FIELDS):
+            return None
+        return tuple(getattr(self, field) for field in self.CLAIM_FIELDS)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_claims = instance._claims_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_claims', None)
+        if loaded is not None and loaded != self._claims_state():
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_claims = self._claims_state()
+
 
 class Category(models.Model):
     name = models.CharField(
@@ -117,6 +158,61 @@ class Genres(models.Model):
         return self.slug
 
 
+# id произведений, удаляемых в текущем потоке: их отзывы удаляются
+# каскадом, и пересчитывать рейтинг по каждому из них незачем
+# (reviews.signals).
+_deleting_titles = threading.local()
+
+
+def titles_being_deleted():
+    if not hasattr(_deleting_titles, 'ids'):
+        _deleting_titles.ids = set()
+    return _deleting_titles.ids
+
+
+@contextmanager
+def deleting_titles():
+    """Область удаления произведений.
+
+    id, добавленные сигналом pre_delete, убираются и при ошибке удаления.
+    """
+    ids = titles_being_deleted()
+    before = set(ids)
+    try:
+        yield
+    finally:
+        ids.intersection_update(before)
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def delete(self):
+        with deleting_titles():
+            return super().delete()
+
+    def recalculate_ratings(self):
+        """Пересчитывает сохранённый рейтинг одним UPDATE по отзывам."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(
+                Subquery(
+                    reviews.annotate(total=Sum('score')).values('total'),
+                    output_field=IntegerField()
+                ),
+                0
+            ),
+            rating_count=Coalesce(
+                Subquery(
+                    reviews.annotate(total=Count('pk')).values('total'),
+                    output_field=IntegerField()
+                ),
+                0
+            ),
+        )
+
+
 class Title(models.Model):
     """Модель Произведение, базовая модель"""
 
@@ -127,6 +223,8 @@ class Title(models.Model):
         help_text='Введите год релиза'
     )
     genre = models.ManyToManyField(Genres, through='GenreTitle')
+    # Отдельный индекс не нужен: category - первое поле индекса
+    # title_category_year_idx.
     category = models.ForeignKey(
         Category,
         on_delete=models.SET_NULL,
@@ -134,35 +232,105 @@ class Title(models.Model):
         help_text='Введите категорию произведения',
         null=True,
         blank=True,
-        related_name='titles'
+        related_name='titles',
+        db_index=False
     )
     description = models.TextField(
         null=True,
         verbose_name='Описание'
     )
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок',
+        default=0,
+        editable=False
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(fields=['category', 'year'],
+                         name='title_category_year_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    def delete(self, *args, **kwargs):
+        with deleting_titles():
+            return super().delete(*args, **kwargs)
+
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum // self.rating_count
+
+    def set_genres(self, genres, created=False):
+        """Заменяет жанры произведения одной вставкой GenreTitle.
+
+        Для нового произведения старых строк нет, и их удаление
+        пропускается. Сигнал m2m_changed отправляется, как при set().
+        """
+        genre_ids = {genre.pk for genre in genres}
+        if not created:
+            GenreTitle.objects.filter(title=self).exclude(
+                genre_id__in=genre_ids
+            ).delete()
+        GenreTitle.objects.bulk_create(
+            [GenreTitle(title=self, genre_id=pk) for pk in genre_ids],
+            ignore_conflicts=not created
+        )
+        getattr(self, '_prefetched_objects_cache', {}).pop('genre', None)
+        m2m_changed.send(
+            sender=GenreTitle, instance=self, action='post_add',
+            reverse=False, model=Genres, pk_set=genre_ids, using=self._state.db
+        )
+
+    @classmethod
+    def change_rating(cls, title_id, score_delta, count_delta=0):
+        """Атомарно сдвигает сохранённые сумму и количество оценок."""
+        cls.objects.filter(pk=title_id).update(
+            rating_sum=models.F('rating_sum') + score_delta,
+            rating_count=models.F('rating_count') + count_delta
+        )
+
 
 class GenreTitle(models.Model):
-    genre = models.ForeignKey(Genres, on_delete=models.CASCADE)
+    # Индекс по genre даёт ограничение уникальности (genre, title).
+    genre = models.ForeignKey(
+        Genres, on_delete=models.CASCADE, db_index=False
+    )
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['genre', 'title'],
+                name='unique_genre_title'
+            )
+        ]
+
     def __str__(self) -> str:
         return f'{self.genre} {self.title}'
 
 
 class Review(models.Model):
+    # Отдельный индекс не нужен: title - первое поле составного индекса.
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
         related_name='reviews',
-        verbose_name='произведение'
+        verbose_name='произведение',
+        db_index=False
     )
     author = models.ForeignKey(
         User,
@@ -189,7 +357,13 @@ class Review(models.Model):
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'title'],
@@ -200,13 +374,26 @@ class Review(models.Model):
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Оценка на момент загрузки нужна, чтобы при изменении отзыва
+        # сдвинуть рейтинг произведения без дополнительного запроса.
+        if 'score' in field_names:
+            score = values[field_names.index('score')]
+            if score is not models.DEFERRED:
+                instance._loaded_score = score
+        return instance
+
 
 class Comment(models.Model):
+    # Отдельный индекс не нужен: review - первое поле составного индекса.
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
         related_name='comments',
-        verbose_name='отзыв'
+        verbose_name='отзыв',
+        db_index=False
     )
     text = models.TextField(
         'текст комментария',
@@ -225,7 +412,166 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (reviews.outbox)."""
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'ожидает отправки'),
+        (SENT, 'отправлено'),
+        (FAILED, 'не отправлено'),
+    )
+
+    subject = models.CharField('тема', max_length=255)
+    body = models.TextField('текст')
+    from_email = models.CharField('отправитель', max_length=MAX_LENGTH_EMAIL)
+    to = models.TextField('получатели через запятую')
+    status = models.CharField(
+        'статус', max_length=7, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'следующая попытка', default=timezone.now
+    )
+    last_error = models.TextField('последняя ошибка', blank=True)
+    created_at = models.DateTimeField('создано', auto_now_add=True)
+    sent_at = models.DateTimeField('отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='outgoing_email_queue_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.to}'
+
+
+class ScoreRollupQuerySet(models.QuerySet):
+
+    def add(self, title_id, day, score, delta):
+        """Сдвигает число оценок score за день day на delta.
+
+        Прибавление - один upsert; вычитание меняет только существующую
+        строку: без неё сводка ещё не построена, и её создаст rebuild.
+        """
+        if delta < 0:
+            return self.filter(
+                title_id=title_id, day=day, score=score
+            ).update(count=F('count') + delta)
+        using = router.db_for_write(self.model)
+        connection = connections[using]
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            with transaction.atomic(using=using):
+                row, created = self.select_for_update().get_or_create(
+                    title_id=title_id, day=day, score=score,
+                    defaults={'count': delta}
+                )
+                if not created:
+                    self.filter(pk=row.pk).update(count=F('count') + delta)
+            return 1
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (title_id, day, score, count) '
+                f'VALUES (%s, %s, %s, %s) '
+                f'ON CONFLICT (title_id, day, score) '
+                f'DO UPDATE SET count = {table}.count + excluded.count',
+                [title_id, day, score, delta]
+            )
+        return 1
+
+    def rebuild(self, batch_size=1000):
+        """Пересчитывает всю сводку по таблице отзывов."""
+        rows = Review.objects.order_by().annotate(
+            day=TruncDate('pub_date')
+        ).values('title_id', 'day', 'score').annotate(total=Count('pk'))
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        title_id=row['title_id'], day=row['day'],
+                        score=row['score'], count=row['total']
+                    )
+                    for row in rows.iterator(chunk_size=batch_size)
+                ),
+                batch_size=batch_size
+            )
+        return self.count()
+
+    def distribution(self, since):
+        """Гистограмма оценок, их число и среднее: всего и с даты since."""
+        histogram = {score: 0 for score in range(1, 11)}
+        recent_count = recent_sum = 0
+        rows = self.order_by().values('score').annotate(
+            total=Sum('count'),
+            recent=Sum('count', filter=Q(day__gte=since)),
+        )
+        for row in rows:
+            histogram[row['score']] = row['total']
+            recent_count += row['recent'] or 0
+            recent_sum += row['score'] * (row['recent'] or 0)
+        count = sum(histogram.values())
+        total = sum(score * number for score, number in histogram.items())
+        return {
+            'count': count,
+            'average': round(total / count, 2) if count else None,
+            'histogram': {
+                str(score): number for score, number in histogram.items()
+            },
+            'recent': {
+                'since': since.isoformat(),
+                'count': recent_count,
+                'average': (
+                    round(recent_sum / recent_count, 2)
+                    if recent_count else None
+                ),
+            },
+        }
+
+
+class ScoreRollup(models.Model):
+    """Число оценок произведения по дням: источник статистики оценок.
+
+    Обновляется сигналами отзывов, целиком пересчитывается командой
+    rebuild_score_rollups.
+    """
+
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='score_rollups',
+        db_index=False
+    )
+    day = models.DateField('день')
+    score = models.PositiveSmallIntegerField('оценка')
+    count = models.IntegerField('число оценок', default=0)
+
+    objects = ScoreRollupQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Сводка оценок'
+        verbose_name_plural = 'Сводки оценок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'day', 'score'],
+                name='unique_title_day_score'
+            )
+        ]
@@ -0,0 +1,205 @@
+"""Очередь исходящих писем.
+
+Запрос только записывает письмо в таблицу OutgoingEmail, а отправляет
+их команда send_emails: пачками через одно соединение почтового
+бэкенда, с повторами через растущие интервалы. При EMAIL_OUTBOX['EAGER']
+письмо отправляется сразу после коммита транзакции, внутри запроса; по
+умолчанию режим выключен, и SMTP не задерживает регистрацию.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+# Сколько последних отправленных писем учитывается в задержке доставки.
+LATENCY_WINDOW = 1000
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    """Ставит письмо в очередь и возвращает его запись."""
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.EMAIL_SENDER,
+        to=','.join(recipient_list),
+    )
+    if settings.EMAIL_OUTBOX['EAGER']:
+        transaction.on_commit(lambda: send_now(email))
+    return email
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей."""
+    config = settings.EMAIL_OUTBOX
+    return timedelta(seconds=min(
+        config['RETRY_DELAY'] * 2 ** (attempts - 1), config['MAX_RETRY_DELAY']
+    ))
+
+
+def claim_batch(batch_size):
+    """Забирает пачку писем, срок отправки которых наступил.
+
+    Взятым письмам следующая попытка сдвигается на LEASE секунд: другой
+    обработчик их не возьмёт, а если этот упадёт, письма вернутся в
+    очередь сами.
+    """
+    now = timezone.now()
+    queryset = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.PENDING, next_attempt_at__lte=now
+    )
+    with transaction.atomic():
+        batch = list(
+            queryset.select_for_update(skip_locked=True)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in batch]
+        ).update(next_attempt_at=now + timedelta(
+            seconds=settings.EMAIL_OUTBOX['LEASE']
+        ))
+    return batch
+
+
+def record_failure(email, error, max_attempts):
+    """Откладывает письмо до следующей попытки или помечает неудачным."""
+    email.last_error = f'{type(error).__name__}: {error}'
+    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.FAILED
+
+
+def defer(batch, error):
+    """Засчитывает попытку всей пачке, когда соединение не открылось."""
+    max_attempts = settings.EMAIL_OUTBOX['MAX_ATTEMPTS']
+    for email in batch:
+        email.attempts += 1
+        record_failure(email, error, max_attempts)
+    OutgoingEmail.objects.bulk_update(
+        batch, ['attempts', 'status', 'next_attempt_at', 'last_error']
+    )
+
+
+def deliver(batch, connection):
+    """Отправляет пачку через открытое соединение и сохраняет итог."""
+    max_attempts = settings.EMAIL_OUTBOX['MAX_ATTEMPTS']
+    for email in batch:
+        email.attempts += 1
+        try:
+            connection.send_messages([EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.to.split(','),
+            )])
+        except Exception as error:
+            record_failure(email, error, max_attempts)
+        else:
+            email.status = OutgoingEmail.SENT
+            email.sent_at = timezone.now()
+            email.last_error = ''
+    OutgoingEmail.objects.bulk_update(
+        batch,
+        ['attempts', 'status', 'sent_at', 'next_attempt_at', 'last_error']
+    )
+
+
+def send_now(email):
+    """Отправляет только что созданное письмо, минуя выборку из очереди.
+
+    Если соединение не открылось, письмо остаётся в очереди до
+    следующей попытки: запрос, который его создал, уже закоммичен.
+    """
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        defer([email], error)
+        return
+    try:
+        deliver([email], connection)
+    finally:
+        connection.close()
+
+
+def send_pending(batch_size=None):
+    """Отправляет все письма, срок которых наступил; возвращает итоги.
+
+    Если соединение не открылось, взятой пачке засчитывается попытка с
+    обычной паузой до следующей, а остальные письма ждут следующего
+    вызова.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX['BATCH_SIZE']
+    sent = failed = 0
+    started = time.perf_counter()
+    connection = None
+    try:
+        while True:
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            if connection is None:
+                connection = get_connection(fail_silently=False)
+                try:
+                    connection.open()
+                except Exception as error:
+                    connection = None
+                    defer(batch, error)
+                    failed += len(batch)
+                    break
+            deliver(batch, connection)
+            batch_sent = sum(
+                email.status == OutgoingEmail.SENT for email in batch
+            )
+            sent += batch_sent
+            failed += len(batch) - batch_sent
+            if len(batch) < batch_size:
+                break
+    finally:
+        if connection is not None:
+            connection.close()
+    return {
+        'sent': sent,
+        'failed': failed,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def outbox_metrics():
+    """Глубина очереди и задержка доставки для мониторинга."""
+    now = timezone.now()
+    statuses = dict(
+        OutgoingEmail.objects.order_by().values_list('status')
+        .annotate(total=Count('pk'))
+    )
+    oldest = OutgoingEmail.objects.filter(
+        status=OutgoingEmail.PENDING
+    ).aggregate(oldest=Min('created_at'))['oldest']
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENT
+        ).order_by('-sent_at').values_list(
+            'created_at', 'sent_at'
+        )[:LATENCY_WINDOW]
+    )
+    return {
+        'pending': statuses.get(OutgoingEmail.PENDING, 0),
+        'due': OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING, next_attempt_at__lte=now
+        ).count(),
+        'failed': statuses.get(OutgoingEmail.FAILED, 0),
+        'sent': statuses.get(OutgoingEmail.SENT, 0),
+        'oldest_pending_seconds': (
+            (now - oldest).total_seconds() if oldest else 0
+        ),
+        'latency_p50_seconds': (
+            latencies[len(latencies) // 2] if latencies else None
+        ),
+        'latency_max_seconds': latencies[-1] if latencies else None,
+    }
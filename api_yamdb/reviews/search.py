@@ -0,0 +1,175 @@
+"""Полнотекстовый поиск по произведениям.
+
+Бэкенд выбирается настройкой TITLE_SEARCH_BACKEND (путь к классу) или,
+если она пуста, по типу базы: FTS5 для SQLite, tsvector для PostgreSQL.
+Индекс обновляется сигналами модели Title; после массовой загрузки его
+пересобирает команда rebuild_search_index.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+
+# Сколько лучших совпадений учитывается при ранжировании. Предел
+# применяется после фильтров выборки, поэтому фильтр не теряет
+# совпадения за пределами общей первой тысячи.
+SEARCH_LIMIT = 1000
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def ordered_by_ids(queryset, ids):
+    """Оставляет в выборке только ids и сортирует в их порядке."""
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(
+            *[When(pk=pk, then=Value(position))
+              for position, pk in enumerate(ids)],
+            output_field=IntegerField()
+        )
+    )
+
+
+class SimpleSearchBackend:
+    """Поиск подстроки без индекса и без ранжирования."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) | Q(description__icontains=query)
+        )
+
+    def index(self, title):
+        pass
+
+    def index_many(self, titles):
+        for title in titles:
+            self.index(title)
+
+    def remove(self, title_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTS5Backend(SimpleSearchBackend):
+    """Виртуальная таблица FTS5 с rowid, равным id произведения."""
+
+    table = 'reviews_title_fts'
+
+    @classmethod
+    def is_available(cls):
+        # Наличие таблицы проверяется один раз на соединение с базой.
+        if not hasattr(connection, 'title_fts_available'):
+            connection.title_fts_available = (
+                cls.table in connection.introspection.table_names()
+            )
+        return connection.title_fts_available
+
+    def match_expression(self, query):
+        # Каждое слово - отдельная фраза с поиском по префиксу, так что
+        # пользовательский ввод не разбирается как синтаксис FTS5.
+        return ' '.join(
+            f'"{word}"*' for word in WORD_RE.findall(query)
+        )
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+        sql = (
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s'
+        )
+        params = [expression]
+        if queryset.query.has_filters():
+            # Фильтры (категория, жанр, год) - в том же запросе, до LIMIT.
+            subquery, subquery_params = queryset.order_by().values(
+                'pk'
+            ).query.sql_with_params()
+            sql += f' AND rowid IN ({subquery})'
+            params.extend(subquery_params)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{sql} ORDER BY rank LIMIT %s', [*params, SEARCH_LIMIT]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        return ordered_by_ids(queryset, ids)
+
+    def index(self, title):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [title.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                f'VALUES (%s, %s, %s)',
+                [title.pk, title.name, title.description or '']
+            )
+
+    def index_many(self, titles):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table} '
+                f'(rowid, name, description) VALUES (%s, %s, %s)',
+                [
+                    (title.pk, title.name, title.description or '')
+                    for title in titles
+                ]
+            )
+
+    def remove(self, title_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [title_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                f'SELECT id, name, COALESCE(description, \'\') '
+                f'FROM reviews_title'
+            )
+
+    def is_stale(self):
+        """Грубая проверка: совпадает ли число строк индекса и таблицы."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT (SELECT COUNT(*) FROM {self.table}) '
+                f'!= (SELECT COUNT(*) FROM reviews_title)'
+            )
+            return bool(cursor.fetchone()[0])
+
+
+class PostgresSearchBackend(SimpleSearchBackend):
+    """tsvector по названию (вес A) и описанию (вес B)."""
+
+    config = 'russian'
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+
+        vector = (
+            SearchVector('name', weight='A', config=self.config)
+            + SearchVector('description', weight='B', config=self.config)
+        )
+        search_query = SearchQuery(query, config=self.config)
+        return queryset.annotate(
+            search_rank=SearchRank(vector, search_query)
+        ).filter(search_rank__gt=0).order_by('-search_rank', 'pk')
+
+
+def get_search_backend():
+    path = getattr(settings, 'TITLE_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == 'sqlite' and SQLiteFTS5Backend.is_available():
+        return SQLiteFTS5Backend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return SimpleSearchBackend()
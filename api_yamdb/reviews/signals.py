@@ -0,0 +1,94 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Review, ScoreRollup, Title, titles_being_deleted
+from .search import SQLiteFTS5Backend, get_search_backend
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_delete, sender=Review)
+def load_deferred_score(sender, instance, raw=False, **kwargs):
+    """Оценка из базы для отзыва, загруженного с отложенным score."""
+    if raw or instance._state.adding or hasattr(instance, '_loaded_score'):
+        return
+    score = Review.objects.filter(pk=instance.pk).values_list(
+        'score', flat=True
+    ).first()
+    if score is not None:
+        instance._loaded_score = score
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(sender, instance, created, raw=False, **kwargs):
+    """Учитывает новую или изменённую оценку в рейтинге и сводке."""
+    if raw:
+        return
+    day = timezone.localdate(instance.pub_date)
+    if created:
+        Title.change_rating(instance.title_id, instance.score, 1)
+        ScoreRollup.objects.add(instance.title_id, day, instance.score, 1)
+    else:
+        old_score = getattr(instance, '_loaded_score', instance.score)
+        if instance.score != old_score:
+            Title.change_rating(instance.title_id, instance.score - old_score)
+            ScoreRollup.objects.add(instance.title_id, day, old_score, -1)
+            ScoreRollup.objects.add(
+                instance.title_id, day, instance.score, 1
+            )
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(sender, instance, **kwargs):
+    """Убирает оценку удалённого отзыва из рейтинга и сводки."""
+    if instance.title_id in titles_being_deleted():
+        return
+    # Не getattr со значением по умолчанию: отложенный score после
+    # удаления уже не загрузить.
+    if hasattr(instance, '_loaded_score'):
+        score = instance._loaded_score
+    else:
+        score = instance.score
+    Title.change_rating(instance.title_id, -score, -1)
+    ScoreRollup.objects.add(
+        instance.title_id, timezone.localdate(instance.pub_date), score, -1
+    )
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, raw=False, **kwargs):
+    """Обновляет запись произведения в поисковом индексе."""
+    if not raw:
+        get_search_backend().index(instance)
+
+
+@receiver(pre_delete, sender=Title)
+def mark_title_deleting(sender, instance, **kwargs):
+    titles_being_deleted().add(instance.pk)
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    """Убирает удалённое произведение из поискового индекса."""
+    titles_being_deleted().discard(instance.pk)
+    get_search_backend().remove(instance.pk)
+
+
+def rebuild_stale_search_index(sender, using, **kwargs):
+    """После migrate и flush индекс FTS5 сверяется с таблицей.
+
+    flush очищает таблицы моделей без сигналов, и без этой проверки в
+    индексе остались бы строки удалённых произведений.
+    """
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if hasattr(connection, 'title_fts_available'):
+        del connection.title_fts_available
+    backend = SQLiteFTS5Backend()
+    if backend.is_available() and backend.is_stale():
+        backend.rebuild()
@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +34,35 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Кеш в памяти живёт дольше тестовой базы, поэтому чистим его."""
+    from django.core.cache import caches
+
+    from api.authentication import token_versions
+    from api.slugs import resolvers
+    from api.throttling import stores
+
+    for cache in caches.all():
+        cache.clear()
+    token_versions.clear()
+    for resolver in resolvers.values():
+        resolver.cache.clear()
+    for store in stores.values():
+        store.clear()
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budget(settings):
+    """В тестах превышение бюджета запросов и N+1 - ошибка."""
+    settings.API_QUERY_BUDGET = {
+        **settings.API_QUERY_BUDGET, 'SAMPLE_RATE': 1.0, 'STRICT': True
+    }
+
+
+@pytest.fixture(autouse=True)
+def eager_email(settings):
+    """Письма регистрации сразу попадают в mail.outbox."""
+    settings.EMAIL_OUTBOX = {**settings.EMAIL_OUTBOX, 'EAGER': True}
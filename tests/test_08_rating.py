@@ -0,0 +1,108 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models.signals import pre_delete
+
+from reviews.models import Review, Title
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08StoredRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json().get('rating')
+
+    def test_01_rating_follows_review_writes(self, client, admin_client,
+                                             admin, user, user_client):
+        author_map = {admin: admin_client, user: user_client}
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        assert self.get_rating(client, title_id) == 5, (
+            'Проверьте, что сохранённый рейтинг произведения обновляется '
+            'при создании отзыва.'
+        )
+        assert self.get_rating(client, titles[1]['id']) is None, (
+            'Рейтинг произведения без отзывов должен быть `None`.'
+        )
+
+        review_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=reviews[1]['id']
+        )
+        response = user_client.patch(review_url, data={'score': 10})
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(client, title_id) == 7, (
+            'Проверьте, что сохранённый рейтинг произведения обновляется '
+            'при изменении оценки в отзыве.'
+        )
+
+        response = user_client.delete(review_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(client, title_id) == 5, (
+            'Проверьте, что сохранённый рейтинг произведения обновляется '
+            'при удалении отзыва.'
+        )
+
+        user.delete()
+        admin_review = Review.objects.get(pk=reviews[0]['id'])
+        admin_review.delete()
+        assert self.get_rating(client, title_id) is None
+
+    def test_02_recalculate_ratings_command(self, admin_client, admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        Title.objects.update(rating_sum=0, rating_count=0)
+
+        call_command('recalculate_ratings', stdout=StringIO())
+
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (5, 1), (
+            'Проверьте, что команда `recalculate_ratings` пересчитывает '
+            'сохранённый рейтинг по отзывам.'
+        )
+        assert Title.objects.get(pk=titles[1]['id']).rating_count == 0
+
+    def test_03_deferred_score(self, client, admin_client, admin):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id = titles[0]['id']
+        review = Review.objects.only('text').get(pk=reviews[0]['id'])
+        review.text = 'Новый текст'
+        review.save()
+        assert self.get_rating(client, title_id) == 5, (
+            'Загрузка отзыва без поля score не должна ломать рейтинг.'
+        )
+        review = Review.objects.defer('score').get(pk=reviews[0]['id'])
+        review.score = 3
+        review.save()
+        assert self.get_rating(client, title_id) == 3
+        Review.objects.defer('score').get(pk=reviews[0]['id']).delete()
+        assert self.get_rating(client, title_id) is None
+
+    def test_04_failed_title_delete(self, client, admin_client, admin):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id = titles[0]['id']
+
+        def fail(sender, **kwargs):
+            raise RuntimeError('Ошибка удаления')
+
+        pre_delete.connect(fail, sender=Title)
+        try:
+            with pytest.raises(RuntimeError):
+                Title.objects.get(pk=title_id).delete()
+        finally:
+            pre_delete.disconnect(fail, sender=Title)
+        Review.objects.get(pk=reviews[0]['id']).delete()
+        assert self.get_rating(client, title_id) is None, (
+            'Неудачное удаление произведения не должно отключать пересчёт '
+            'рейтинга при удалении его отзывов.'
+        )
@@ -0,0 +1,152 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reviews.management.commands.import_csv import (
+    build_stages, csv_dependencies, read_chunks
+)
+from reviews.models import Category, Comment, Review, Title, User
+
+CSV_FILES = {
+    'category.csv': 'id,name,slug\n1,Фильм,movie\n2,Книга,book\n',
+    'genre.csv': 'id,name,slug\n1,Драма,drama\n',
+    'titles.csv': (
+        'id,name,year,category\n'
+        '1,Побег из Шоушенка,1994,1\n'
+        '2,Крестный отец,1972,3\n'
+    ),
+    'genre_title.csv': 'id,title_id,genre_id\n1,1,1\n',
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,bingobongo,bingobongo@yamdb.fake,user,,,\n'
+        '101,capt_obvious,capt_obvious@yamdb.fake,admin,,,\n'
+    ),
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,Отлично,100,10,2019-09-24T21:08:21.567Z\n'
+        '2,1,Хорошо,101,7,2019-09-24T21:08:21.567Z\n'
+        '3,2,Нет такого произведения,101,7,2019-09-24T21:08:21.567Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '1,1,Согласен,101,2020-01-13T23:20:02.422Z\n'
+    ),
+}
+
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    for filename, content in CSV_FILES.items():
+        (tmp_path / filename).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09ImportCSV:
+
+    def run_import(self, csv_dir, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_csv', '--path', str(csv_dir), *args,
+            stdout=stdout, stderr=stderr
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_01_import_skips_broken_references(self, csv_dir):
+        stdout, stderr = self.run_import(csv_dir, '--batch-size', '1')
+
+        assert User.objects.filter(username='capt_obvious').exists(), (
+            'Проверьте, что `users.csv` загружается в модель `User`.'
+        )
+        assert Title.objects.count() == 1, (
+            'Строка со ссылкой на несуществующую категорию не должна '
+            'загружаться.'
+        )
+        assert Review.objects.count() == 2
+        assert 'Ошибка в строке 2' in stderr
+        assert 'строк/с' in stdout, (
+            'Проверьте, что команда сообщает скорость загрузки.'
+        )
+        title = Title.objects.get(pk=1)
+        assert (title.rating_sum, title.rating_count) == (17, 2), (
+            'Проверьте, что после импорта пересчитывается рейтинг.'
+        )
+
+    def test_02_import_modes(self, csv_dir):
+        self.run_import(csv_dir)
+        (csv_dir / 'category.csv').write_text(
+            'id,name,slug\n1,Кино,movie\n', encoding='utf-8'
+        )
+
+        self.run_import(csv_dir)
+        assert Category.objects.get(pk=1).name == 'Фильм', (
+            'В режиме `ignore` существующие строки не должны меняться.'
+        )
+
+        self.run_import(csv_dir, '--mode', 'upsert')
+        assert Category.objects.get(pk=1).name == 'Кино', (
+            'В режиме `upsert` существующие строки должны обновляться.'
+        )
+        assert Review.objects.count() == 2
+
+    def test_03_stages_follow_dependencies(self):
+        stages = build_stages()
+        assert stages[0] == ['category.csv', 'genre.csv', 'users.csv'], (
+            'Независимые файлы должны загружаться на одном этапе.'
+        )
+        position = {
+            filename: number
+            for number, stage in enumerate(stages)
+            for filename in stage
+        }
+        for filename, parents in csv_dependencies.items():
+            for parent in parents:
+                assert position[parent] < position[filename], (
+                    f'Файл `{filename}` должен загружаться после `{parent}`.'
+                )
+
+    def test_04_split_file_parts_cover_all_rows(self, csv_dir):
+        path = csv_dir / 'review.csv'
+        parts = [
+            [row['id'] for chunk in read_chunks(path, 1, part, 2)
+             for row in chunk]
+            for part in range(2)
+        ]
+        assert parts == [['1', '3'], ['2']], (
+            'Части большого файла должны покрывать все строки без повторов.'
+        )
+
+    @pytest.mark.parametrize('mode', ('ignore', 'upsert'))
+    def test_05_import_keeps_pub_date(self, csv_dir, mode):
+        self.run_import(csv_dir, '--mode', mode)
+        expected = datetime(2019, 9, 24, 21, 8, 21, 567000,
+                            tzinfo=timezone.utc)
+        assert Review.objects.get(pk=1).pub_date == expected, (
+            'Дата отзыва должна браться из CSV, а не из auto_now_add.'
+        )
+        assert Comment.objects.get(pk=1).pub_date == datetime(
+            2020, 1, 13, 23, 20, 2, 422000, tzinfo=timezone.utc
+        )
+        assert Review._meta.get_field('pub_date').auto_now_add, (
+            'После импорта auto_now_add должен вернуться.'
+        )
+
+    def test_06_upsert_keeps_other_fields(self, csv_dir):
+        user = User.objects.create_superuser(
+            'capt_obvious', 'old@yamdb.fake', 'secret-password', pk=101,
+            confirmation_code='code', token_version=3
+        )
+        self.run_import(csv_dir, '--mode', 'upsert')
+        updated = User.objects.get(pk=101)
+        assert updated.email == 'capt_obvious@yamdb.fake', (
+            'Колонки из CSV должны обновляться.'
+        )
+        assert updated.is_superuser and updated.is_staff, (
+            'upsert не должен сбрасывать поля, которых нет в CSV.'
+        )
+        assert updated.check_password('secret-password')
+        assert updated.confirmation_code == 'code'
+        assert updated.token_version == 3
+        assert updated.date_joined == user.date_joined
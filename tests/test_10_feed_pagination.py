@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from reviews.models import Comment, Review, Title, User
+
+
+@pytest.fixture
+def title_with_reviews(django_user_model):
+    title = Title.objects.create(name='Терминатор', year=1984)
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        for number in range(25)
+    ]
+    for author in authors:
+        Review.objects.create(
+            title=title, author=author, text=author.username, score=5
+        )
+    # Половина отзывов с одинаковой датой: порядок задаёт id.
+    Review.objects.filter(author__in=authors[:12]).update(
+        pub_date=timezone.now()
+    )
+    return title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10FeedPagination:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_page_number_shape_is_default(self, client,
+                                             title_with_reviews):
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_with_reviews.id)
+        data = client.get(url).json()
+        assert set(data) == {'count', 'next', 'previous', 'results'}, (
+            'Без параметра `cursor` ответ должен сохранять формат '
+            'постраничной пагинации.'
+        )
+        assert data['count'] == 25
+
+    def test_02_cursor_walks_feed_in_both_directions(self, client,
+                                                     title_with_reviews):
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_with_reviews.id)
+        expected = list(
+            title_with_reviews.reviews.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+
+        response = client.get(url, {'cursor': ''})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert set(data) == {'next', 'previous', 'results'}, (
+            'В курсорном режиме ответ не должен содержать `count`.'
+        )
+        assert data['previous'] is None
+        pages = [data]
+        while data['next']:
+            data = client.get(data['next']).json()
+            pages.append(data)
+        walked = [review['id'] for page in pages for review in page['results']]
+        assert walked == expected, (
+            'Проверьте, что курсорная пагинация обходит все отзывы по '
+            '(pub_date, id) без пропусков и повторов.'
+        )
+
+        previous = client.get(pages[-1]['previous']).json()
+        assert previous['results'] == pages[-2]['results'], (
+            'Ссылка `previous` должна вести на предыдущую страницу.'
+        )
+
+    def test_03_invalid_cursor(self, client, title_with_reviews):
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_with_reviews.id)
+        response = client.get(url, {'cursor': 'not-a-cursor'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_04_comments_cursor(self, client, title_with_reviews):
+        review = title_with_reviews.reviews.first()
+        author = User.objects.first()
+        for number in range(3):
+            Comment.objects.create(
+                review=review, author=author, text=str(number)
+            )
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=title_with_reviews.id, review_id=review.id
+        )
+        data = client.get(url, {'cursor': ''}).json()
+        assert [comment['text'] for comment in data['results']] == [
+            '2', '1', '0'
+        ]
+        assert data['next'] is None
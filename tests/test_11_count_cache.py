@@ -0,0 +1,72 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Title
+from tests.utils import create_titles
+
+
+def count_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'COUNT(' in query['sql'].upper()
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11CountCache:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_count_is_cached_until_write(self, client, admin_client):
+        create_titles(admin_client)
+
+        client.get(self.TITLES_URL)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL, {'page': 1})
+        assert response.json()['count'] == 2
+        assert not count_queries(context), (
+            'Повторный запрос списка не должен выполнять COUNT(*).'
+        )
+        assert response['X-Count-Exact'] == 'true'
+
+        Title.objects.create(name='Чужой', year=1979)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL)
+        assert response.json()['count'] == 3, (
+            'После записи в коллекцию счётчик должен пересчитываться.'
+        )
+        assert count_queries(context)
+
+    def test_02_filters_have_own_count(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        client.get(self.TITLES_URL)
+        response = client.get(self.TITLES_URL, {'year': titles[0]['year']})
+        assert response.json()['count'] == 1
+
+    def test_03_estimated_mode(self, client, admin_client, settings):
+        settings.API_COUNT_CACHE = {'MODE': 'estimated', 'TIMEOUT': 60}
+        create_titles(admin_client)
+        client.get(self.TITLES_URL)
+
+        Title.objects.create(name='Чужой', year=1979)
+        response = client.get(self.TITLES_URL)
+        assert response.json()['count'] == 2, (
+            'В режиме `estimated` счётчик живёт до истечения TIMEOUT.'
+        )
+        assert response['X-Count-Exact'] == 'false'
+
+    def test_04_count_disabled(self, client, admin_client):
+        create_titles(admin_client)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL, {'count': 'false'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data['count'] is None
+        assert not count_queries(context), (
+            'С параметром `count=false` COUNT(*) выполняться не должен.'
+        )
+        assert len(data['results']) == 2
+        assert data['next'] is None
@@ -0,0 +1,121 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.checks import check_shared_cache
+from reviews.models import Category, Review
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12ResponseCache:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+
+    def get_queries(self, client, url, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, params)
+        return response, len(context.captured_queries)
+
+    def test_01_anonymous_reads_are_cached(self, client, admin_client, admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        urls = [
+            self.TITLES_URL,
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+        ]
+        for url in urls:
+            first, _ = self.get_queries(client, url)
+            second, queries = self.get_queries(client, url)
+            assert queries == 0, (
+                f'Повторный GET-запрос к `{url}` должен отдаваться из кеша.'
+            )
+            assert second.json() == first.json()
+
+    def test_02_writes_evict_only_affected_keys(self, client, admin_client,
+                                                admin, user):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        first_reviews = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        second_reviews = self.REVIEWS_URL_TEMPLATE.format(
+            title_id=titles[1]['id']
+        )
+        for url in (self.TITLES_URL, first_reviews, second_reviews,
+                    '/api/v1/categories/'):
+            client.get(url)
+
+        Review.objects.create(
+            title_id=titles[0]['id'], author=user, text='text', score=1
+        )
+
+        response, queries = self.get_queries(client, first_reviews)
+        assert queries and response.json()['count'] == 2, (
+            'Новый отзыв должен сбрасывать кеш списка отзывов произведения.'
+        )
+        _, queries = self.get_queries(client, self.TITLES_URL)
+        assert queries, (
+            'Новый отзыв меняет рейтинг и должен сбрасывать кеш списка '
+            'произведений.'
+        )
+        _, queries = self.get_queries(client, second_reviews)
+        assert queries == 0, (
+            'Отзыв к одному произведению не должен сбрасывать кеш отзывов '
+            'другого.'
+        )
+        _, queries = self.get_queries(client, '/api/v1/categories/')
+        assert queries == 0
+
+    def test_03_category_rename_evicts_titles(self, client, admin_client,
+                                              admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        client.get(url)
+
+        category = Category.objects.get(slug='films')
+        category.name = 'Кино'
+        category.save()
+
+        response = client.get(url)
+        assert response.json()['category']['name'] == 'Кино'
+
+    def test_04_role_is_part_of_key(self, client, admin_client, admin):
+        create_reviews(admin_client, {admin: admin_client})
+        client.get(self.TITLES_URL)
+        _, queries = self.get_queries(admin_client, self.TITLES_URL)
+        assert queries, (
+            'Ответы для разных ролей должны кешироваться отдельно.'
+        )
+
+    def test_05_file_backend(self, client, admin_client, admin, settings,
+                             tmp_path):
+        create_reviews(admin_client, {admin: admin_client})
+        settings.CACHES = {
+            'default': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': str(tmp_path),
+            }
+        }
+        client.get(self.TITLES_URL)
+        _, queries = self.get_queries(client, self.TITLES_URL)
+        assert queries == 0, (
+            'Кеш ответов должен работать с файловым бэкендом.'
+        )
+        assert any(tmp_path.iterdir())
+
+    def test_06_deploy_check_warns_about_local_cache(self, settings,
+                                                     tmp_path):
+        assert [warning.id for warning in check_shared_cache(None)] == [
+            'api.W001'
+        ], 'Кеш в памяти процесса не сбрасывается в других процессах.'
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }}
+        assert check_shared_cache(None) == []
@@ -0,0 +1,105 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review
+from tests.utils import create_reviews
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def test_01_validators_on_read_endpoints(self, client, admin_client,
+                                             admin):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        urls = (
+            self.TITLES_URL,
+            f'{self.TITLES_URL}{titles[0]["id"]}/',
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id']),
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[0]['id']
+            ),
+        )
+        for url in urls:
+            response = client.get(url)
+            assert response.has_header('ETag'), (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит ETag.'
+            )
+            assert response.has_header('Last-Modified')
+            assert response['ETag'].startswith('"')
+
+    def test_02_if_none_match_skips_queries(self, client, admin_client,
+                                            admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        etag = client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что на запрос с актуальным If-None-Match '
+            'возвращается ответ со статусом 304.'
+        )
+        assert not response.content
+        assert not context.captured_queries, (
+            'Ответ 304 должен отдаваться без запросов к базе.'
+        )
+
+    def test_03_write_changes_etag(self, client, admin_client, admin, user):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        other_url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]['id'])
+        etag = client.get(url)['ETag']
+        other_etag = client.get(other_url)['ETag']
+
+        Review.objects.create(
+            title_id=titles[0]['id'], author=user, text='text', score=1
+        )
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'После записи в коллекцию ETag должен меняться.'
+        )
+        assert response['ETag'] != etag
+        response = client.get(other_url, HTTP_IF_NONE_MATCH=other_etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_04_if_modified_since(self, client, admin_client, admin):
+        create_reviews(admin_client, {admin: admin_client})
+        last_modified = client.get(self.TITLES_URL)['Last-Modified']
+        response = client.get(
+            self.TITLES_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_05_if_none_match_any(self, client, admin_client, admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id = titles[0]['id']
+        for url in (
+            f'{self.TITLES_URL}{title_id}/',
+            self.REVIEWS_URL_TEMPLATE.format(title_id=title_id),
+        ):
+            response = client.get(url, HTTP_IF_NONE_MATCH='*')
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                '`If-None-Match: *` совпадает с существующим ресурсом.'
+            )
+            assert response['ETag']
+        for url in (
+            f'{self.TITLES_URL}999/',
+            self.REVIEWS_URL_TEMPLATE.format(title_id=999),
+        ):
+            response = client.get(url, HTTP_IF_NONE_MATCH='*')
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                'Для несуществующего ресурса `If-None-Match: *` не должен '
+                'давать 304.'
+            )
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Title
+from reviews import search
+from reviews.search import SQLiteFTS5Backend, get_search_backend
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14TitleSearch:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def search(self, client, **params):
+        response = client.get(self.TITLES_URL, params)
+        assert response.status_code == HTTPStatus.OK
+        return [title['name'] for title in response.json()['results']]
+
+    def test_01_fts_backend_is_used(self):
+        assert isinstance(get_search_backend(), SQLiteFTS5Backend), (
+            'На SQLite с FTS5 поиск должен идти через полнотекстовый индекс.'
+        )
+
+    def test_02_search_name_and_description(self, client, admin_client):
+        create_titles(admin_client)
+        assert self.search(client, q='терминатор') == ['Терминатор']
+        assert self.search(client, q='yippie') == ['Крепкий орешек'], (
+            'Проверьте, что параметр `q` ищет и по описанию.'
+        )
+        assert self.search(client, q='креп') == ['Крепкий орешек'], (
+            'Проверьте, что поиск учитывает префиксы слов.'
+        )
+        assert self.search(client, q='"*') == []
+
+    def test_03_search_is_ranked(self, client, admin_client):
+        create_titles(admin_client)
+        Title.objects.create(
+            name='Фильм', year=1990, description='Про терминатор'
+        )
+        Title.objects.create(
+            name='Терминатор 2', year=1991, description='Терминатор снова'
+        )
+        names = self.search(client, q='терминатор')
+        assert names[0] == 'Терминатор 2', (
+            'Более релевантные произведения должны идти первыми.'
+        )
+        assert set(names) == {'Терминатор', 'Терминатор 2', 'Фильм'}
+
+    def test_04_search_combines_with_filters(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        Title.objects.create(name='Терминатор 2', year=1991)
+        assert self.search(client, q='терминатор', year=1984) == [
+            'Терминатор'
+        ]
+        assert self.search(
+            client, q='терминатор', genre=genres[0]['slug'],
+            category=categories[0]['slug']
+        ) == ['Терминатор']
+
+    def test_05_index_follows_writes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        title.name = 'Чужой'
+        title.save()
+        assert self.search(client, q='терминатор') == []
+        assert self.search(client, q='чужой') == ['Чужой']
+        title.delete()
+        assert self.search(client, q='чужой') == []
+
+    def test_06_limit_applies_after_filters(self, client, monkeypatch):
+        monkeypatch.setattr(search, 'SEARCH_LIMIT', 5)
+        Title.objects.bulk_create(
+            Title(name=f'Терминатор {number}', year=2000,
+                  description='терминатор терминатор')
+            for number in range(10)
+        )
+        Title.objects.create(name='Терминатор', year=1984)
+        get_search_backend().rebuild()
+        assert self.search(client, q='терминатор', year=1984) == [
+            'Терминатор'
+        ], 'Фильтр должен находить совпадения за пределом SEARCH_LIMIT.'
+        response = client.get(self.TITLES_URL, {'q': 'терминатор'})
+        assert response.json()['count'] == 5
@@ -0,0 +1,38 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from benchmarks.data import generate_csv
+from reviews.models import Comment, GenreTitle, Review, Title, User
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15BenchmarkData:
+
+    def test_01_generated_csv_imports_cleanly(self, tmp_path):
+        reviews = generate_csv(
+            tmp_path, titles=20, users=8, reviews_per_title=3,
+            comments_per_review=2
+        )
+        stderr = StringIO()
+        call_command(
+            'import_csv', '--path', str(tmp_path),
+            stdout=StringIO(), stderr=stderr
+        )
+
+        assert stderr.getvalue() == '', (
+            'Сгенерированные файлы должны загружаться без ошибок.'
+        )
+        assert Title.objects.count() == 20
+        assert User.objects.count() == 8
+        assert GenreTitle.objects.count() == 40
+        assert reviews == 8 + 19 * 3
+        assert Review.objects.count() == reviews, (
+            'Один автор не должен оставлять два отзыва на произведение.'
+        )
+        assert Comment.objects.count() == reviews * 2
+        assert Title.objects.get(pk=1).rating_count == 8, (
+            'Первое произведение должно получить отзыв от каждого '
+            'пользователя.'
+        )
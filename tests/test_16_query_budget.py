@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.queries import QueryBudgetExceeded, normalize_sql, record_queries
+from api.views import TitlesViewSet
+from reviews.models import Category, Title
+
+
+def create_titles(count):
+    start = Category.objects.count()
+    for number in range(start, start + count):
+        category = Category.objects.create(
+            name=f'Категория {number}', slug=f'category-{number}'
+        )
+        Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16QueryBudget:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_normalize_sql(self):
+        assert normalize_sql(
+            'SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21'
+        ) == normalize_sql(
+            'SELECT * FROM t WHERE id IN (%s) LIMIT 10'
+        ), 'Шаблон запроса не должен зависеть от числа параметров и LIMIT.'
+
+    def test_02_titles_list_does_not_grow_with_page(self, client):
+        create_titles(1)
+        with record_queries() as one:
+            client.get(self.TITLES_URL)
+        create_titles(5)
+        with record_queries() as many:
+            client.get(self.TITLES_URL, {'page': 1})
+        assert many.count == one.count, (
+            'Число запросов к списку произведений не должно зависеть от '
+            'числа произведений на странице.'
+        )
+        assert not many.duplicates(2)
+
+    def test_03_reviews_of_missing_title(self, client):
+        create_titles(1)
+        title = Title.objects.get()
+        url = '/api/v1/titles/{}/reviews/'
+        assert client.get(url.format(title.id)).status_code == HTTPStatus.OK
+        response = client.get(url.format(title.id + 1))
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Отзывы несуществующего произведения должны давать 404.'
+        )
+
+    def test_04_budget_exceeded(self, client, monkeypatch, settings,
+                                caplog):
+        create_titles(1)
+        monkeypatch.setattr(TitlesViewSet, 'query_budget', {'list': 1})
+        with pytest.raises(QueryBudgetExceeded):
+            client.get(self.TITLES_URL)
+
+        settings.API_QUERY_BUDGET = {
+            **settings.API_QUERY_BUDGET, 'STRICT': False
+        }
+        with caplog.at_level('WARNING', logger='api.queries'):
+            response = client.get(self.TITLES_URL, {'page': 1})
+        assert response.status_code == HTTPStatus.OK
+        assert 'при бюджете 1 (list)' in caplog.text, (
+            'Вне режима STRICT превышение бюджета должно попадать в лог.'
+        )
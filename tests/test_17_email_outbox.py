@@ -0,0 +1,150 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+from reviews.outbox import enqueue_email, outbox_metrics, send_pending
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class UnreachableBackend(EmailBackend):
+
+    def open(self):
+        raise ConnectionError('SMTP недоступен')
+
+
+class FailingBackend(EmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+@pytest.fixture
+def queued(settings):
+    settings.EMAIL_OUTBOX = {**settings.EMAIL_OUTBOX, 'EAGER': False}
+    return settings
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17EmailOutbox:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+
+    def test_01_signup_only_enqueues(self, client, queued):
+        data = {'email': 'queued@yamdb.fake', 'username': 'queued'}
+        response = client.post(self.URL_SIGNUP, data=data)
+
+        assert response.json() == data
+        assert len(mail.outbox) == 0, (
+            'Без EAGER регистрация не должна отправлять письмо сама.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.to == data['email']
+        assert outbox_metrics()['pending'] == 1
+
+        stdout = StringIO()
+        call_command('send_emails', stdout=stdout)
+        assert 'Отправлено: 1' in stdout.getvalue()
+        assert mail.outbox[0].to == [data['email']]
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+        metrics = outbox_metrics()
+        assert (metrics['pending'], metrics['sent']) == (0, 1)
+        assert metrics['latency_p50_seconds'] is not None
+
+    def test_02_batches_share_one_connection(self, queued):
+        queued.EMAIL_BACKEND = 'tests.test_17_email_outbox.CountingBackend'
+        CountingBackend.opened = 0
+        for number in range(5):
+            enqueue_email('Тема', 'Текст', [f'user{number}@yamdb.fake'])
+
+        result = send_pending(batch_size=2)
+
+        assert result['sent'] == 5
+        assert len(mail.outbox) == 5
+        assert CountingBackend.opened == 1, (
+            'Все пачки должны отправляться через одно соединение.'
+        )
+
+    def test_03_retry_with_backoff(self, queued):
+        queued.EMAIL_BACKEND = 'tests.test_17_email_outbox.FailingBackend'
+        queued.EMAIL_OUTBOX = {
+            **queued.EMAIL_OUTBOX, 'RETRY_DELAY': 30, 'MAX_ATTEMPTS': 2
+        }
+        email = enqueue_email('Тема', 'Текст', ['user@yamdb.fake'])
+
+        assert send_pending()['failed'] == 1
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.attempts == 1
+        assert 'SMTP недоступен' in email.last_error
+        assert email.next_attempt_at > timezone.now() + timedelta(
+            seconds=25
+        ), 'Повторная попытка должна откладываться на RETRY_DELAY.'
+        assert send_pending()['failed'] == 0, (
+            'Письмо не должно отправляться раньше следующей попытки.'
+        )
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        send_pending()
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.FAILED, (
+            'После MAX_ATTEMPTS попыток письмо должно быть помечено '
+            'неотправленным.'
+        )
+
+    def test_04_eager_send_keeps_email_queued_on_open_error(self, client,
+                                                            settings):
+        settings.EMAIL_BACKEND = (
+            'tests.test_17_email_outbox.UnreachableBackend'
+        )
+        data = {'email': 'eager@yamdb.fake', 'username': 'eager'}
+        response = client.post(self.URL_SIGNUP, data=data)
+
+        assert response.status_code == 200, (
+            'Ошибка соединения с почтой не должна ломать регистрацию.'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.PENDING, (
+            'Неотправленное письмо должно остаться в очереди.'
+        )
+        assert 'SMTP недоступен' in email.last_error
+
+    def test_05_send_pending_open_error(self, queued):
+        queued.EMAIL_BACKEND = 'tests.test_17_email_outbox.UnreachableBackend'
+        for number in range(3):
+            enqueue_email('Тема', 'Текст', [f'user{number}@yamdb.fake'])
+
+        result = send_pending(batch_size=2)
+
+        assert result['failed'] == 2, (
+            'Ошибка соединения не должна прерывать обработку очереди.'
+        )
+        deferred = OutgoingEmail.objects.filter(attempts=1)
+        assert deferred.count() == 2, (
+            'Взятой пачке должна засчитываться попытка.'
+        )
+        for email in deferred:
+            assert email.status == OutgoingEmail.PENDING
+            assert 'SMTP недоступен' in email.last_error
+            assert email.next_attempt_at > timezone.now() + timedelta(
+                seconds=25
+            )
+        assert OutgoingEmail.objects.filter(attempts=0).count() == 1
+
+        stdout = StringIO()
+        call_command('send_emails', stdout=stdout)
+        assert 'Ошибок: 1' in stdout.getvalue()
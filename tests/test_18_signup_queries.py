@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.queries import record_queries
+from api.serializers import SignUpSerializer
+from reviews.models import OutgoingEmail, User
+
+
+@pytest.fixture
+def queued(settings):
+    settings.EMAIL_OUTBOX = {**settings.EMAIL_OUTBOX, 'EAGER': False}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18SignupQueries:
+
+    URL_SIGNUP = '/api/v1/auth/signup/'
+    DATA = {'email': 'burst@yamdb.fake', 'username': 'burst'}
+
+    def signup(self, client, data):
+        with record_queries() as recorder:
+            response = client.post(self.URL_SIGNUP, data=data)
+        return response, recorder.count
+
+    def test_01_new_user(self, client, queued):
+        response, queries = self.signup(client, self.DATA)
+        assert response.status_code == HTTPStatus.OK
+        # SELECT пользователя, BEGIN, INSERT пользователя, INSERT письма.
+        assert queries == 4, (
+            'Регистрация нового пользователя должна выполнять один поиск '
+            'по username или email.'
+        )
+
+    def test_02_repeated_signup_sends_new_code(self, client, queued):
+        self.signup(client, self.DATA)
+
+        response, queries = self.signup(client, self.DATA)
+
+        assert response.status_code == HTTPStatus.OK
+        assert queries == 4
+        assert OutgoingEmail.objects.count() == 2, (
+            'Повторная регистрация должна отправлять новый код.'
+        )
+        code = User.objects.get().confirmation_code
+        assert code in OutgoingEmail.objects.latest('pk').body
+
+    @pytest.mark.parametrize('data', [
+        {'email': 'other@yamdb.fake', 'username': 'burst'},
+        {'email': 'burst@yamdb.fake', 'username': 'other'},
+    ])
+    def test_03_conflict_takes_one_query(self, client, queued, data):
+        self.signup(client, self.DATA)
+        response, queries = self.signup(client, data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert queries == 1
+        assert User.objects.count() == 1
+
+    def test_04_race_is_bad_request(self, client, queued, monkeypatch):
+        self.signup(client, self.DATA)
+        # Как если бы второй запрос не увидел пользователя при проверке.
+        monkeypatch.setattr(SignUpSerializer, 'validate', lambda self, d: d)
+        response, _ = self.signup(
+            client, {'email': 'other@yamdb.fake', 'username': 'burst'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Нарушение уникальности при гонке должно давать 400, а не 500.'
+        )
+        assert OutgoingEmail.objects.count() == 1
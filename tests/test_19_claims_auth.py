@@ -0,0 +1,77 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.queries import record_queries
+from reviews.models import User
+
+
+def client_for(user, confirmation_code='123456'):
+    User.objects.filter(pk=user.pk).update(
+        confirmation_code=confirmation_code
+    )
+    response = APIClient().post('/api/v1/auth/token/', {
+        'username': user.username, 'confirmation_code': confirmation_code
+    })
+    assert response.status_code == HTTPStatus.OK
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}'
+    )
+    return client
+
+
+def user_queries(recorder):
+    return [sql for _, sql, _ in recorder.queries if '"reviews_user"' in sql]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19ClaimsAuth:
+
+    def test_01_no_user_query_with_claims(self, admin):
+        client = client_for(admin)
+        client.get('/api/v1/users/')
+        with record_queries() as recorder:
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert user_queries(recorder) == [], (
+            'Пользователь из токена с claims не должен читаться из базы.'
+        )
+
+    def test_02_me_returns_full_user(self, user):
+        client = client_for(user)
+        data = client.get('/api/v1/users/me/').json()
+        assert data['email'] == user.email
+        assert data['bio'] == user.bio
+
+        response = client.patch('/api/v1/users/me/', {'first_name': 'Имя'})
+        assert response.status_code == HTTPStatus.OK
+        user.refresh_from_db()
+        assert (user.first_name, user.bio) == ('Имя', 'user bio'), (
+            'PATCH /users/me/ не должен затирать поля, которых нет в токене.'
+        )
+
+    def test_03_role_change_invalidates_claims(self, admin, user):
+        admin_client = client_for(admin)
+        old_client = client_for(user)
+        user.role = 'admin'
+        user.save()
+        assert old_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.OK
+        ), 'Токен, выданный до смены роли, должен получать новую роль.'
+        promoted_client = client_for(user)
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', {'role': 'user'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert promoted_client.get('/api/v1/users/').status_code == (
+            HTTPStatus.FORBIDDEN
+        ), 'После смены роли старые claims токена не должны действовать.'
+
+    def test_04_deleted_user(self, admin, user):
+        client = client_for(user)
+        user.delete()
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
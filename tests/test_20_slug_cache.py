@@ -0,0 +1,150 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+from api.queries import record_queries
+from reviews.models import Category, Genres, Title
+
+
+def slug_queries(recorder):
+    return [
+        sql for _, sql, _ in recorder.queries
+        if '"slug" IN' in sql
+    ]
+
+
+def create_catalog():
+    Category.objects.create(name='Фильм', slug='movie')
+    Category.objects.create(name='Книга', slug='book')
+    for slug in ('drama', 'comedy', 'horror'):
+        Genres.objects.create(name=slug, slug=slug)
+
+
+def delete_without_signals(model, slug):
+    """Удаление, которое этот процесс не заметил: как в другом процессе."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {model._meta.db_table} WHERE slug = %s', [slug]
+        )
+
+
+def title_data(**kwargs):
+    data = {
+        'name': 'Произведение',
+        'year': 2000,
+        'category': 'movie',
+        'genre': ['drama', 'comedy'],
+    }
+    data.update(kwargs)
+    return data
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20SlugCache:
+
+    def test_01_warm_cache_skips_slug_queries(self, admin_client):
+        create_catalog()
+        with record_queries() as cold:
+            response = admin_client.post('/api/v1/titles/', title_data())
+        assert response.status_code == HTTPStatus.CREATED
+        assert len(slug_queries(cold)) == 2, (
+            'Категория и все жанры должны искаться двумя запросами.'
+        )
+        with record_queries() as warm:
+            response = admin_client.post('/api/v1/titles/', title_data())
+        assert response.status_code == HTTPStatus.CREATED
+        assert slug_queries(warm) == [], (
+            'Известные slug не должны повторно читаться из базы.'
+        )
+        assert warm.count < cold.count
+
+    def test_02_genres_saved(self, admin_client):
+        create_catalog()
+        response = admin_client.post('/api/v1/titles/', title_data())
+        assert response.status_code == HTTPStatus.CREATED
+        title = Title.objects.get(pk=response.json()['id'])
+        assert title.category.slug == 'movie'
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+        assert set(response.json()['genre']) == {'drama', 'comedy'}
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/',
+            {'genre': ['comedy', 'horror'], 'category': 'book'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'comedy', 'horror'
+        }, 'PATCH должен заменить жанры произведения.'
+        assert set(response.json()['genre']) == {'comedy', 'horror'}
+        assert Title.objects.get(pk=title.pk).category.slug == 'book'
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{title.pk}/', {'name': 'Новое имя'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert title.genre.count() == 2, (
+            'PATCH без genre не должен менять жанры.'
+        )
+
+    def test_03_unknown_slug(self, admin_client):
+        create_catalog()
+        response = admin_client.post(
+            '/api/v1/titles/', title_data(genre=['drama', 'missing'])
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'genre' in response.json()
+        response = admin_client.post(
+            '/api/v1/titles/', title_data(category='missing')
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'category' in response.json()
+        assert not Title.objects.exists()
+
+    def test_04_invalidated_on_change(self, admin_client):
+        create_catalog()
+        admin_client.post('/api/v1/titles/', title_data())
+
+        Genres.objects.filter(slug='drama').delete()
+        response = admin_client.post('/api/v1/titles/', title_data())
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Удалённый жанр не должен браться из кеша.'
+        )
+
+        category = Category.objects.get(slug='movie')
+        category.slug = 'film'
+        category.save()
+        response = admin_client.post(
+            '/api/v1/titles/', title_data(genre=['comedy'])
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Старый slug переименованной категории не должен работать.'
+        )
+        response = admin_client.post(
+            '/api/v1/titles/', title_data(category='film', genre=['comedy'])
+        )
+        assert response.status_code == HTTPStatus.CREATED
+
+    @pytest.mark.parametrize('field,model,data', (
+        ('genre', Genres, {'genre': ['drama']}),
+        ('category', Category, {'category': 'book', 'genre': []}),
+    ))
+    def test_05_deleted_by_another_process(self, admin_client, field, model,
+                                           data):
+        create_catalog()
+        response = admin_client.post(
+            '/api/v1/titles/', title_data(name='', **data), format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        delete_without_signals(model, 'drama' if model is Genres else 'book')
+
+        response = admin_client.post(
+            '/api/v1/titles/', title_data(**data), format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Устаревший id из кеша должен давать 400, а не 500.'
+        )
+        assert field in response.json()
+        assert not Title.objects.exists()
@@ -0,0 +1,177 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+
+from api.queries import record_queries
+from reviews.models import Category, Genres, Title
+from reviews.search import get_search_backend
+
+BULK_URL = '/api/v1/titles/bulk/'
+
+
+def create_catalog():
+    Category.objects.create(name='Фильм', slug='movie')
+    for slug in ('drama', 'comedy'):
+        Genres.objects.create(name=slug, slug=slug)
+
+
+def make_rows(count):
+    return [
+        {
+            'name': f'Произведение {number}',
+            'year': 2000,
+            'category': 'movie',
+            'genre': ['drama', 'comedy'] if number % 2 else ['drama'],
+        }
+        for number in range(count)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21TitlesBulk:
+
+    def test_01_json_array(self, admin_client):
+        create_catalog()
+        response = admin_client.post(BULK_URL, make_rows(3), format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        data = response.json()
+        assert (data['created'], data['failed']) == (3, 0)
+        ids = [row['id'] for row in data['results']]
+        titles = Title.objects.in_bulk(ids)
+        assert [titles[pk].name for pk in ids] == [
+            'Произведение 0', 'Произведение 1', 'Произведение 2'
+        ], 'id в отчёте должны соответствовать строкам запроса.'
+        assert set(
+            titles[ids[1]].genre.values_list('slug', flat=True)
+        ) == {'drama', 'comedy'}
+        assert list(
+            titles[ids[0]].genre.values_list('slug', flat=True)
+        ) == ['drama']
+
+    def test_02_ndjson(self, admin_client):
+        create_catalog()
+        body = '\n'.join(json.dumps(row) for row in make_rows(2)) + '\n\n'
+        response = admin_client.generic(
+            'POST', BULK_URL, body.encode(),
+            content_type='application/x-ndjson'
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['created'] == 2
+        assert Title.objects.count() == 2
+
+        response = admin_client.generic(
+            'POST', BULK_URL, b'{"name": "x"}\n{oops\n',
+            content_type='application/x-ndjson'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'Строка 2' in response.json()['detail']
+
+    def test_03_report_per_row(self, admin_client):
+        create_catalog()
+        rows = make_rows(2)
+        rows.insert(1, {'name': 'Без категории', 'year': 2000})
+        rows.append({**make_rows(1)[0], 'genre': ['missing']})
+        rows.append('не объект')
+        response = admin_client.post(BULK_URL, rows, format='json')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert (data['created'], data['failed']) == (2, 3)
+        results = data['results']
+        assert 'id' in results[0] and 'id' in results[2]
+        assert 'category' in results[1]['errors']
+        assert 'genre' in results[3]['errors']
+        assert 'errors' in results[4]
+        assert Title.objects.count() == 2
+
+        response = admin_client.post(BULK_URL, rows[1:2], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()['created'] == 0
+
+    def test_04_constant_lookups(self, admin_client):
+        create_catalog()
+        with record_queries() as recorder:
+            response = admin_client.post(
+                BULK_URL, make_rows(20), format='json'
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        slug_queries = [
+            sql for _, sql, _ in recorder.queries if '"slug" IN' in sql
+        ]
+        assert len(slug_queries) == 2, (
+            'slug всех строк должны разрешаться двумя запросами.'
+        )
+        assert not [
+            sql for _, sql, _ in recorder.queries
+            if 'INTO "reviews_genretitle"' in sql
+        ][1:], 'Связи с жанрами должны вставляться одной пачкой.'
+
+    def test_05_searchable_and_listed(self, admin_client, client):
+        create_catalog()
+        assert client.get('/api/v1/titles/').json()['count'] == 0
+        admin_client.post(BULK_URL, make_rows(2), format='json')
+        assert client.get('/api/v1/titles/').json()['count'] == 2, (
+            'Кеш списка произведений должен сбрасываться после загрузки.'
+        )
+        found = get_search_backend().search(
+            Title.objects.all(), 'Произведение'
+        )
+        assert found.count() == 2
+
+    def test_06_permissions_and_limits(self, user_client, admin_client,
+                                       settings):
+        create_catalog()
+        response = user_client.post(BULK_URL, make_rows(1), format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        response = admin_client.post(BULK_URL, [], format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = admin_client.post(BULK_URL, {'name': 'x'}, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        settings.TITLES_BULK = {**settings.TITLES_BULK, 'MAX_ROWS': 2}
+        response = admin_client.post(BULK_URL, make_rows(3), format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert not Title.objects.exists()
+
+    def test_07_genre_deleted_by_another_process(self, admin_client):
+        create_catalog()
+        rows = make_rows(2)
+        # Первая загрузка не проходит проверку, но кладёт slug в кеш.
+        admin_client.post(
+            BULK_URL, [{**row, 'name': ''} for row in rows], format='json'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Genres._meta.db_table} WHERE slug = %s',
+                ['comedy']
+            )
+        response = admin_client.post(BULK_URL, rows, format='json')
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert (data['created'], data['failed']) == (1, 1), (
+            'Строка с удалённым жанром должна попасть в отчёт с ошибкой.'
+        )
+        assert 'genre' in data['results'][1]['errors']
+
+    def test_08_batched_title_inserts(self, admin_client, settings):
+        create_catalog()
+        settings.TITLES_BULK = {**settings.TITLES_BULK, 'BATCH_SIZE': 10}
+        Title.objects.create(name='Старое', year=2000)
+        Title.objects.create(name='Удалённое', year=2000).delete()
+        with record_queries() as recorder:
+            response = admin_client.post(
+                BULK_URL, make_rows(25), format='json'
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        inserts = [
+            sql for _, sql, _ in recorder.queries
+            if sql.startswith('INSERT INTO "reviews_title"')
+        ]
+        assert len(inserts) == 3, (
+            'Произведения должны вставляться пачками, а не по одному.'
+        )
+        ids = [row['id'] for row in response.json()['results']]
+        titles = Title.objects.in_bulk(ids)
+        assert [titles[pk].name for pk in ids] == [
+            row['name'] for row in make_rows(25)
+        ], 'id в отчёте должны соответствовать строкам запроса.'
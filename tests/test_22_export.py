@@ -0,0 +1,111 @@
+import asyncio
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+
+from api.queries import record_queries
+from benchmarks.data import generate_csv
+from reviews.export import csv_columns, export_lines
+from reviews.models import Comment, Review
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        return list(csv.reader(file))
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    generate_csv(source, titles=20, users=10, reviews_per_title=3)
+    call_command('import_csv', '--path', str(source), stdout=StringIO())
+    return source
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22Export:
+
+    def test_01_command_round_trip(self, catalog, tmp_path):
+        target = tmp_path / 'export'
+        call_command('export_csv', '--path', str(target), stdout=StringIO())
+        for filename in csv_columns:
+            assert read_csv(target / filename) == read_csv(
+                catalog / filename
+            ), f'Выгрузка {filename} должна совпадать с исходным файлом.'
+
+    def test_02_chunks_from_one_query(self, catalog):
+        with record_queries() as recorder:
+            chunks = list(export_lines('review.csv', chunk_size=7))
+        assert recorder.count == 1, (
+            'Выгрузка должна читать таблицу одним запросом.'
+        )
+        reviews = Review.objects.count()
+        assert len(chunks) == 1 + -(-reviews // 7), (
+            'Текст должен отдаваться кусками по chunk_size строк.'
+        )
+
+    def test_03_api_ndjson(self, catalog, admin_client):
+        response = admin_client.get('/api/v1/export/comments.ndjson')
+        assert response.status_code == HTTPStatus.OK
+        assert response.streaming
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        assert len(rows) == Comment.objects.count()
+        assert list(rows[0]) == list(csv_columns['comments.csv'])
+        first = Comment.objects.order_by('pk').first()
+        assert (rows[0]['id'], rows[0]['author']) == (
+            first.pk, first.author_id
+        )
+
+    def test_04_api_csv(self, catalog, admin_client):
+        response = admin_client.get('/api/v1/export/titles.csv')
+        assert response.status_code == HTTPStatus.OK
+        assert 'titles.csv' in response['Content-Disposition']
+        content = b''.join(response.streaming_content).decode()
+        assert list(csv.reader(content.splitlines())) == read_csv(
+            catalog / 'titles.csv'
+        )
+
+    def test_05_api_access(self, user_client, admin_client):
+        response = user_client.get('/api/v1/export/reviews.csv')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        response = admin_client.get('/api/v1/export/users.csv')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = admin_client.get('/api/v1/export/reviews.xml')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_06_asgi_streaming(self, catalog, token_admin):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'method': 'GET',
+            'path': '/api/v1/export/titles.csv', 'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization',
+                 f'Bearer {token_admin["access"]}'.encode()),
+            ],
+        }
+        asyncio.run(ASGIHandler()(scope, receive, send))
+        assert messages[0]['status'] == HTTPStatus.OK
+        content = b''.join(
+            message.get('body', b'') for message in messages[1:]
+        ).decode()
+        assert list(csv.reader(content.splitlines())) == read_csv(
+            catalog / 'titles.csv'
+        ), 'Под ASGI выгрузка должна отдаваться целиком.'
@@ -0,0 +1,104 @@
+import datetime
+import uuid
+from decimal import Decimal
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from reviews.models import Category, Genres, Title
+
+TRICKY = {
+    'datetime': datetime.datetime(
+        2020, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc
+    ),
+    'date': datetime.date(2020, 1, 2),
+    'decimal': Decimal('1.50'),
+    'uuid': uuid.UUID(int=1),
+    'lazy': gettext_lazy('Категория'),
+    'separators': 'a b c',
+    'big': 2 ** 70,
+    'nested': [{'genre': ['драма', 'комедия']}, None, True, 1.5],
+}
+
+
+def fast_json_backends():
+    return renderers.available_backends()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23Renderers:
+
+    @pytest.mark.parametrize('backend', fast_json_backends())
+    def test_01_same_bytes_as_drf(self, backend, settings, admin_client):
+        settings.JSON_BACKEND = backend
+        category = Category.objects.create(name='Фильм', slug='movie')
+        title = Title.objects.create(name='Ёжик', year=2000, category=category)
+        title.genre.add(Genres.objects.create(name='Драма', slug='drama'))
+        for path in ('/api/v1/titles/', '/api/v1/users/',
+                     f'/api/v1/titles/{title.pk}/reviews/'):
+            data = admin_client.get(path).data
+            assert renderers.FastJSONRenderer().render(data) == (
+                JSONRenderer().render(data)
+            ), f'Ответ {path} должен совпадать с JSONRenderer DRF.'
+        assert renderers.FastJSONRenderer().render(TRICKY) == (
+            JSONRenderer().render(TRICKY)
+        )
+
+    def test_02_indent_negotiated(self, admin_client):
+        data = {'name': 'x', 'genre': ['a']}
+        media_type = 'application/json; indent=4'
+        assert renderers.FastJSONRenderer().render(data, media_type) == (
+            JSONRenderer().render(data, media_type)
+        )
+        Category.objects.create(name='Фильм', slug='movie')
+        response = admin_client.get(
+            '/api/v1/categories/', HTTP_ACCEPT=media_type
+        )
+        assert b'\n    "count"' in response.content
+        response = admin_client.get('/api/v1/categories/')
+        assert b'\n' not in response.content, (
+            'По умолчанию ответ должен быть компактным.'
+        )
+
+    @pytest.mark.parametrize('backend', fast_json_backends())
+    def test_03_parser(self, backend, settings):
+        settings.JSON_BACKEND = backend
+        content = JSONRenderer().render(
+            {'name': 'Ёжик', 'genre': ['drama'], 'year': 2000}
+        )
+        parser = parsers.FastJSONParser()
+        assert parser.parse(BytesIO(content)) == JSONParser().parse(
+            BytesIO(content)
+        )
+        for invalid in (b'{"name": ', b'{"score": NaN}'):
+            with pytest.raises(ParseError):
+                parser.parse(BytesIO(invalid))
+
+    def test_04_invalid_body(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/categories/', data='{"name": ',
+            content_type='application/json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_05_fallback_without_packages(self, monkeypatch, settings,
+                                          admin_client):
+        monkeypatch.setattr(renderers, 'orjson', None)
+        monkeypatch.setattr(renderers, 'ujson', None)
+        assert renderers.available_backends() == [renderers.STDLIB]
+        response = admin_client.post(
+            '/api/v1/categories/', {'name': 'Фильм', 'slug': 'movie'},
+            format='json'
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['slug'] == 'movie'
+
+        settings.JSON_BACKEND = renderers.ORJSON
+        with pytest.raises(ImportError):
+            renderers.get_backend()
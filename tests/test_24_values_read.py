@@ -0,0 +1,116 @@
+import datetime
+
+import pytest
+from django.core.cache import caches
+from django.utils import timezone
+
+from reviews.models import Category, Comment, Genres, Review, Title, User
+
+
+def create_feed(admin):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    drama = Genres.objects.create(name='Драма', slug='drama')
+    comedy = Genres.objects.create(name='Комедия', slug='comedy')
+    full = Title.objects.create(
+        name='Ёжик в тумане', year=1975, category=category,
+        description='Мультфильм "о тумане" и ёжике'
+    )
+    full.genre.add(drama, comedy)
+    Title.objects.create(name='Без категории', year=2000)
+    authors = [admin] + [
+        User.objects.create(username=f'author{number}',
+                            email=f'author{number}@yamdb.fake')
+        for number in range(11)
+    ]
+    moment = timezone.now().replace(microsecond=123456)
+    for number, author in enumerate(authors):
+        review = Review.objects.create(
+            title=full, author=author, text=f'Отзыв №{number}',
+            score=number % 10 + 1
+        )
+        # Одинаковые даты проверяют сортировку по id в курсоре.
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=moment - datetime.timedelta(seconds=number // 2)
+        )
+        Comment.objects.create(review=review, author=admin, text='Да')
+    return full
+
+
+def responses(client, settings, paths, values_read):
+    settings.API_VALUES_READ = values_read
+    result = []
+    for path in paths:
+        for cache in caches.all():
+            cache.clear()
+        response = client.get(path)
+        result.append((path, response.status_code, response.content))
+    return result
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24ValuesRead:
+
+    def assert_same(self, client, settings, paths):
+        fast = responses(client, settings, paths, True)
+        slow = responses(client, settings, paths, False)
+        for (path, status, content), expected in zip(fast, slow):
+            assert (path, status, content) == expected, (
+                f'Ответ {path} должен совпадать с ответом сериализатора.'
+            )
+
+    def test_01_titles(self, client, admin, settings):
+        title = create_feed(admin)
+        self.assert_same(client, settings, [
+            '/api/v1/titles/',
+            '/api/v1/titles/?genre=drama',
+            '/api/v1/titles/?category=movie&count=false',
+            '/api/v1/titles/?q=туман',
+            f'/api/v1/titles/{title.pk}/',
+            f'/api/v1/titles/{title.pk + 100}/',
+        ])
+
+    def test_02_reviews(self, client, admin, settings):
+        title = create_feed(admin)
+        review = title.reviews.order_by('pk').first()
+        base = f'/api/v1/titles/{title.pk}/reviews/'
+        self.assert_same(client, settings, [
+            base,
+            base + '?page=2',
+            base + '?cursor=',
+            f'{base}{review.pk}/',
+            f'/api/v1/titles/{title.pk + 100}/reviews/',
+        ])
+        settings.API_VALUES_READ = True
+        next_page = client.get(base + '?cursor=').json()['next']
+        self.assert_same(client, settings, [next_page])
+        previous = client.get(next_page).json()['previous']
+        self.assert_same(client, settings, [previous])
+
+    def test_03_comments(self, client, admin, settings):
+        title = create_feed(admin)
+        review = title.reviews.order_by('pk').first()
+        comment = review.comments.first()
+        base = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        self.assert_same(client, settings, [
+            base,
+            base + '?cursor=',
+            f'{base}{comment.pk}/',
+        ])
+
+    def test_04_no_model_instances(self, client, admin, settings,
+                                   monkeypatch):
+        title = create_feed(admin)
+        settings.API_VALUES_READ = True
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Сериализатор не должен вызываться.')
+
+        from api import serializers
+
+        for serializer in (serializers.TitlesViewSerializer,
+                           serializers.ReviewSerializer):
+            monkeypatch.setattr(serializer, 'to_representation', fail)
+        assert client.get('/api/v1/titles/').status_code == 200
+        assert client.get(
+            f'/api/v1/titles/{title.pk}/reviews/'
+        ).status_code == 200
@@ -0,0 +1,129 @@
+import datetime
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from reviews.models import Category, Genres, Review, ScoreRollup, Title
+
+
+def create_title(slug='movie', genre_slug='drama'):
+    category, _ = Category.objects.get_or_create(
+        slug=slug, defaults={'name': slug}
+    )
+    genre, _ = Genres.objects.get_or_create(
+        slug=genre_slug, defaults={'name': genre_slug}
+    )
+    title = Title.objects.create(name='Фильм', year=2000, category=category)
+    title.genre.add(genre)
+    return title
+
+
+def post_review(client, title, score):
+    response = client.post(
+        f'/api/v1/titles/{title.pk}/reviews/',
+        {'text': 'Отзыв', 'score': score}
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    return response.json()['id']
+
+
+def rollup_snapshot():
+    return sorted(
+        ScoreRollup.objects.filter(count__gt=0).values_list(
+            'title_id', 'day', 'score', 'count'
+        )
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25ScoreStats:
+
+    def test_01_incremental(self, admin_client, user_client,
+                            moderator_client):
+        title = create_title()
+        url = f'/api/v1/titles/{title.pk}/stats/'
+        empty = admin_client.get(url).json()
+        assert empty['count'] == 0 and empty['average'] is None
+        assert set(empty['histogram']) == {str(n) for n in range(1, 11)}
+
+        post_review(admin_client, title, 10)
+        review_id = post_review(user_client, title, 4)
+        post_review(moderator_client, title, 4)
+        data = admin_client.get(url).json()
+        assert data['count'] == 3
+        assert data['average'] == 6.0
+        assert (data['histogram']['4'], data['histogram']['10']) == (2, 1)
+        assert data['recent']['count'] == 3, (
+            'Оценки за сегодня должны попадать в свежий период.'
+        )
+
+        review_url = f'/api/v1/titles/{title.pk}/reviews/{review_id}/'
+        user_client.patch(review_url, {'score': 7})
+        data = admin_client.get(url).json()
+        assert (data['histogram']['4'], data['histogram']['7']) == (1, 1), (
+            'Изменение оценки должно переносить её в сводке.'
+        )
+        user_client.delete(review_url)
+        data = admin_client.get(url).json()
+        assert data['count'] == 2
+        assert data['histogram']['7'] == 0
+
+    def test_02_rebuild_matches_incremental(self, admin_client, user_client):
+        first, second = create_title(), create_title()
+        post_review(admin_client, first, 3)
+        post_review(user_client, first, 8)
+        post_review(admin_client, second, 8)
+        live = rollup_snapshot()
+        ScoreRollup.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_score_rollups', stdout=out)
+        assert 'Строк: 3' in out.getvalue()
+        assert rollup_snapshot() == live
+
+    def test_03_recent_period(self, admin_client, user_client):
+        title = create_title()
+        old_id = post_review(admin_client, title, 2)
+        post_review(user_client, title, 10)
+        Review.objects.filter(pk=old_id).update(
+            pub_date=timezone.now() - datetime.timedelta(days=40)
+        )
+        ScoreRollup.objects.rebuild()
+        url = f'/api/v1/titles/{title.pk}/stats/'
+        recent = admin_client.get(url).json()['recent']
+        assert (recent['count'], recent['average']) == (1, 10.0)
+        recent = admin_client.get(url, {'days': 60}).json()['recent']
+        assert (recent['count'], recent['average']) == (2, 6.0)
+        response = admin_client.get(url, {'days': 0})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_category_and_genre(self, admin_client, user_client):
+        movie = create_title('movie', 'drama')
+        book = create_title('book', 'drama')
+        create_title('empty', 'comedy')
+        post_review(admin_client, movie, 6)
+        post_review(user_client, book, 2)
+        data = admin_client.get('/api/v1/categories/movie/stats/').json()
+        assert (data['count'], data['average']) == (1, 6.0)
+        data = admin_client.get('/api/v1/genres/drama/stats/').json()
+        assert (data['count'], data['average']) == (2, 4.0)
+        data = admin_client.get('/api/v1/genres/comedy/stats/').json()
+        assert data['count'] == 0
+
+    def test_05_not_found(self, client):
+        title = create_title()
+        for url in (f'/api/v1/titles/{title.pk + 1}/stats/',
+                    '/api/v1/categories/missing/stats/',
+                    '/api/v1/genres/missing/stats/'):
+            assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+        assert client.get(
+            f'/api/v1/titles/{title.pk}/stats/'
+        ).status_code == HTTPStatus.OK
+
+    def test_06_title_delete_removes_rollups(self, admin_client):
+        title = create_title()
+        post_review(admin_client, title, 5)
+        admin_client.delete(f'/api/v1/titles/{title.pk}/')
+        assert not ScoreRollup.objects.exists()
@@ -0,0 +1,159 @@
+import sqlite3
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.test import APIClient
+
+from api.authentication import token_for_user
+from api.checks import check_shared_sticky_cache
+from api.db_router import ReplicaRouter, read_alias
+from reviews.models import Category, Review, Title
+
+REPLICA = 'replica'
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    """Реплика - отдельный файл SQLite, который отстаёт от default.
+
+    Данные на реплику попадают только при вызове фикстуры-функции:
+    копия default целиком, как после догоняющей репликации.
+    """
+    connections.databases[REPLICA] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = {
+        **settings.DATABASE_REPLICAS, 'ALIASES': [REPLICA]
+    }
+
+    def sync():
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(connections.databases[REPLICA]['NAME'])
+        primary.connection.backup(target)
+        target.close()
+
+    yield sync
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.databases[REPLICA]
+
+
+def reviews_count(client, url):
+    data = client.get(url).json()
+    assert data['count'] == len(data['results']), (
+        'Счётчик реплики и default должны кешироваться раздельно.'
+    )
+    return data['count']
+
+
+def titles(client):
+    response = client.get('/api/v1/titles/')
+    assert response.status_code == HTTPStatus.OK
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26ReadReplicas:
+
+    def test_01_anonymous_reads_replica(self, client, replica):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Title.objects.create(name='Старое', year=2000, category=category)
+        replica()
+        Title.objects.create(name='Новое', year=2001, category=category)
+        assert titles(client) == ['Старое'], (
+            'GET без аутентификации должен читать с реплики.'
+        )
+        replica()
+        for cache in caches.all():
+            cache.clear()
+        assert sorted(titles(client)) == ['Новое', 'Старое']
+        assert read_alias.get() is None, (
+            'После запроса чтение должно возвращаться в default.'
+        )
+
+    def test_02_read_your_writes(self, client, user_client, admin_client,
+                                 replica):
+        title = Title.objects.create(name='Фильм', year=2000)
+        replica()
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = user_client.post(url, {'text': 'Отзыв', 'score': 5})
+        assert response.status_code == HTTPStatus.CREATED
+        assert Review.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=response.json()['id']
+        ).exists(), 'Запись должна идти в default.'
+        assert reviews_count(user_client, url) == 1, (
+            'Автор записи должен сразу видеть её при чтении.'
+        )
+        assert reviews_count(client, url) == 0
+        assert reviews_count(admin_client, url) == 0, (
+            'Другие пользователи читают с реплики.'
+        )
+
+    def test_03_sticky_window(self, user_client, settings, replica):
+        settings.DATABASE_REPLICAS = {
+            **settings.DATABASE_REPLICAS, 'STICKY_SECONDS': 0
+        }
+        title = Title.objects.create(name='Фильм', year=2000)
+        replica()
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        user_client.post(url, {'text': 'Отзыв', 'score': 5})
+        assert reviews_count(user_client, url) == 0, (
+            'Вне окна прилипания автор читает с реплики.'
+        )
+
+    def test_04_failed_write_not_sticky(self, user_client, replica):
+        title = Title.objects.create(name='Фильм', year=2000)
+        replica()
+        Title.objects.create(name='Новое', year=2001)
+        response = user_client.post('/api/v1/categories/', {'name': 'x'})
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        assert titles(user_client) == [title.name]
+
+    def test_05_cached_replica_response(self, user_client, django_user_model,
+                                        replica):
+        other = django_user_model.objects.create_user(
+            username='other', email='other@yamdb.fake', role='user'
+        )
+        other_client = APIClient()
+        other_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {token_for_user(other)}'
+        )
+        title = Title.objects.create(name='Фильм', year=2000)
+        replica()
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        response = user_client.post(url, {'text': 'Отзыв', 'score': 5})
+        assert response.status_code == HTTPStatus.CREATED
+        assert reviews_count(other_client, url) == 0
+        assert reviews_count(user_client, url) == 1, (
+            'Ответ реплики в кеше не должен доставаться автору записи.'
+        )
+        assert reviews_count(other_client, url) == 0
+
+    def test_06_router(self, settings):
+        settings.DATABASE_REPLICAS = {
+            **settings.DATABASE_REPLICAS, 'ALIASES': [REPLICA]
+        }
+        router = ReplicaRouter()
+        assert router.db_for_read(Title) is None
+        token = read_alias.set(REPLICA)
+        try:
+            assert router.db_for_read(Title) == REPLICA
+            assert router.db_for_write(Title) == DEFAULT_DB_ALIAS
+        finally:
+            read_alias.reset(token)
+        assert router.allow_migrate(REPLICA, 'reviews') is False
+        assert router.allow_migrate(DEFAULT_DB_ALIAS, 'reviews') is True
+
+    def test_07_deploy_check(self, settings):
+        settings.DATABASE_REPLICAS = {
+            **settings.DATABASE_REPLICAS, 'ALIASES': [REPLICA]
+        }
+        assert [
+            warning.id for warning in check_shared_sticky_cache(None)
+        ] == ['api.W002'], (
+            'Прилипание в кеше процесса не видно другим процессам.'
+        )
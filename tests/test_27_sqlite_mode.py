@@ -0,0 +1,112 @@
+import sqlite3
+from http import HTTPStatus
+
+import pytest
+from django.db import connections, transaction
+
+from api.queries import record_queries
+from reviews.models import Title
+
+ALIAS = 'file_db'
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    connections.databases[ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'db.sqlite3'),
+    }
+    yield connections[ALIAS]
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    del connections.databases[ALIAS]
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def sqls(recorder):
+    return [sql for _, sql, _ in recorder.queries]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27SQLiteMode:
+
+    def test_01_pragmas(self, file_db):
+        assert pragma(file_db, 'journal_mode') == 'wal'
+        assert pragma(file_db, 'busy_timeout') == 5000
+        assert pragma(file_db, 'synchronous') == 1, (
+            'synchronous должен быть NORMAL.'
+        )
+        assert pragma(file_db, 'cache_size') == -64 * 1024
+        assert pragma(file_db, 'mmap_size') == 256 * 1024 * 1024
+
+    def test_02_pragmas_configurable(self, file_db, settings):
+        settings.SQLITE = {**settings.SQLITE, 'PRAGMAS': {}}
+        assert pragma(file_db, 'journal_mode') == 'delete'
+        assert pragma(file_db, 'synchronous') == 2
+
+    def test_03_in_memory_skips_file_pragmas(self):
+        default = connections['default']
+        assert default.is_in_memory_db()
+        assert pragma(default, 'journal_mode') == 'memory'
+        assert pragma(default, 'busy_timeout') == 5000
+
+    def test_04_write_serializer(self, admin_client, settings):
+        response = admin_client.post(
+            '/api/v1/categories/', {'name': 'Фильм', 'slug': 'movie'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        title = {'name': 'Фильм', 'year': 2000, 'category': 'movie'}
+        with record_queries() as recorder:
+            response = admin_client.post('/api/v1/titles/', title)
+        assert response.status_code == HTTPStatus.CREATED
+        assert 'BEGIN' in sqls(recorder), (
+            'По умолчанию транзакции начинаются с BEGIN.'
+        )
+
+        settings.SQLITE = {**settings.SQLITE, 'SERIALIZE_WRITES': True}
+        with record_queries() as recorder:
+            admin_client.get('/api/v1/titles/')
+        assert not any(sql.startswith('BEGIN') for sql in sqls(recorder)), (
+            'Чтение не должно ждать писателя.'
+        )
+        with record_queries() as recorder:
+            response = admin_client.post('/api/v1/titles/', title)
+        assert response.status_code == HTTPStatus.CREATED
+        assert 'BEGIN IMMEDIATE' in sqls(recorder), (
+            'С SERIALIZE_WRITES транзакция сразу берёт блокировку записи.'
+        )
+        assert Title.objects.count() == 2
+
+    def test_05_lock_held_for_transaction(self, file_db, settings):
+        settings.SQLITE = {**settings.SQLITE, 'SERIALIZE_WRITES': True}
+        other = sqlite3.connect(
+            connections.databases[ALIAS]['NAME'], timeout=0,
+            isolation_level=None
+        )
+
+        def can_write():
+            try:
+                other.execute('BEGIN IMMEDIATE')
+            except sqlite3.OperationalError:
+                return False
+            other.execute('ROLLBACK')
+            return True
+
+        try:
+            with transaction.atomic(using=ALIAS):
+                pragma(file_db, 'user_version')
+                assert not can_write(), (
+                    'Транзакция должна держать блокировку записи с начала.'
+                )
+            assert can_write(), 'После коммита блокировка отпускается.'
+            with pytest.raises(RuntimeError):
+                with transaction.atomic(using=ALIAS):
+                    raise RuntimeError
+            assert can_write(), 'После отката блокировка отпускается.'
+        finally:
+            other.close()
@@ -0,0 +1,224 @@
+import asyncio
+import importlib
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import clear_url_caches, resolve
+from rest_framework.views import APIView
+
+from api import async_views
+from api.authentication import (ClaimsJWTAuthentication, token_for_user,
+                                token_versions)
+from api.middleware import (AsyncCapableMiddleware, ProfilingMiddleware,
+                            QueryBudgetMiddleware)
+from reviews.models import Category, Comment, Genres, Review, Title
+
+HEADERS = ('Content-Type', 'Vary', 'Allow', 'ETag', 'Last-Modified',
+           'X-Count-Exact')
+
+
+def reload_urls():
+    import api.urls
+    import api_yamdb.urls
+
+    importlib.reload(api.urls)
+    importlib.reload(api_yamdb.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_urls(settings):
+    settings.API_ASYNC_READS = True
+    reload_urls()
+    yield
+    settings.API_ASYNC_READS = False
+    reload_urls()
+
+
+@pytest.fixture
+def thread_calls(monkeypatch):
+    calls = []
+    run_in_thread = async_views.run_in_thread
+
+    def record(view, request, *args, **kwargs):
+        calls.append(request.path)
+        return run_in_thread(view, request, *args, **kwargs)
+
+    monkeypatch.setattr(async_views, 'run_in_thread', record)
+    return calls
+
+
+def create_catalog(admin):
+    category = Category.objects.create(name='Фильм', slug='movie')
+    genre = Genres.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Ёжик', year=1975, category=category)
+    title.genre.add(genre)
+    review = Review.objects.create(
+        title=title, author=admin, text='Отзыв', score=7
+    )
+    comment = Comment.objects.create(review=review, author=admin, text='Да')
+    return title, review, comment
+
+
+def async_request(method, path, *args, **kwargs):
+    async def request():
+        return await getattr(AsyncClient(), method)(path, *args, **kwargs)
+    return async_to_sync(request)()
+
+
+def async_get(path, **headers):
+    return async_request('get', path, **headers)
+
+
+def snapshot(response):
+    return (
+        response.status_code, response.content,
+        {header: response.get(header) for header in HEADERS}
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28AsyncReads:
+
+    def test_01_async_views_mounted(self, async_urls):
+        for path in ('/api/v1/titles/', '/api/v1/titles/1/',
+                     '/api/v1/categories/', '/api/v1/genres/',
+                     '/api/v1/titles/1/reviews/1/',
+                     '/api/v1/titles/1/reviews/1/comments/'):
+            assert asyncio.iscoroutinefunction(resolve(path).func), (
+                f'{path} должен обслуживаться async-представлением.'
+            )
+        assert not asyncio.iscoroutinefunction(
+            resolve('/api/v1/users/').func
+        )
+
+    def test_02_sync_views_by_default(self):
+        assert not asyncio.iscoroutinefunction(
+            resolve('/api/v1/titles/').func
+        )
+
+    def test_03_same_responses(self, client, admin, admin_client,
+                               async_urls):
+        title, review, comment = create_catalog(admin)
+        base = f'/api/v1/titles/{title.pk}'
+        paths = [
+            '/api/v1/titles/', '/api/v1/titles/?genre=drama',
+            f'{base}/', f'/api/v1/titles/{title.pk + 100}/',
+            '/api/v1/categories/', '/api/v1/genres/', f'{base}/reviews/',
+            f'{base}/reviews/{review.pk}/',
+            f'{base}/reviews/{review.pk}/comments/',
+            f'{base}/reviews/{review.pk}/comments/{comment.pk}/',
+            f'{base}/stats/',
+        ]
+        token = admin_client._credentials['HTTP_AUTHORIZATION']
+        for path in paths:
+            for _ in range(2):
+                expected = snapshot(client.get(path))
+                assert snapshot(async_get(path)) == expected, (
+                    f'Async-ответ {path} должен совпадать с синхронным.'
+                )
+                expected = snapshot(admin_client.get(path))
+                assert snapshot(
+                    async_get(path, authorization=token)
+                ) == expected
+
+    def test_04_cache_hit_without_thread(self, admin, async_urls,
+                                         thread_calls):
+        title, _, _ = create_catalog(admin)
+        path = f'/api/v1/titles/{title.pk}/reviews/'
+        first = async_get(path)
+        assert thread_calls == [path], 'Промах кеша читает базу в потоке.'
+        second = async_get(path)
+        assert thread_calls == [path], (
+            'Ответ из кеша должен отдаваться в цикле событий.'
+        )
+        assert second.content == first.content
+        etag = second['ETag']
+        response = async_get(path, if_none_match=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert thread_calls == [path]
+
+    def test_05_writes_in_thread(self, admin, admin_client, async_urls,
+                                 thread_calls):
+        title, _, _ = create_catalog(admin)
+        token = admin_client._credentials['HTTP_AUTHORIZATION']
+        path = f'/api/v1/titles/{title.pk}/'
+        async_get(path)
+        response = async_request(
+            'patch', path, {'name': 'Ёжик в тумане'},
+            content_type='application/json', authorization=token
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert thread_calls == [path, path]
+        assert async_get(path).json()['name'] == 'Ёжик в тумане', (
+            'После записи кеш не должен отдавать старый ответ.'
+        )
+
+    def test_06_replay_checks_once(self, admin, async_urls, thread_calls,
+                                   monkeypatch):
+        title, _, _ = create_catalog(admin)
+        calls = []
+
+        def counted(name, method):
+            def wrapper(*args, **kwargs):
+                calls.append(name)
+                return method(*args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(
+            ClaimsJWTAuthentication, 'authenticate', counted(
+                'authenticate', ClaimsJWTAuthentication.authenticate
+            )
+        )
+        for name in ('check_permissions', 'check_throttles'):
+            monkeypatch.setattr(
+                APIView, name, counted(name, getattr(APIView, name))
+            )
+        # Версия прав уже в кеше процесса: иначе попытка в цикле уходит в
+        # базу ещё при аутентификации.
+        token_versions.set(admin.pk, admin.token_version)
+        token = f'Bearer {token_for_user(admin)}'
+        path = f'/api/v1/titles/{title.pk}/reviews/'
+        response = async_get(path, authorization=token)
+        assert response.status_code == HTTPStatus.OK
+        assert thread_calls == [path]
+        assert calls == [
+            'authenticate', 'check_permissions', 'check_throttles'
+        ], 'Повтор в потоке не должен заново проверять пользователя.'
+
+    def test_07_shared_cache_in_thread(self, admin, async_urls,
+                                       thread_calls, settings, tmp_path):
+        settings.CACHES = {**settings.CACHES, 'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }}
+        settings.API_CACHE_ALIAS = 'shared'
+        title, _, _ = create_catalog(admin)
+        path = f'/api/v1/titles/{title.pk}/reviews/'
+        first = async_get(path)
+        second = async_get(path)
+        assert second.content == first.content
+        assert thread_calls == [path, path], (
+            'Кеш вне памяти процесса блокировал бы цикл событий.'
+        )
+
+    def test_08_async_middleware(self, settings, caplog):
+        async def get_response(request):
+            return request
+
+        middleware = AsyncCapableMiddleware(get_response)
+        assert asyncio.iscoroutinefunction(middleware)
+        assert async_to_sync(middleware)('request') == 'request'
+        assert AsyncCapableMiddleware(str)('request') == 'request'
+
+        settings.API_PROFILING = {**settings.API_PROFILING, 'ENABLED': True}
+        QueryBudgetMiddleware(get_response)
+        ProfilingMiddleware(get_response)
+        messages = [record.getMessage() for record in caplog.records]
+        assert any('API_QUERY_BUDGET' in message for message in messages)
+        assert any('API_PROFILING' in message for message in messages), (
+            'Под ASGI отключённые проверки должны быть видны в логе.'
+        )
+        assert not asyncio.iscoroutinefunction(QueryBudgetMiddleware(str))
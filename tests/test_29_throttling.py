@@ -0,0 +1,202 @@
+from http import HTTPStatus
+
+import pytest
+
+from api import throttling
+from api.checks import check_shared_throttle_cache
+from reviews.models import Title
+
+STORES = ('local', 'cache')
+MINUTE = 60 * 1000
+
+
+class CountingCache:
+    """Обёртка кеша, которая считает обращения к нему."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+        return call
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Часы троттлинга: начало минуты, двигаются вручную."""
+    now = [MINUTE * 60.0]
+    monkeypatch.setattr(
+        throttling.SlidingWindowThrottle, 'timer', lambda self: now[0]
+    )
+    return now
+
+
+def set_rates(settings, store, **rates):
+    settings.API_THROTTLE = {**settings.API_THROTTLE, 'STORE': store}
+    settings.REST_FRAMEWORK = {
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates
+    }
+
+
+def signup(client, number, address='127.0.0.1', **headers):
+    return client.post(
+        '/api/v1/auth/signup/',
+        {'username': f'user{number}', 'email': f'user{number}@yamdb.fake'},
+        REMOTE_ADDR=address, **headers
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29Throttling:
+
+    @pytest.mark.parametrize('store', STORES)
+    def test_01_signup(self, client, settings, clock, store):
+        set_rates(settings, store, signup='3/min')
+        for number in range(3):
+            assert signup(client, number).status_code == HTTPStatus.OK
+        response = signup(client, 3)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        # Отклонённый запрос тоже считается: 4 * (1 - 0.5) + 1 <= 3.
+        assert int(response['Retry-After']) == 90, (
+            'Retry-After должен показывать, когда освободится место.'
+        )
+        assert signup(client, 4, '10.0.0.1').status_code == HTTPStatus.OK, (
+            'Ограничение регистрации действует на один IP.'
+        )
+
+    @pytest.mark.parametrize('store', STORES)
+    def test_02_sliding_window(self, client, settings, clock, store):
+        set_rates(settings, store, signup='4/min')
+        for number in range(4):
+            assert signup(client, number).status_code == HTTPStatus.OK
+        clock[0] += 45
+        response = signup(client, 4)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        retry_after = int(response['Retry-After'])
+        assert retry_after == 39
+        clock[0] += retry_after
+        # 60% прошлой минуты (5 запросов) и текущий: 3 + 1 из 4.
+        assert signup(client, 5).status_code == HTTPStatus.OK
+        assert signup(client, 6).status_code == (
+            HTTPStatus.TOO_MANY_REQUESTS
+        ), 'На границе минут всплеск не должен удваиваться.'
+        clock[0] += 120
+        assert signup(client, 7).status_code == HTTPStatus.OK
+
+    def test_03_token(self, client, settings, clock):
+        set_rates(settings, 'cache', token='2/min')
+        statuses = [
+            client.post('/api/v1/auth/token/', {'username': 'nobody'})
+            .status_code for _ in range(3)
+        ]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS
+        assert HTTPStatus.TOO_MANY_REQUESTS not in statuses[:2]
+
+    @pytest.mark.parametrize('store', STORES)
+    def test_04_review_and_comment_writes(self, user_client, admin_client,
+                                          settings, clock, store):
+        set_rates(settings, store, review_write='2/min',
+                  comment_write='1/min')
+        titles = [Title.objects.create(name=f'Фильм {number}', year=2000)
+                  for number in range(3)]
+        statuses = [
+            user_client.post(f'/api/v1/titles/{title.pk}/reviews/',
+                             {'text': 'Отзыв', 'score': 5}).status_code
+            for title in titles
+        ]
+        assert statuses == [HTTPStatus.CREATED, HTTPStatus.CREATED,
+                            HTTPStatus.TOO_MANY_REQUESTS]
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+        for _ in range(3):
+            assert user_client.get(url).status_code == HTTPStatus.OK, (
+                'Чтение не должно ограничиваться.'
+            )
+        response = admin_client.post(url, {'text': 'Отзыв', 'score': 5})
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Ограничение записи действует на одного пользователя.'
+        )
+        review_id = response.json()['id']
+        comments = f'{url}{review_id}/comments/'
+        assert user_client.post(
+            comments, {'text': 'Да'}
+        ).status_code == HTTPStatus.CREATED
+        assert user_client.post(
+            comments, {'text': 'Да'}
+        ).status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    def test_05_one_cache_call(self, client, settings, clock, monkeypatch):
+        set_rates(settings, 'cache', signup='100/min')
+        cache = CountingCache(throttling.get_cache())
+        monkeypatch.setattr(throttling, 'get_cache', lambda: cache)
+        signup(client, 0)
+        assert cache.calls == ['get', 'add'], (
+            'Первый запрос минуты дочитывает предыдущую и создаёт счётчик: '
+            'два обращения вместо одного.'
+        )
+        for number in range(1, 4):
+            cache.calls.clear()
+            signup(client, number)
+            assert cache.calls == ['incr'], (
+                'Проверка должна стоить одного обращения к кешу.'
+            )
+        clock[0] += 60
+        cache.calls.clear()
+        signup(client, 4)
+        assert cache.calls == ['get', 'add']
+
+        # Ключ минуты уже создал другой процесс.
+        throttling.stores['cache'].clear()
+        cache.calls.clear()
+        signup(client, 5)
+        assert cache.calls == ['get', 'add', 'incr'], (
+            'Проигравший гонку за ключ процесс делает три обращения.'
+        )
+        cache.calls.clear()
+        signup(client, 6)
+        assert cache.calls == ['incr']
+        # Ключ пропал из кеша.
+        throttling.get_cache().clear()
+        cache.calls.clear()
+        signup(client, 7)
+        assert cache.calls == ['incr', 'get', 'add']
+
+    def test_06_local_store_bounded(self, settings, clock):
+        settings.API_THROTTLE = {**settings.API_THROTTLE, 'LOCAL_SIZE': 2}
+        store = throttling.LocalStore()
+        for ident in ('a', 'b', 'c'):
+            store.hit('signup', ident, 1, 60)
+        assert list(store.counters) == [('signup', 'b'), ('signup', 'c')]
+        assert store.hit('signup', 'b', 2, 60) == (1, 1)
+        assert store.hit('signup', 'c', 5, 60) == (0, 1)
+
+    @pytest.mark.parametrize('store', STORES)
+    def test_07_forwarded_for_ignored(self, client, settings, clock, store):
+        set_rates(settings, store, signup='2/min')
+        statuses = [
+            signup(
+                client, number, HTTP_X_FORWARDED_FOR=f'10.0.0.{number}'
+            ).status_code
+            for number in range(3)
+        ]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Поддельный X-Forwarded-For не должен обходить ограничение.'
+        )
+
+    def test_08_deploy_check(self, settings, tmp_path):
+        assert [
+            warning.id for warning in check_shared_throttle_cache(None)
+        ] == ['api.W003'], 'LocMemCache считает запросы в одном процессе.'
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path),
+        }}
+        assert check_shared_throttle_cache(None) == []
+        settings.API_THROTTLE = {**settings.API_THROTTLE, 'STORE': 'local'}
+        assert [
+            warning.id for warning in check_shared_throttle_cache(None)
+        ] == ['api.W003']
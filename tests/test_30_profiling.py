@@ -0,0 +1,152 @@
+import pstats
+import threading
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from api import profiling
+from api.authentication import token_for_user
+from reviews.models import Title
+
+TITLES = '/api/v1/titles/'
+
+
+@pytest.fixture
+def profiles_dir(settings, tmp_path):
+    settings.API_PROFILING = {
+        **settings.API_PROFILING, 'ENABLED': True, 'SAMPLE_RATE': 0.0,
+        'HEADER_TOKEN': 'secret', 'DIRECTORY': tmp_path,
+    }
+    profiling.profiles.clear()
+    yield tmp_path
+    profiling.profiles.clear()
+
+
+def configure(settings, **options):
+    settings.API_PROFILING = {**settings.API_PROFILING, **options}
+
+
+def files(directory):
+    profiling.profiles.flush()
+    return sorted(path.name.rsplit('.', 2)[0] + '.' + path.suffix[1:]
+                  for path in directory.iterdir())
+
+
+@pytest.mark.django_db(transaction=True)
+class Test30Profiling:
+
+    def test_01_not_sampled(self, client, profiles_dir, monkeypatch):
+        started = []
+        monkeypatch.setattr(
+            profiling.cProfile, 'Profile',
+            lambda: started.append(1)
+        )
+        assert client.get(TITLES).status_code == HTTPStatus.OK
+        assert client.get(
+            TITLES, HTTP_X_PROFILE='wrong'
+        ).status_code == HTTPStatus.OK
+        assert not started, 'Запрос вне выборки не должен профилироваться.'
+        assert not list(profiles_dir.iterdir())
+
+    def test_02_header(self, client, profiles_dir):
+        Title.objects.create(name='Фильм', year=2000)
+        for _ in range(3):
+            client.get(TITLES, HTTP_X_PROFILE='secret')
+        assert files(profiles_dir) == [
+            'TitlesViewSet.list.collapsed', 'TitlesViewSet.list.json',
+            'TitlesViewSet.list.prof',
+        ], 'Профили складываются по действию вьюсета.'
+        collapsed = next(profiles_dir.glob('*.collapsed')).read_text()
+        lines = collapsed.splitlines()
+        assert lines
+        for line in lines:
+            stack, value = line.rsplit(' ', 1)
+            assert stack and int(value) > 0, (
+                'Строка стеков - кадры через ";" и время в микросекундах.'
+            )
+        stacks = [line.rsplit(' ', 1)[0] for line in lines]
+        assert len(stacks) == len(set(stacks)), (
+            'Одинаковые стеки выборок должны суммироваться, а не дописываться.'
+        )
+        assert any('list (api/mixins.py' in line for line in lines)
+        stats = pstats.Stats(str(next(profiles_dir.glob('*.prof'))))
+        assert any(name == 'list' for _, _, name in stats.stats)
+
+    def test_03_routes(self, client, settings, profiles_dir):
+        configure(settings, SAMPLE_RATE=1.0, ROUTES=['api:genres-list'])
+        client.get(TITLES)
+        client.get('/api/v1/genres/')
+        assert {name.split('.')[0] for name in files(profiles_dir)} == {
+            'GenresViewSet'
+        }, 'Профилируются только маршруты из ROUTES.'
+
+    def test_04_roles(self, client, user, admin, settings, profiles_dir):
+        configure(settings, SAMPLE_RATE=1.0, ROLES=['admin'])
+        client.get(TITLES)
+        client.get(TITLES,
+                   HTTP_AUTHORIZATION=f'Bearer {token_for_user(user)}')
+        assert not list(profiles_dir.iterdir()), (
+            'Профилируются только запросы ролей из ROLES.'
+        )
+        client.get('/api/v1/genres/',
+                   HTTP_AUTHORIZATION=f'Bearer {token_for_user(admin)}')
+        assert files(profiles_dir)[0].startswith('GenresViewSet.list')
+
+    def test_05_summary(self, client, profiles_dir, tmp_path_factory,
+                        capsys):
+        client.get(TITLES, HTTP_X_PROFILE='secret')
+        client.post('/api/v1/auth/signup/', {
+            'username': 'new', 'email': 'new@yamdb.fake'
+        }, HTTP_X_PROFILE='secret')
+        profiling.profiles.flush()
+        # Файлы другого процесса того же действия.
+        for path in list(profiles_dir.glob('TitlesViewSet.list.*')):
+            name = path.name.split('.')
+            name[2] = '1'
+            (profiles_dir / '.'.join(name)).write_bytes(path.read_bytes())
+        output = tmp_path_factory.mktemp('merged')
+        call_command('profile_summary', path=str(profiles_dir),
+                     output=str(output), limit=3)
+        out = capsys.readouterr().out
+        assert 'TitlesViewSet.list: выборок 2' in out, (
+            'Команда должна сводить профили всех процессов.'
+        )
+        assert 'Signup.post: выборок 1' in out
+        assert sorted(path.name for path in output.iterdir()) == [
+            'Signup.post.collapsed', 'Signup.post.prof',
+            'TitlesViewSet.list.collapsed', 'TitlesViewSet.list.prof',
+        ]
+        single = profiles_dir.glob('TitlesViewSet.list.*.collapsed')
+        value = sum(int(line.rsplit(' ', 1)[1])
+                    for line in next(single).read_text().splitlines())
+        merged = (output / 'TitlesViewSet.list.collapsed').read_text()
+        assert sum(int(line.rsplit(' ', 1)[1])
+                   for line in merged.splitlines()) == 2 * value
+
+    def test_06_written_in_background(self, client, profiles_dir,
+                                      monkeypatch):
+        threads = []
+        collapsed_stacks = profiling.collapsed_stacks
+
+        def record(stats):
+            threads.append(threading.current_thread())
+            return collapsed_stacks(stats)
+
+        monkeypatch.setattr(profiling, 'collapsed_stacks', record)
+        client.get(TITLES, HTTP_X_PROFILE='secret')
+        profiling.profiles.flush()
+        assert threads and threading.current_thread() not in threads, (
+            'Стеки должны собираться вне потока запроса.'
+        )
+
+    def test_07_write_error(self, client, settings, profiles_dir, caplog):
+        blocker = profiles_dir / 'file'
+        blocker.write_text('')
+        configure(settings, DIRECTORY=blocker / 'profiles')
+        response = client.get(TITLES, HTTP_X_PROFILE='secret')
+        profiling.profiles.flush()
+        assert response.status_code == HTTPStatus.OK, (
+            'Ошибка записи профиля не должна ломать ответ.'
+        )
+        assert 'Не удалось записать профиль' in caplog.text